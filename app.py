@@ -2,25 +2,50 @@ from os import getcwd
 from pathlib import Path
 
 from flask import Flask, render_template
-from flask_graphql import GraphQLView
 
+from src.api.cache import CacheBackend, DatasetVersion, ResponseCache
+from src.api.persisted import CachedDocumentBackend, get_persisted_queries
+from src.api.views import CachedGraphQLView
+from src.embedded import get_engine_options
 from src.models import db
 from src.schema import schema
-from src.utils import get_config
+from src.utils import get_config, is_embedded
 
 CONFIG = get_config(Path(Path(getcwd()) / "config" / "config.yml"))
 
 
-def create_app(config=CONFIG):
+def create_app(config=CONFIG, cache: CacheBackend = None):
     app = Flask(__name__, template_folder="src/templates", static_folder="src/static")
-    app.debug = True
-    app.config["SQLALCHEMY_DATABASE_URI"] = config["default_database_uri"]
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = True
+    db_uri = config["default_database_uri"]
+    if is_embedded(db_uri):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = get_engine_options(
+            db_uri, config["embedded"]
+        )
+    else:
+        app.config["SQLALCHEMY_DATABASE_URI"] = db_uri
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     db.init_app(app)
 
+    cache_config = config["response_cache"]
+    if cache is None:
+        cache = ResponseCache(
+            max_size=cache_config["max_size"], ttl=cache_config["ttl"]
+        )
     app.add_url_rule(
         "/graphql",
-        view_func=GraphQLView.as_view("graphql", schema=schema, graphiql=True),
+        view_func=CachedGraphQLView.as_view(
+            "graphql",
+            schema=schema,
+            graphiql=True,
+            cache=cache,
+            dataset_version=DatasetVersion(cache_config["version_check_interval"]),
+            max_cost=config["query_limits"]["max_cost"],
+            max_depth=config["query_limits"]["max_depth"],
+            backend=CachedDocumentBackend(
+                config["persisted_queries"]["document_cache_size"]
+            ),
+            persisted_queries=get_persisted_queries(config),
+        ),
     )
 
     @app.route("/")
@@ -32,4 +57,4 @@ def create_app(config=CONFIG):
 
 if __name__ == "__main__":
     app = create_app()
-    app.run()
+    app.run(debug=True)
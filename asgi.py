@@ -0,0 +1,15 @@
+from os import getcwd
+from pathlib import Path
+
+from src.api.asgi import create_asgi_app
+from src.utils import get_config
+
+CONFIG = get_config(Path(Path(getcwd()) / "config" / "config.yml"))
+
+app = create_asgi_app(CONFIG)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app)
@@ -0,0 +1,120 @@
+"""
+Startup time and per-query latency of GraphQL app served from Postgres and
+from embedded SQLite database file, both loaded beforehand from the same
+parsed data sets, e.g.
+
+    python run.py --root ROOT --load
+    python run.py --root ROOT --load --dburi sqlite:///imdb.sqlite
+    python -m benchmarks.bench_embedded --embedded sqlite:///imdb.sqlite
+
+Startup is measured in fresh interpreter: from start of process to response
+to first query, so imports, app creation and first connection are included
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from app import create_app  # noqa: E402
+from src.utils import get_config  # noqa: E402
+
+CONFIG = get_config(ROOT_DIR / "config" / "config.yml")
+QUERIES = {
+    "film": "{ film(id: 1) { title genres { genre } rating { averageRating } } }",
+    "films": "{ films(first: 20) { title persons(first: 5) { name } } }",
+    "genre": '{ films(genre: "Drama", orderBy: RATING, first: 20) { title } }',
+    "match": '{ films(match: "love", first: 20) { title } }',
+    "persons": "{ persons(first: 20) { name films(first: 5) { title } } }",
+    "principals": "{ principals(first: 50) { name title job } }",
+}
+STARTUP = """
+import sys, time
+started = float(sys.argv[1])
+from app import create_app
+from src.utils import get_config
+config = {**get_config("config/config.yml"), "default_database_uri": sys.argv[2]}
+client = create_app(config).test_client()
+response = client.post("/graphql", json={"query": sys.argv[3]})
+assert response.status_code == 200 and "errors" not in response.json
+print(time.time() - started)
+"""
+
+
+def get_config_for(dburi: str) -> dict:
+    # Response cache is disabled, every query is executed
+    return {
+        **CONFIG,
+        "default_database_uri": dburi,
+        "response_cache": {**CONFIG["response_cache"], "max_size": 0},
+    }
+
+
+def bench_startup(dburi: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, "-c", STARTUP, str(time.time()), dburi, QUERIES["film"]],
+            cwd=ROOT_DIR,
+        )
+        timings.append(float(output))
+    return statistics.median(timings)
+
+
+def bench_query(client, query: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.post("/graphql", json={"query": query})
+        timings.append(time.perf_counter() - started)
+    assert "errors" not in response.json, response.json
+    return statistics.median(timings)
+
+
+def main(postgres: str, embedded: str, repeat: int):
+    databases = {"postgres": postgres, "embedded": embedded}
+    startup = {
+        name: bench_startup(dburi, max(repeat // 4, 1))
+        for name, dburi in databases.items()
+    }
+    print(
+        f"{'startup, s':<12} postgres {startup['postgres']:>8.3f}, "
+        f"embedded {startup['embedded']:>8.3f}"
+    )
+    clients = {
+        name: create_app(get_config_for(dburi)).test_client()
+        for name, dburi in databases.items()
+    }
+    print("Median latency of query, ms")
+    for name, query in QUERIES.items():
+        results = []
+        for client in clients.values():
+            # Warm up connection, caches of compiled statements and pages
+            results.append(
+                json.dumps(client.post("/graphql", json={"query": query}).json)
+            )
+        latency = {
+            db_name: bench_query(client, query, repeat)
+            for db_name, client in clients.items()
+        }
+        print(
+            f"{name:<12} postgres {latency['postgres'] * 1000:>8.2f}, "
+            f"embedded {latency['embedded'] * 1000:>8.2f}, "
+            f"{latency['postgres'] / latency['embedded']:>5.1f}x"
+            f"{'' if results[0] == results[1] else ' (results differ)'}"
+        )
+
+
+if __name__ == "__main__":
+    cmd_line_parser = ArgumentParser()
+    cmd_line_parser.add_argument("--repeat", type=int, default=20)
+    cmd_line_parser.add_argument("--dburi", default=CONFIG["default_database_uri"])
+    cmd_line_parser.add_argument("--embedded", default="sqlite:///imdb.sqlite")
+    args = cmd_line_parser.parse_args()
+    main(args.dburi, args.embedded, args.repeat)
@@ -0,0 +1,110 @@
+"""
+Latency of common films queries with rating and genres: on joined film,
+rating, genre_film and genre tables (as resolvers read them before film
+summary view), and on film_summary view, against database loaded beforehand
+(e.g. with run.py --load)
+
+    python -m benchmarks.bench_film_summary --repeat 20
+"""
+
+import statistics
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import selectinload, sessionmaker  # noqa: E402
+
+import src.models as models  # noqa: E402
+from src.schema import filter_film_summary, filter_films  # noqa: E402
+from src.utils import get_config  # noqa: E402
+
+CONFIG = get_config(ROOT_DIR / "config" / "config.yml")
+PAGE_SIZE = 50
+
+# Filters of films query: genre, period, min_rating
+CASES = {
+    "list": (None, None, None),
+    "genre": ("Drama", None, None),
+    "period": (None, (1990, 1999), None),
+    "rating": (None, None, 8.0),
+    "combined": ("Drama", (1990, 1999), 8.0),
+}
+
+
+def query_tables(session, genre, period, min_rating):
+    film = models.FilmModel
+    query = filter_films(
+        session.query(film).options(
+            selectinload(film.rating), selectinload(film.genres)
+        ),
+        genre=genre,
+        period=period,
+    )
+    if min_rating is not None:
+        query = query.filter(
+            film.rating.has(models.RatingModel.average_rating >= min_rating)
+        )
+    return [
+        {
+            "title": el.title,
+            "averageRating": el.rating and el.rating.average_rating,
+            "genres": [genre.genre for genre in el.genres],
+        }
+        for el in query.order_by(film.id).limit(PAGE_SIZE)
+    ]
+
+
+def query_summary(session, genre, period, min_rating):
+    summary = models.FilmSummaryModel
+    query = filter_film_summary(
+        session.query(
+            summary.id, summary.title, summary.average_rating, summary.genres
+        ),
+        genre=genre,
+        period=period,
+        min_rating=min_rating,
+    )
+    return [
+        {"title": el.title, "averageRating": el.average_rating, "genres": el.genres}
+        for el in query.order_by(summary.id).limit(PAGE_SIZE)
+    ]
+
+
+def bench(session_factory, fn, filters, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        with session_factory() as session:
+            started = time.perf_counter()
+            fn(session, *filters)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(repeat: int, dburi: str):
+    session_factory = sessionmaker(create_engine(dburi))
+    print(f"Median latency of {PAGE_SIZE} films, ms")
+    for name, filters in CASES.items():
+        with session_factory() as session:
+            # Warm up connection, caches of compiled statements and buffers
+            tables = query_tables(session, *filters)
+            summary = query_summary(session, *filters)
+            assert len(tables) == len(summary), (name, len(tables), len(summary))
+        joined = bench(session_factory, query_tables, filters, repeat)
+        viewed = bench(session_factory, query_summary, filters, repeat)
+        print(
+            f"{name:<10} tables {joined * 1000:>8.2f}, "
+            f"film_summary {viewed * 1000:>8.2f}, {joined / viewed:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    cmd_line_parser = ArgumentParser()
+    cmd_line_parser.add_argument("--repeat", type=int, default=20)
+    cmd_line_parser.add_argument("--dburi", default=CONFIG["default_database_uri"])
+    args = cmd_line_parser.parse_args()
+    main(args.repeat, args.dburi)
@@ -0,0 +1,106 @@
+"""
+Top films of period by rating with minimal number of votes: ordered films
+query against paging through all matching films and sorting them on client,
+as clients did without `orderBy`, on database loaded beforehand
+(e.g. with run.py --load)
+
+    python -m benchmarks.bench_ordering --top 100 --period 1990 1999 --min-votes 10000
+"""
+
+import statistics
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.schema import MAX_QUERY_LIMIT, schema  # noqa: E402
+from src.utils import get_config  # noqa: E402
+
+CONFIG = get_config(ROOT_DIR / "config" / "config.yml")
+FIELDS = "id title cursor rating { averageRating numVotes }"
+PAGED_QUERY = (
+    "query Films($period: [Int], $minVotes: Int, $after: String) "
+    f"{{ films(period: $period, minVotes: $minVotes, first: {MAX_QUERY_LIMIT}, "
+    f"after: $after) {{ {FIELDS} }} }}"
+)
+ORDERED_QUERY = (
+    "query TopFilms($period: [Int], $minVotes: Int, $top: Int) "
+    "{ films(period: $period, minVotes: $minVotes, orderBy: RATING, first: $top) "
+    f"{{ {FIELDS} }} }}"
+)
+
+
+def execute(session, query: str, variables: dict) -> list:
+    result = schema.execute(
+        query, variables=variables, context_value={"session": session}
+    )
+    assert result.errors is None, result.errors
+    return result.data["films"]
+
+
+def top_on_client(session, top: int, period, min_votes: int) -> list:
+    films, after = [], None
+    while True:
+        page = execute(
+            session,
+            PAGED_QUERY,
+            {"period": period, "minVotes": min_votes, "after": after},
+        )
+        films.extend(page)
+        if len(page) < MAX_QUERY_LIMIT:
+            break
+        after = page[-1]["cursor"]
+    films = [el for el in films if el["rating"]]
+    films.sort(key=lambda el: (-el["rating"]["averageRating"], int(el["id"])))
+    return films[:top]
+
+
+def top_ordered(session, top: int, period, min_votes: int) -> list:
+    return execute(
+        session, ORDERED_QUERY, {"period": period, "minVotes": min_votes, "top": top}
+    )
+
+
+def bench(session_factory, fn, args, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        with session_factory() as session:
+            started = time.perf_counter()
+            fn(session, *args)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(top: int, period, min_votes: int, repeat: int, dburi: str):
+    session_factory = sessionmaker(create_engine(dburi))
+    args = top, period, min_votes
+    with session_factory() as session:
+        expected = [el["id"] for el in top_on_client(session, *args)]
+        ordered = [el["id"] for el in top_ordered(session, *args)]
+        assert expected == ordered, "orders differ"
+    on_client = bench(session_factory, top_on_client, args, repeat)
+    in_database = bench(session_factory, top_ordered, args, repeat)
+    print(
+        f"Top {top} films of {period[0]}-{period[1]} with {min_votes} votes, "
+        f"median latency: sorted on client {on_client * 1000:.1f} ms, "
+        f"orderBy {in_database * 1000:.1f} ms, {on_client / in_database:.0f}x"
+    )
+
+
+if __name__ == "__main__":
+    cmd_line_parser = ArgumentParser()
+    cmd_line_parser.add_argument("--top", type=int, default=100)
+    cmd_line_parser.add_argument(
+        "--period", type=int, nargs=2, default=[1990, 1999], metavar=("FROM", "TO")
+    )
+    cmd_line_parser.add_argument("--min-votes", type=int, default=10000)
+    cmd_line_parser.add_argument("--repeat", type=int, default=5)
+    cmd_line_parser.add_argument("--dburi", default=CONFIG["default_database_uri"])
+    args = cmd_line_parser.parse_args()
+    main(args.top, args.period, args.min_votes, args.repeat, args.dburi)
@@ -0,0 +1,115 @@
+"""
+Size, write and scan time of parsed film and rating rows written as
+tab-delimited CSV and as Parquet files with typed columns
+
+    python -m benchmarks.bench_parquet --rows 1000000
+"""
+
+import csv
+import random
+import statistics
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from os.path import getsize
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+import pyarrow.compute as pc  # noqa: E402
+
+from src import models  # noqa: E402
+from src.parquet import ParquetWriter, read_table  # noqa: E402
+from src.utils import get_config  # noqa: E402
+
+CONFIG = get_config(ROOT_DIR / "config" / "config.yml")
+FILM = models.FilmModel.__tablename__
+RATING = models.RatingModel.__tablename__
+
+
+def get_rows(table_name: str, rows: int):
+    """
+    Rows as parser yields them: numbers of data set are strings
+    """
+    random.seed(0)
+    for idx in range(1, rows + 1):
+        if table_name == FILM:
+            yield idx, f"Title {idx}", False, str(random.randint(1900, 2022)), "90"
+        else:
+            yield idx, f"{random.randint(10, 100) / 10}", str(
+                random.randint(5, 10**6)
+            ), idx
+
+
+def write_csv(path: Path, table_name: str, rows: int):
+    with open(path, "w") as fd:
+        csv.writer(fd, delimiter=CONFIG["dataset_delimiter"]).writerows(
+            get_rows(table_name, rows)
+        )
+
+
+def write_parquet(path: Path, table_name: str, rows: int):
+    with ParquetWriter(path, table_name, **CONFIG["parquet"]) as writer:
+        writer.writerows(get_rows(table_name, rows))
+
+
+def scan_csv(path: Path, column: int) -> float:
+    """
+    Average of numeric column, which has to be parsed from text of every row
+    """
+    with open(path) as fd:
+        reader = csv.reader(fd, delimiter=CONFIG["dataset_delimiter"])
+        return statistics.fmean(float(el[column]) for el in reader)
+
+
+def scan_parquet(path: Path, column: str) -> float:
+    """
+    Average of numeric column, which is the only column read
+    """
+    return pc.mean(read_table([str(path)], columns=[column]).column(0)).as_py()
+
+
+def timed(fn, *args, repeat: int = 1) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(rows: int, repeat: int):
+    scanned = {FILM: (3, "start_year"), RATING: (1, "average_rating")}
+    with tempfile.TemporaryDirectory() as tmp:
+        for table_name, (index, column) in scanned.items():
+            csv_path = Path(tmp) / f"{table_name}.csv"
+            parquet_path = Path(tmp) / f"{table_name}.parquet"
+            csv_write = timed(write_csv, csv_path, table_name, rows)
+            parquet_write = timed(write_parquet, parquet_path, table_name, rows)
+            assert (
+                abs(scan_csv(csv_path, index) - scan_parquet(parquet_path, column))
+                < 1e-6
+            )
+            csv_scan = timed(scan_csv, csv_path, index, repeat=repeat)
+            parquet_scan = timed(scan_parquet, parquet_path, column, repeat=repeat)
+            csv_size, parquet_size = getsize(csv_path), getsize(parquet_path)
+            print(
+                f"{table_name:<7} {rows} rows: "
+                f"size CSV {csv_size / 2**20:.1f} MiB, "
+                f"Parquet {parquet_size / 2**20:.1f} MiB "
+                f"({csv_size / parquet_size:.1f}x); "
+                f"write CSV {csv_write:.2f} s, Parquet {parquet_write:.2f} s; "
+                f"scan of {column} CSV {csv_scan * 1000:.0f} ms, "
+                f"Parquet {parquet_scan * 1000:.0f} ms "
+                f"({csv_scan / parquet_scan:.0f}x)"
+            )
+
+
+if __name__ == "__main__":
+    cmd_line_parser = ArgumentParser()
+    cmd_line_parser.add_argument("--rows", type=int, default=1_000_000)
+    cmd_line_parser.add_argument("--repeat", type=int, default=3)
+    args = cmd_line_parser.parse_args()
+    main(args.rows, args.repeat)
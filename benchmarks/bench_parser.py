@@ -0,0 +1,103 @@
+"""
+Micro-benchmark of DatasetParser row handlers
+
+    python -m benchmarks.bench_parser --rows 200000
+"""
+
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.dataset_parser import DatasetParser  # noqa: E402
+from src.utils import get_config  # noqa: E402
+
+CONFIG = get_config(Path(__file__).resolve().parents[1] / "config" / "config.yml")
+FILM_HEADERS = "tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\tendYear\truntimeMinutes\tgenres"
+PRINCIPAL_HEADERS = "tconst\tordering\tnconst\tcategory\tjob\tcharacters"
+GENRES = ["Drama", "Comedy", "Short", "Documentary", "Romance", "Animation"]
+JOBS = ["actor", "actress", "director", "writer", "producer"]
+
+
+def write_datasets(root: Path, rows: int):
+    random.seed(0)
+    with open(root / "title.basics.tsv", "w") as fd:
+        fd.write(f"{FILM_HEADERS}\n")
+        for idx in range(1, rows + 1):
+            genres = ",".join(random.sample(GENRES, 2))
+            fd.write(
+                f"tt{idx:07d}\tmovie\tTitle {idx}\tTitle {idx}\t0\t1990\t\\N\t90\t{genres}\n"
+            )
+    with open(root / "title.principals.tsv", "w") as fd:
+        fd.write(f"{PRINCIPAL_HEADERS}\n")
+        for idx in range(rows):
+            film_id = random.randint(1, rows)
+            job = random.choice(JOBS)
+            fd.write(f"tt{film_id:07d}\t{idx % 10}\tnm{idx:07d}\t{job}\t\\N\t\\N\n")
+
+
+def get_parser(root: Path, quiet: bool) -> DatasetParser:
+    cmd_args = SimpleNamespace(root=root, debug=False, quiet=quiet, shards=None)
+    return DatasetParser(cmd_args, CONFIG)
+
+
+def bench_handler(parser: DatasetParser, table_name: str, dataset_path: Path) -> float:
+    started = time.perf_counter()
+    rows = sum(1 for _ in parser._get_parse_handler(table_name)(dataset_path))
+    return rows / (time.perf_counter() - started)
+
+
+def bench_write(parser: DatasetParser, table_name: str, dataset_path: Path) -> float:
+    output_filename = dataset_path.parent / f"{table_name}.csv"
+    handler = parser._get_parse_handler(table_name)
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        parser._write_normalized_dataset(
+            handler(dataset_path), dataset_path.name, output_filename, table_name
+        )
+    elapsed = time.perf_counter() - started
+    with open(output_filename) as fd:
+        rows = sum(1 for _ in fd)
+    return rows / elapsed
+
+
+def main(rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_datasets(root, rows)
+        films, principals = root / "title.basics.tsv", root / "title.principals.tsv"
+
+        parser = get_parser(root, quiet=True)
+        print(
+            f"_parse_film:      {bench_handler(parser, 'film', films):>10,.0f} rows/s"
+        )
+        for idx in range(rows):
+            parser.indices["person"].add(idx)
+        print(
+            f"_parse_principal: "
+            f"{bench_handler(parser, 'principal', principals):>10,.0f} rows/s"
+        )
+        for quiet in [True, False]:
+            parser = get_parser(root, quiet=quiet)
+            film_rate = bench_write(parser, "film", films)
+            for idx in range(rows):
+                parser.indices["person"].add(idx)
+            principal_rate = bench_write(parser, "principal", principals)
+            mode = "quiet" if quiet else "verbose"
+            print(
+                f"write {mode:<8} film: {film_rate:>10,.0f} rows/s, "
+                f"principal: {principal_rate:>10,.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    cmd_line_parser = ArgumentParser()
+    cmd_line_parser.add_argument("--rows", type=int, default=200_000)
+    main(cmd_line_parser.parse_args().rows)
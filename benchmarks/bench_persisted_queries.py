@@ -0,0 +1,70 @@
+"""
+CPU time spent on query document before execution: parse and validation
+on every request against cached document of persisted query
+
+    python -m benchmarks.bench_persisted_queries --requests 2000
+"""
+
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from graphql.backend import GraphQLCoreBackend  # noqa: E402
+from graphql.validation import validate  # noqa: E402
+
+from src.api.persisted import (  # noqa: E402
+    CachedDocumentBackend,
+    PersistedQueries,
+    get_query_hash,
+)
+from src.schema import schema  # noqa: E402
+
+QUERIES = {
+    "titles": "query Titles($search: String) "
+    "{films(search: $search, limit: 20) {id, title}}",
+    "common persons": "query CommonPersons($titles: [String]) "
+    "{commonPersons(titles: $titles) {name}}",
+    "nested": "{ persons(first: 20) { name cursor films(first: 5) "
+    "{ title startYear genres { genre } rating { averageRating numVotes } } "
+    "principals(first: 5) { job title } } }",
+}
+
+
+def bench_parse_and_validate(query: str, requests: int) -> float:
+    backend = GraphQLCoreBackend()
+    started = time.perf_counter()
+    for _ in range(requests):
+        document = backend.document_from_string(schema, query)
+        validate(schema, document.document_ast)
+    return (time.perf_counter() - started) / requests
+
+
+def bench_persisted(query: str, requests: int) -> float:
+    backend = CachedDocumentBackend()
+    persisted_queries = PersistedQueries()
+    extensions = {"persistedQuery": {"version": 1, "sha256Hash": get_query_hash(query)}}
+    persisted_queries.resolve({"query": query, "extensions": extensions}, {})
+    started = time.perf_counter()
+    for _ in range(requests):
+        data = persisted_queries.resolve({"extensions": extensions}, {})
+        backend.document_from_string(schema, data["query"])
+    return (time.perf_counter() - started) / requests
+
+
+def main(requests: int):
+    for name, query in QUERIES.items():
+        parsed = bench_parse_and_validate(query, requests)
+        persisted = bench_persisted(query, requests)
+        print(
+            f"{name:<15} parse and validate {parsed * 1e6:>8.1f} us, "
+            f"persisted {persisted * 1e6:>6.1f} us, {parsed / persisted:>6.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    cmd_line_parser = ArgumentParser()
+    cmd_line_parser.add_argument("--requests", type=int, default=2000)
+    main(cmd_line_parser.parse_args().requests)
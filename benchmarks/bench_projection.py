@@ -0,0 +1,90 @@
+"""
+Time and peak memory of serializing films with only selected columns loaded,
+against loading whole model instances, on database loaded beforehand
+(e.g. with run.py --load)
+
+    python -m benchmarks.bench_projection --films 5000 --repeat 5
+"""
+
+import statistics
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from pathlib import Path
+from unittest import mock
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from src.schema import MAX_QUERY_LIMIT, ActiveSQLAlchemyObjectType, schema  # noqa: E402
+from src.utils import get_config  # noqa: E402
+
+CONFIG = get_config(ROOT_DIR / "config" / "config.yml")
+QUERY = (
+    "query Films($first: Int, $after: String) "
+    "{ films(first: $first, after: $after) { cursor title startYear } }"
+)
+
+
+def fetch_films(session_factory, films: int) -> int:
+    fetched, after = 0, None
+    with session_factory() as session:
+        while fetched < films:
+            result = schema.execute(
+                QUERY,
+                variables={
+                    "first": min(films - fetched, MAX_QUERY_LIMIT),
+                    "after": after,
+                },
+                context_value={"session": session},
+            )
+            assert result.errors is None, result.errors
+            page = result.data["films"]
+            if not page:
+                break
+            fetched += len(page)
+            after = page[-1]["cursor"]
+    return fetched
+
+
+def bench(session_factory, films: int, repeat: int):
+    timings, peaks, fetched = [], [], 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        fetched = fetch_films(session_factory, films)
+        timings.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return fetched, statistics.median(timings), statistics.median(peaks)
+
+
+def main(films: int, repeat: int, dburi: str):
+    session_factory = sessionmaker(create_engine(dburi))
+    # Warm up connection and caches of compiled statements
+    fetch_films(session_factory, 10)
+    results = {"projected": bench(session_factory, films, repeat)}
+    with mock.patch.object(
+        ActiveSQLAlchemyObjectType,
+        "get_projected_query",
+        classmethod(lambda cls, info: cls.get_query(info)),
+    ):
+        results["instances"] = bench(session_factory, films, repeat)
+    for name, (fetched, elapsed, peak) in results.items():
+        print(
+            f"{name:<10} {fetched} films, {elapsed * 1000:>8.1f} ms, "
+            f"peak memory {peak / 2**20:>6.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    cmd_line_parser = ArgumentParser()
+    cmd_line_parser.add_argument("--films", type=int, default=5000)
+    cmd_line_parser.add_argument("--repeat", type=int, default=5)
+    cmd_line_parser.add_argument("--dburi", default=CONFIG["default_database_uri"])
+    args = cmd_line_parser.parse_args()
+    main(args.films, args.repeat, args.dburi)
@@ -0,0 +1,195 @@
+"""
+Load test of GraphQL endpoint served by Flask app and by ASGI app against
+the same database, loaded beforehand (e.g. with run.py --load).
+Each server runs in its own process, clients keep connections alive
+
+    python -m benchmarks.bench_serving --clients 50 --duration 10
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from argparse import SUPPRESS, ArgumentParser
+from pathlib import Path
+from typing import Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.utils import get_config  # noqa: E402
+
+CONFIG = get_config(ROOT_DIR / "config" / "config.yml")
+SERVERS = ["flask", "asgi"]
+QUERIES = [
+    "{ films(first: 20) { title persons(first: 5) { name } } }",
+    "{ persons(first: 20) { name films(first: 5) { title } } }",
+    "{ principals(first: 50) { name title job } }",
+    "{ film(id: 1) { title genres { genre } rating { averageRating } } }",
+]
+
+
+def serve(server: str, port: int, dburi: str):
+    config = {**CONFIG, "default_database_uri": dburi}
+    if server == "flask":
+        from werkzeug.serving import WSGIRequestHandler, run_simple
+
+        from app import create_app
+
+        # Response cache is disabled, both servers execute every query
+        config["response_cache"] = {**config["response_cache"], "max_size": 0}
+        WSGIRequestHandler.protocol_version = "HTTP/1.1"
+        run_simple("127.0.0.1", port, create_app(config), threaded=True)
+    else:
+        import uvicorn
+
+        from src.api.asgi import create_asgi_app
+
+        uvicorn.run(
+            create_asgi_app(config), port=port, log_level="warning", access_log=False
+        )
+
+
+async def wait_for_port(port: int, timeout: float = 30):
+    started = time.monotonic()
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() - started > timeout:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def post(reader, writer, port: int, body: bytes) -> Tuple[int, bool]:
+    """
+    Sends request over open connection, returns response status and whether
+    server keeps connection open
+    """
+    writer.write(
+        f"POST /graphql HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError
+    keep_alive = status_line.startswith(b"HTTP/1.1")
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "transfer-encoding" and "chunked" in value:
+            chunked = True
+        elif name.lower() == "connection":
+            keep_alive = value.strip().lower() != "close"
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return int(status_line.split()[1]), keep_alive
+
+
+async def run_client(port: int, deadline: float, latencies: list, errors: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    idx = 0
+    try:
+        while time.monotonic() < deadline:
+            body = json.dumps({"query": QUERIES[idx % len(QUERIES)]}).encode()
+            idx += 1
+            started = time.perf_counter()
+            try:
+                status, keep_alive = await post(reader, writer, port, body)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                status, keep_alive = None, False
+            else:
+                latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    finally:
+        writer.close()
+
+
+async def load_test(port: int, clients: int, duration: float):
+    await wait_for_port(port)
+    latencies, errors = [], []
+    # Warm up connection pools and imports
+    await asyncio.gather(
+        *(
+            run_client(port, time.monotonic() + 1, [], [])
+            for _ in range(min(clients, 5))
+        )
+    )
+    started = time.monotonic()
+    await asyncio.gather(
+        *(
+            run_client(port, started + duration, latencies, errors)
+            for _ in range(clients)
+        )
+    )
+    return latencies, errors, time.monotonic() - started
+
+
+def main(clients: int, duration: float, dburi: str, port: int):
+    print(f"{clients} clients, {duration:.0f} s per server")
+    for server in SERVERS:
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_serving",
+                "--serve",
+                server,
+                "--port",
+                str(port),
+                "--dburi",
+                dburi,
+            ],
+            cwd=ROOT_DIR,
+            stderr=subprocess.DEVNULL,
+            env={**os.environ, "PYTHONWARNINGS": "ignore"},
+        )
+        try:
+            latencies, errors, elapsed = asyncio.run(load_test(port, clients, duration))
+        finally:
+            process.terminate()
+            process.wait()
+        if not latencies:
+            print(f"{server:<6} no responses")
+            continue
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{server:<6} {len(latencies) / elapsed:>8,.1f} req/s, latency ms "
+            f"p50 {percentiles[49] * 1000:>7.1f}, p95 {percentiles[94] * 1000:>7.1f}, "
+            f"p99 {percentiles[98] * 1000:>7.1f}, errors {len(errors)}"
+        )
+
+
+if __name__ == "__main__":
+    cmd_line_parser = ArgumentParser()
+    cmd_line_parser.add_argument("--clients", type=int, default=50)
+    cmd_line_parser.add_argument("--duration", type=float, default=10)
+    cmd_line_parser.add_argument("--dburi", default=CONFIG["default_database_uri"])
+    cmd_line_parser.add_argument("--port", type=int, default=8765)
+    cmd_line_parser.add_argument("--serve", choices=SERVERS, help=SUPPRESS)
+    args = cmd_line_parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.port, args.dburi)
+    else:
+        main(args.clients, args.duration, args.dburi, args.port)
@@ -0,0 +1,302 @@
+"""
+Generator of synthetic IMDB-shaped data sets: title.basics, name.basics,
+title.principals and title.ratings TSVs with columns of real ones and their
+skew, at given number of titles
+
+    python -m benchmarks.synthetic --root /tmp/synthetic --films 1000000 --gzip
+
+Distributions roughly follow real data sets:
+- title types: about a third are episodes and videos, filtered out by parser;
+- principals per title are heavy-tailed (Pareto), persons are picked with
+  power-law popularity, so few persons have most of films;
+- about a quarter of titles are rated, votes are heavy-tailed;
+- \\N rates of optional columns, e.g. most persons have no birth year
+"""
+
+import gzip
+import random
+import shutil
+import sys
+from argparse import ArgumentParser
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from src.utils import get_config  # noqa: E402
+
+CONFIG = get_config(ROOT_DIR / "config" / "config.yml")
+NULL = "\\N"
+HEADERS = {
+    "title.basics.tsv": [
+        "tconst",
+        "titleType",
+        "primaryTitle",
+        "originalTitle",
+        "isAdult",
+        "startYear",
+        "endYear",
+        "runtimeMinutes",
+        "genres",
+    ],
+    "name.basics.tsv": [
+        "nconst",
+        "primaryName",
+        "birthYear",
+        "deathYear",
+        "primaryProfession",
+        "knownForTitles",
+    ],
+    "title.principals.tsv": [
+        "tconst",
+        "ordering",
+        "nconst",
+        "category",
+        "job",
+        "characters",
+    ],
+    "title.ratings.tsv": ["tconst", "averageRating", "numVotes"],
+}
+# (value, weight) of categorical columns
+TITLE_TYPES = [
+    ("movie", 25),
+    ("short", 10),
+    ("tvSeries", 8),
+    ("tvMiniSeries", 2),
+    ("tvEpisode", 45),
+    ("video", 6),
+    ("tvMovie", 4),
+]
+GENRES = [
+    ("Drama", 25),
+    ("Comedy", 18),
+    ("Documentary", 12),
+    ("Short", 10),
+    ("Romance", 7),
+    ("Action", 6),
+    ("Thriller", 5),
+    ("Crime", 5),
+    ("Animation", 4),
+    ("Horror", 4),
+    ("Family", 4),
+]
+CATEGORIES = [
+    ("actor", 30),
+    ("actress", 22),
+    ("self", 12),
+    ("director", 9),
+    ("writer", 9),
+    ("producer", 7),
+    ("composer", 3),
+    ("cinematographer", 3),
+    ("editor", 3),
+    ("production_designer", 1),
+    ("archive_footage", 1),
+]
+PROFESSIONS = [el for el, _ in CATEGORIES if el not in ("self", "archive_footage")]
+WORDS = (
+    "love night city last man woman story life world day dark house girl "
+    "blood king secret time lost home war dream heart road summer death "
+    "return little black red star shadow river island"
+).split()
+FIRST_NAMES = "John Mary Anna Peter Maria David Sara Paul Jean Ingrid Hans Yuki".split()
+LAST_NAMES = "Smith Garcia Bergman Kim Rossi Muller Dubois Tanaka Silva Novak".split()
+
+# Rates of \N in optional columns
+NULL_RATES = {
+    "startYear": 0.08,
+    "runtimeMinutes": 0.35,
+    "genres": 0.05,
+    "birthYear": 0.8,
+    "deathYear": 0.9,
+    "primaryProfession": 0.15,
+    "knownForTitles": 0.1,
+    "job": 0.8,
+    "characters": 0.6,
+}
+RATED_RATE = 0.25
+PERSONS_PER_FILM = 1.3
+MAX_PRINCIPALS = 60
+# Shape of Pareto distribution of principals per title, mean is about 4
+PRINCIPALS_ALPHA = 1.2
+
+
+class WeightedChoice:
+    """
+    Picks values by weights, cheaper than random.choices per call
+    """
+
+    def __init__(self, rng: random.Random, values: List[Tuple[str, int]]):
+        self.rng = rng
+        self.values = [el for el, _ in values]
+        self.cum_weights = list(accumulate(weight for _, weight in values))
+
+    def __call__(self, k: int = 1) -> List[str]:
+        return self.rng.choices(self.values, cum_weights=self.cum_weights, k=k)
+
+
+class SyntheticDatasets:
+    """
+    Writes data sets of `films` titles and `persons` persons, the same seed
+    gives the same data sets
+    """
+
+    def __init__(self, films: int, persons: int = None, seed: int = 0):
+        self.films = films
+        self.persons = persons or max(int(films * PERSONS_PER_FILM), 1)
+        self.rng = random.Random(seed)
+        self.title_types = WeightedChoice(self.rng, TITLE_TYPES)
+        self.genres = WeightedChoice(self.rng, GENRES)
+        self.categories = WeightedChoice(self.rng, CATEGORIES)
+
+    def write(self, root: Path, compress: bool = False) -> Dict[str, Path]:
+        """
+        Write all data sets to root
+        :param root: output directory
+        :param compress: gzip data sets, as they are downloaded
+        :return: paths of written files by data set name
+        """
+        writers = {
+            "title.basics.tsv": self.iter_films,
+            "name.basics.tsv": self.iter_persons,
+            "title.principals.tsv": self.iter_principals,
+            "title.ratings.tsv": self.iter_ratings,
+        }
+        paths = {}
+        for name, iter_rows in writers.items():
+            path = root / name
+            with open(path, "w") as fd:
+                fd.write("\t".join(HEADERS[name]) + "\n")
+                fd.writelines("\t".join(row) + "\n" for row in iter_rows())
+            if compress:
+                path = gzip_file(path)
+            paths[name] = path
+        return paths
+
+    def iter_films(self):
+        rng, null = self.rng.random, self._null
+        for idx, title_type in enumerate(self.title_types(self.films), start=1):
+            title = self._get_title()
+            year = NULL if null("startYear") else str(self._get_year())
+            runtime = (
+                NULL
+                if null("runtimeMinutes")
+                else str(max(int(self.rng.gauss(90, 30)), 1))
+            )
+            genres = (
+                NULL
+                if null("genres")
+                else ",".join(dict.fromkeys(self.genres(self.rng.randint(1, 3))))
+            )
+            yield (
+                get_tconst(idx),
+                title_type,
+                title,
+                title,
+                "1" if rng() < 0.02 else "0",
+                year,
+                NULL,
+                runtime,
+                genres,
+            )
+
+    def iter_persons(self):
+        null = self._null
+        for idx in range(1, self.persons + 1):
+            birth_year = NULL if null("birthYear") else str(self._get_year() - 40)
+            death_year = NULL if null("deathYear") else str(self._get_year())
+            professions = (
+                ""
+                if null("primaryProfession")
+                else ",".join(self.rng.sample(PROFESSIONS, self.rng.randint(1, 3)))
+            )
+            known_for = (
+                NULL
+                if null("knownForTitles")
+                else ",".join(
+                    get_tconst(self._get_popular(self.films))
+                    for _ in range(self.rng.randint(1, 4))
+                )
+            )
+            yield (
+                get_nconst(idx),
+                f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)} {idx}",
+                birth_year,
+                death_year,
+                professions,
+                known_for,
+            )
+
+    def iter_principals(self):
+        null = self._null
+        for film_id in range(1, self.films + 1):
+            count = min(int(self.rng.paretovariate(PRINCIPALS_ALPHA)), MAX_PRINCIPALS)
+            for ordering, category in enumerate(self.categories(count), start=1):
+                yield (
+                    get_tconst(film_id),
+                    str(ordering),
+                    get_nconst(self._get_popular(self.persons)),
+                    category,
+                    NULL if null("job") else category,
+                    NULL if null("characters") else f'["{self.rng.choice(WORDS)}"]',
+                )
+
+    def iter_ratings(self):
+        for film_id in range(1, self.films + 1):
+            if self.rng.random() >= RATED_RATE:
+                continue
+            rating = min(max(self.rng.gauss(6.5, 1.3), 1.0), 10.0)
+            votes = min(int(5 * self.rng.paretovariate(1.1)), 3_000_000)
+            yield get_tconst(film_id), f"{rating:.1f}", str(votes)
+
+    def _null(self, column: str) -> bool:
+        return self.rng.random() < NULL_RATES[column]
+
+    def _get_title(self) -> str:
+        return " ".join(self.rng.sample(WORDS, self.rng.randint(1, 4))).title()
+
+    def _get_year(self) -> int:
+        # Most titles are recent ones
+        return max(2024 - int(self.rng.expovariate(1 / 25)), 1890)
+
+    def _get_popular(self, count: int) -> int:
+        # Power-law popularity: low ids are picked much more often
+        return int(count * self.rng.random() ** 3) + 1
+
+
+def get_tconst(idx: int) -> str:
+    return f"tt{idx:07d}"
+
+
+def get_nconst(idx: int) -> str:
+    return f"nm{idx:07d}"
+
+
+def gzip_file(path: Path) -> Path:
+    gzipped = path.with_name(f"{path.name}.{CONFIG['dataset_file_ext']}")
+    with open(path, "rb") as src, gzip.open(gzipped, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    path.unlink()
+    return gzipped
+
+
+if __name__ == "__main__":
+    cmd_line_parser = ArgumentParser()
+    cmd_line_parser.add_argument("--root", "-r", required=True)
+    cmd_line_parser.add_argument("--films", type=int, default=100_000)
+    cmd_line_parser.add_argument("--persons", type=int, default=None)
+    cmd_line_parser.add_argument("--seed", type=int, default=0)
+    cmd_line_parser.add_argument(
+        "--gzip", action="store_true", help="Write gzipped data sets"
+    )
+    args = cmd_line_parser.parse_args()
+    root = Path(args.root)
+    root.mkdir(parents=True, exist_ok=True)
+    for path in (
+        SyntheticDatasets(args.films, args.persons, args.seed)
+        .write(root, args.gzip)
+        .values()
+    ):
+        print(path)
@@ -9,6 +9,10 @@ import Chip from '@material-ui/core/Chip';
 import ApolloClient, {gql} from 'apollo-boost';
 import {debounce, throttle} from "throttle-debounce";
 
+// Query documents are constant, values are passed as variables,
+// so server parses and validates each document once
+const TITLES_QUERY = gql`query Titles($search: String) {films(search: $search, limit: 20) {id, title}}`;
+const COMMON_PERSONS_QUERY = gql`query CommonPersons($titles: [String]) {commonPersons(titles: $titles) {name}}`;
 
 function renderInput(inputProps) {
     const {InputProps, classes, ref, ...other} = inputProps;
@@ -74,13 +78,6 @@ function DownshiftMultiple(props) {
     const [commonPersons, setCommonPersonsValue] = React.useState('');
     const client = new ApolloClient({uri: '/graphql',});
 
-    function getTitlesQuery(searchString) {
-        return gql`{films(search: "%${searchString}%", limit: 20) {id, title}}`
-    }
-
-    function getCommonNamesQuery() {
-        return gql`{commonPersons(titles: ${JSON.stringify(selectedItem)}) {name}}`
-    }
 
     const setTitlesDebounced = throttle(300, debounce(300, setTitles));
 
@@ -90,7 +87,7 @@ function DownshiftMultiple(props) {
             return
         }
         client.query(
-            {query: getTitlesQuery(searchString)}
+            {query: TITLES_QUERY, variables: {search: `%${searchString}%`}}
             ).then(result => {
             let films = result.data.films.map(film => {
                 return {
@@ -103,7 +100,7 @@ function DownshiftMultiple(props) {
 
     function setCommonPersons() {
         client.query(
-            {query: getCommonNamesQuery()}
+            {query: COMMON_PERSONS_QUERY, variables: {titles: selectedItem}}
             ).then(result => {
                 if (!result.data.commonPersons.length) {
                     setCommonPersonsValue(<label>No common persons</label>);
@@ -3,9 +3,12 @@ from os import getcwd
 from os.path import join
 from pathlib import Path
 
-from src.utils import get_config, get_data_sets
+from src.metrics import METRICS, enable_profiling
+from src.progress import PROGRESS, HttpSink, LogSink, TerminalSink
+from src.utils import get_config, get_data_sets, is_embedded
 
 CONFIG = get_config(join(getcwd(), "config", "config.yml"))
+REPORT_FILENAME = "run_report.json"
 
 
 def main(cmd_args):
@@ -24,23 +27,56 @@ def main(cmd_args):
         handler = DataSetsHandler(data_sets)
 
         if cmd_args.download:
-            handler.download()
+            with METRICS.stage("download"):
+                handler.download()
 
         if cmd_args.extract:
-            handler.extract()
+            with METRICS.stage("extract"):
+                handler.extract()
+
+    if cmd_args.stream:
+        from src.dataset_streamer import DatasetStreamer
+
+        streamer = DatasetStreamer(cmd_args, config=CONFIG)
+        with METRICS.stage("stream"):
+            streamer.stream_dataset()
 
     if cmd_args.parse:
         from src.dataset_parser import DatasetParser
 
-        parser = DatasetParser(cmd_args, config=CONFIG)
-        parser.parse_dataset()
+        parser = DatasetParser(
+            cmd_args, config={**CONFIG, "output_format": cmd_args.format}
+        )
+        with METRICS.stage("parse"):
+            parser.parse_dataset()
+
+    if cmd_args.load and is_embedded(cmd_args.dburi):
+        from src.embedded import EmbeddedLoader
+
+        loader = EmbeddedLoader(cmd_args, config=CONFIG)
+        with METRICS.stage("load"):
+            loader.db_init()
+            loader.load_dataset()
 
-    if cmd_args.load:
+    elif cmd_args.load:
         from src.dataset_loader import DatasetLoader
 
         loader = DatasetLoader(cmd_args, config=CONFIG)
-        loader.db_init()
-        loader.load_dataset()
+        with METRICS.stage("load"):
+            loader.db_init()
+            if cmd_args.incremental:
+                loader.refresh_dataset()
+            else:
+                loader.load_dataset()
+
+    if cmd_args.refresh:
+        from src.dataset_loader import DatasetLoader
+
+        loader = DatasetLoader(cmd_args, config=CONFIG)
+        with METRICS.stage("refresh"):
+            loader.db_init()
+            loader.refresh_views(concurrently=True)
+            loader.bump_dataset_version()
 
 
 if __name__ == "__main__":
@@ -56,7 +92,31 @@ if __name__ == "__main__":
     cmd_line_parser.add_argument("--parse", "-p", action="store_true")
     cmd_line_parser.add_argument("--load", "-l", action="store_true")
     cmd_line_parser.add_argument(
-        "--dburi", "-db", default=CONFIG["default_database_uri"], help="Database URI"
+        "--stream",
+        "-s",
+        action="store_true",
+        help="Parse gzipped data sets and copy them to database without "
+        "intermediate files (replaces --extract, --parse and --load)",
+    )
+    cmd_line_parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="Parse each data set in SHARDS parallel processes",
+    )
+    cmd_line_parser.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default=CONFIG["output_format"],
+        help="Output format of parsed data sets: tab-delimited text or typed, "
+        "compressed Parquet files (requires pyarrow), both are loaded by --load",
+    )
+    cmd_line_parser.add_argument(
+        "--dburi",
+        "-db",
+        default=CONFIG["default_database_uri"],
+        help="Database URI, sqlite:///PATH loads data sets into single-file "
+        "database served read-only",
     )
     cmd_line_parser.add_argument(
         "--resume",
@@ -64,11 +124,88 @@ if __name__ == "__main__":
         default=None,
         help="Start parsing not from first table",
     )
+    cmd_line_parser.add_argument(
+        "--incremental",
+        "-i",
+        action="store_true",
+        help="Apply only changes between parsed data sets and loaded tables",
+    )
+    cmd_line_parser.add_argument(
+        "--bulk",
+        "-b",
+        action="store_true",
+        help="Load into UNLOGGED tables without indexes and constraints, "
+        "create them after load",
+    )
+    cmd_line_parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Refresh materialized views (adjacency, film summary) of loaded "
+        "tables without blocking readers, e.g. after tables were changed by hand",
+    )
+    cmd_line_parser.add_argument(
+        "--report",
+        default=None,
+        help=f"Path of JSON report of run: wall time, CPU time, rows, bytes and "
+        f"peak RSS of every stage (default: ROOT/{REPORT_FILENAME})",
+    )
+    cmd_line_parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        default=None,
+        help="Profile every stage with cProfile and write its stats to DIR",
+    )
+    cmd_line_parser.add_argument(
+        "--progress-log",
+        metavar="FILE",
+        default=None,
+        help="Log progress of stages (percent, rate and ETA) to FILE",
+    )
+    cmd_line_parser.add_argument(
+        "--progress-port",
+        metavar="PORT",
+        type=int,
+        default=None,
+        help="Serve progress of stages as JSON at http://127.0.0.1:PORT/progress",
+    )
     cmd_line_parser.add_argument("--debug", "-dd", action="store_true")
     cmd_line_parser.add_argument("--quiet", "-q", action="store_true")
     args = cmd_line_parser.parse_args()
+    if args.stream and (args.extract or args.parse or args.load or args.resume):
+        cmd_line_parser.error(
+            "--stream can't be combined with --extract, --parse, --load or --resume"
+        )
+    if args.incremental and (not args.load or args.resume):
+        cmd_line_parser.error("--incremental requires --load and excludes --resume")
+    if args.bulk and (not args.load or args.resume or args.incremental):
+        cmd_line_parser.error(
+            "--bulk requires --load and excludes --resume and --incremental"
+        )
+    if is_embedded(args.dburi) and (
+        args.stream or args.resume or args.incremental or args.bulk or args.refresh
+    ):
+        cmd_line_parser.error(
+            "embedded database is only built from scratch by --load, it excludes "
+            "--stream, --resume, --incremental, --bulk and --refresh"
+        )
     print(args)
-    main(args)
+    if args.profile:
+        enable_profiling(Path(args.profile))
+    if not args.quiet:
+        PROGRESS.add_sink(TerminalSink())
+    if args.progress_log:
+        PROGRESS.add_sink(LogSink(Path(args.progress_log)))
+    if args.progress_port is not None:
+        PROGRESS.add_sink(HttpSink(args.progress_port))
+    report = Path(args.report or Path(args.root) / REPORT_FILENAME)
+    try:
+        main(args)
+    finally:
+        PROGRESS.close()
+        # Report is written for failed run too, failed stage keeps its error
+        METRICS.write_report(report)
+        if not args.quiet:
+            print(f"Run report is written to '{report}'")
 
 # TODO: implement click for better cli experience
 # TODO: implement alembic, invoke
@@ -0,0 +1,161 @@
+import json
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+import src.models as models
+from src.expressions import SQLITE
+
+MAX_DEGREES = 6
+
+PERSON_FILMS = "person_films"
+FILM_PERSONS = "film_persons"
+
+# Materialized views built by loader from person_film table:
+# view name -> (key column, adjacent column, column of sorted adjacent ids)
+ADJACENCY_VIEWS = {
+    PERSON_FILMS: ("person_id", "film_id", "film_ids"),
+    FILM_PERSONS: ("film_id", "person_id", "person_ids"),
+}
+
+
+def get_view_definition(view_name: str) -> str:
+    key, adjacent, adjacent_ids = ADJACENCY_VIEWS[view_name]
+    return (
+        f"SELECT {key}, array_agg({adjacent} ORDER BY {adjacent}) AS {adjacent_ids} "
+        f"FROM {models.PersonFilm.name} "
+        f"WHERE {key} IS NOT NULL AND {adjacent} IS NOT NULL GROUP BY {key}"
+    )
+
+
+def get_embedded_definition(view_name: str) -> str:
+    """
+    Returns query of adjacency table of embedded database, which holds
+    sorted adjacent ids as JSON array
+    """
+    key, adjacent, adjacent_ids = ADJACENCY_VIEWS[view_name]
+    return (
+        f"SELECT {key}, json_group_array({adjacent}) AS {adjacent_ids} "
+        f"FROM (SELECT {key}, {adjacent} FROM {models.PersonFilm.name} "
+        f"WHERE {key} IS NOT NULL AND {adjacent} IS NOT NULL "
+        f"ORDER BY {key}, {adjacent}) GROUP BY {key}"
+    )
+
+
+def get_adjacent(session, view_name: str, ids: Iterable[int]) -> Dict[int, List[int]]:
+    """
+    Returns sorted adjacent ids of given ids, single query by primary key
+    :param session: Session object
+    :param view_name: name of adjacency view
+    :param ids: person ids for person_films view, film ids for film_persons view
+    :return: dict of id -> sorted adjacent ids
+    """
+    key, _, adjacent_ids = ADJACENCY_VIEWS[view_name]
+    if session.get_bind().dialect.name == SQLITE:
+        # Ids are bound as single JSON array, any number of them
+        rows = session.execute(
+            text(
+                f"SELECT {key}, {adjacent_ids} FROM {view_name} "
+                f"WHERE {key} IN (SELECT value FROM json_each(:ids))"
+            ),
+            {"ids": json.dumps(list(ids))},
+        )
+        return {el: json.loads(adjacent) for el, adjacent in rows}
+    rows = session.execute(
+        text(f"SELECT {key}, {adjacent_ids} FROM {view_name} WHERE {key} = ANY(:ids)"),
+        {"ids": list(ids)},
+    )
+    return dict(rows.fetchall())
+
+
+def get_common_ids(session, view_name: str, groups: List[Set[int]]) -> List[int]:
+    """
+    Returns ids adjacent to at least one id of every group, e.g. films of
+    persons given by names, when several persons have the same name.
+    Adjacent id arrays are intersected starting from the shortest
+    :param session: Session object
+    :param view_name: name of adjacency view
+    :param groups: list of id groups
+    :return: sorted list of common adjacent ids
+    """
+    if not groups or not all(groups):
+        return []
+    adjacent = get_adjacent(session, view_name, set().union(*groups))
+    group_ids = sorted(
+        (set().union(*(adjacent.get(el, ()) for el in group)) for group in groups),
+        key=len,
+    )
+    common = group_ids[0]
+    for ids in group_ids[1:]:
+        if not common:
+            break
+        common = common.intersection(ids)
+    return sorted(common)
+
+
+def find_path(
+    session, source: int, target: int, max_degrees: int = MAX_DEGREES
+) -> Optional[Tuple[List[int], List[int]]]:
+    """
+    Find shortest chain of persons between source and target person, where
+    neighbours appear in the same film. Bidirectional breadth-first search,
+    side with smaller frontier is expanded, each expansion takes two queries
+    :param session: Session object
+    :param source: id of source person
+    :param target: id of target person
+    :param max_degrees: max number of films in chain
+    :return: (person ids, film ids linking them) or None if there is no chain
+    """
+    if source == target:
+        return [source], []
+    # person -> (previous person, film linking them, degree) on each side
+    parents = ({source: (None, None, 0)}, {target: (None, None, 0)})
+    frontiers = [[source], [target]]
+    degrees = [0, 0]
+    seen_films = (set(), set())
+
+    for _ in range(max_degrees):
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        visited, other = parents[side], parents[1 - side]
+        degrees[side] += 1
+
+        film_sources = {}
+        films = get_adjacent(session, PERSON_FILMS, frontiers[side])
+        for person in frontiers[side]:
+            for film in films.get(person, ()):
+                if film not in seen_films[side]:
+                    seen_films[side].add(film)
+                    film_sources[film] = person
+        if not film_sources:
+            return None
+
+        frontier, meetings = [], []
+        for film, persons in get_adjacent(session, FILM_PERSONS, film_sources).items():
+            for person in persons:
+                if person not in visited:
+                    visited[person] = (film_sources[film], film, degrees[side])
+                    frontier.append(person)
+                    if person in other:
+                        meetings.append(person)
+        if meetings:
+            meeting = min(meetings, key=lambda el: other[el][2])
+            return _build_path(parents, meeting)
+        frontiers[side] = frontier
+    return None
+
+
+def _build_path(parents, meeting: int) -> Tuple[List[int], List[int]]:
+    chains = []
+    for side_parents in parents:
+        persons, films = [meeting], []
+        person, film, _ = side_parents[meeting]
+        while person is not None:
+            persons.append(person)
+            films.append(film)
+            person, film, _ = side_parents[person]
+        chains.append((persons, films))
+    (source_persons, source_films), (target_persons, target_films) = chains
+    return (
+        source_persons[::-1] + target_persons[1:],
+        source_films[::-1] + target_films,
+    )
@@ -0,0 +1,132 @@
+import contextlib
+import json
+from typing import Dict
+
+from anyio import CapacityLimiter, to_thread
+from graphql.error import GraphQLError, GraphQLSyntaxError, format_error
+from graphql_server import HttpQueryError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from src.api.complexity import get_query_cost, get_rejection
+from src.api.persisted import CachedDocumentBackend, get_persisted_queries
+from src.embedded import get_engine_options
+from src.schema import schema
+from src.utils import is_embedded
+
+
+def create_asgi_app(config: Dict) -> Starlette:
+    """
+    Returns ASGI application, serving the same schema as Flask application.
+    Requests are parsed and checked on event loop, queries are executed by
+    bounded pool of worker threads, each with its own database connection,
+    so number of open client connections isn't limited by number of workers.
+    Embedded database is served by read-only connections, which have no
+    statement timeout.
+    Resolvers and data loaders of graphene 2 are synchronous, their promises
+    keep state per thread, so execution can't be interleaved on event loop
+    :param config: app config, `asgi` section configures workers and
+    database connection pool
+    :return: Starlette application
+    """
+    asgi_config = config["asgi"]
+    db_uri = config["default_database_uri"]
+    pool_options = dict(
+        pool_size=asgi_config["workers"],
+        max_overflow=0,
+        pool_timeout=asgi_config["pool_timeout"],
+    )
+    if is_embedded(db_uri):
+        engine = create_engine(
+            **get_engine_options(db_uri, config["embedded"]), **pool_options
+        )
+    else:
+        engine = create_engine(
+            db_uri,
+            **pool_options,
+            pool_recycle=asgi_config["pool_recycle"],
+            pool_pre_ping=True,
+            connect_args={
+                "options": f"-c statement_timeout={asgi_config['statement_timeout']}"
+            },
+        )
+    session_factory = sessionmaker(engine, autoflush=False)
+    limiter = CapacityLimiter(asgi_config["workers"])
+    backend = CachedDocumentBackend(config["persisted_queries"]["document_cache_size"])
+    persisted_queries = get_persisted_queries(config)
+    max_cost = config["query_limits"]["max_cost"]
+    max_depth = config["query_limits"]["max_depth"]
+
+    async def graphql(request: Request):
+        if request.method == "GET":
+            data = dict(request.query_params)
+        else:
+            try:
+                data = await request.json()
+            except ValueError:
+                return get_error_response("POST body sent invalid JSON.")
+        if not isinstance(data, dict):
+            return get_error_response("Batch queries aren't supported.")
+        try:
+            data = persisted_queries.resolve(data, request.query_params)
+        except HttpQueryError as error:
+            return JSONResponse(
+                {"errors": [{"message": error.message}]}, status_code=error.status_code
+            )
+
+        query = data.get("query")
+        variables = data.get("variables")
+        operation_name = data.get("operationName")
+        if isinstance(variables, str):
+            try:
+                variables = json.loads(variables)
+            except ValueError:
+                return get_error_response("Variables are invalid JSON.")
+        if not query:
+            return get_error_response("Must provide query string.")
+        try:
+            document = backend.document_from_string(schema, query)
+        except GraphQLSyntaxError as error:
+            return JSONResponse({"errors": [format_error(error)]}, status_code=400)
+
+        rejection = get_rejection(
+            get_query_cost(schema, document.document_ast, variables, operation_name),
+            max_cost,
+            max_depth,
+        )
+        if rejection is not None:
+            return JSONResponse(rejection, status_code=400)
+
+        def execute():
+            with session_factory() as session:
+                return document.execute(
+                    variable_values=variables,
+                    operation_name=operation_name,
+                    context_value={"session": session},
+                )
+
+        result = await to_thread.run_sync(execute, limiter=limiter)
+        body = {"data": result.data}
+        if result.errors:
+            body["errors"] = [format_error(el) for el in result.errors]
+        return JSONResponse(body, status_code=400 if result.invalid else 200)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(_app):
+        yield
+        engine.dispose()
+
+    return Starlette(
+        routes=[Route("/graphql", graphql, methods=["GET", "POST"])],
+        lifespan=lifespan,
+    )
+
+
+def get_error_response(message: str) -> JSONResponse:
+    return JSONResponse(
+        {"errors": [format_error(GraphQLError(message))]}, status_code=400
+    )
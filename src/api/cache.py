@@ -0,0 +1,86 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+import src.models as models
+
+CACHE_MAX_SIZE = 10_000
+CACHE_TTL = 3600
+VERSION_CHECK_INTERVAL = 5
+
+
+class CacheBackend(ABC):
+    """
+    Interface of response cache backend, implement it to keep responses
+    outside of the process (e.g. in Redis shared by all app instances)
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        pass
+
+
+class ResponseCache(CacheBackend):
+    """
+    In-process LRU cache, bounded by number of entries, each entry expires
+    after `ttl` seconds
+    """
+
+    def __init__(self, max_size: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DatasetVersion:
+    """
+    Version stamp of loaded data set, bumped by loader after each load.
+    Database is asked for it at most once per `check_interval` seconds
+    """
+
+    def __init__(self, check_interval: float = VERSION_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._version = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def get(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            if self._checked is None or now - self._checked >= self.check_interval:
+                self._version = (
+                    models.db.session.query(models.DatasetVersionModel.version)
+                    .filter(models.DatasetVersionModel.id == 1)
+                    .scalar()
+                ) or 0
+                self._checked = now
+            return self._version
@@ -0,0 +1,196 @@
+from typing import Dict, NamedTuple, Optional
+
+from graphql.language import ast
+from graphql.type import GraphQLList, GraphQLNonNull, GraphQLObjectType
+
+from src.schema import MAX_QUERY_LIMIT, QUERY_LIMIT
+
+MAX_QUERY_COST = 10_000
+MAX_QUERY_DEPTH = 10
+
+# Estimated length of lists without page size arguments
+LIST_SIZE = 10
+LIST_SIZES = {"Query.film": 1, "Query.person": 1}
+
+# Cost of resolving field once, object fields cost 1 and scalars 0 by default
+FIELD_COSTS = {
+    "Query.commonFilms": 10,
+    "Query.commonPersons": 10,
+    "Query.degreesOfSeparation": 500,
+}
+
+PAGE_SIZE_ARGUMENTS = ("first", "limit")
+
+
+class QueryCost(NamedTuple):
+    cost: int
+    depth: int
+
+
+class QueryCostEstimator:
+    """
+    Estimates cost of GraphQL query before it's executed. Each field costs its
+    weight times number of times it's resolved, which is product of page sizes
+    of enclosing lists, so `films(first: 100) { persons(first: 100) { id } }`
+    costs 1 + 100 * 1. Depth is number of nested selection sets
+    """
+
+    def __init__(self, schema, variables: Optional[Dict] = None):
+        """
+        :param schema: GraphQL schema
+        :param variables: query variables, used to resolve page sizes
+        """
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {}
+
+    def estimate(
+        self, document: ast.Document, operation_name: Optional[str] = None
+    ) -> QueryCost:
+        """
+        :param document: parsed query
+        :param operation_name: name of executed operation
+        :return: QueryCost of operation, zero cost for unknown operation
+        """
+        operations = []
+        for definition in document.definitions:
+            if isinstance(definition, ast.FragmentDefinition):
+                self.fragments[definition.name.value] = definition
+            elif isinstance(definition, ast.OperationDefinition):
+                operations.append(definition)
+
+        for operation in operations:
+            name = operation.name and operation.name.value
+            if operation_name is None or name == operation_name:
+                root_type = {
+                    "query": self.schema.get_query_type(),
+                    "mutation": self.schema.get_mutation_type(),
+                    "subscription": self.schema.get_subscription_type(),
+                }[operation.operation]
+                if root_type is None:
+                    break
+                return self._estimate_selections(
+                    operation.selection_set, root_type, 1, frozenset()
+                )
+        return QueryCost(0, 0)
+
+    def _estimate_selections(
+        self, selection_set, parent_type, multiplier: int, fragments: frozenset
+    ) -> QueryCost:
+        cost, depth = 0, 0
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                selection_cost = self._estimate_field(
+                    selection, parent_type, multiplier, fragments
+                )
+            elif isinstance(selection, ast.InlineFragment):
+                selection_cost = self._estimate_fragment(
+                    selection, parent_type, multiplier, fragments
+                )
+            else:
+                name = selection.name.value
+                if name in fragments or name not in self.fragments:
+                    continue
+                selection_cost = self._estimate_fragment(
+                    self.fragments[name], parent_type, multiplier, fragments | {name}
+                )
+            cost += selection_cost.cost
+            depth = max(depth, selection_cost.depth)
+        return QueryCost(cost, depth)
+
+    def _estimate_fragment(
+        self, fragment, parent_type, multiplier: int, fragments: frozenset
+    ) -> QueryCost:
+        if fragment.type_condition is not None:
+            parent_type = (
+                self.schema.get_type(fragment.type_condition.name.value) or parent_type
+            )
+        return self._estimate_selections(
+            fragment.selection_set, parent_type, multiplier, fragments
+        )
+
+    def _estimate_field(
+        self, field: ast.Field, parent_type, multiplier: int, fragments: frozenset
+    ) -> QueryCost:
+        name = field.name.value
+        # Introspection is answered from schema, without database queries
+        if name.startswith("__") or not isinstance(parent_type, GraphQLObjectType):
+            return QueryCost(0, 0)
+        field_def = parent_type.fields.get(name)
+        if field_def is None:
+            return QueryCost(0, 0)
+
+        field_type, is_list = field_def.type, False
+        while isinstance(field_type, (GraphQLList, GraphQLNonNull)):
+            is_list = is_list or isinstance(field_type, GraphQLList)
+            field_type = field_type.of_type
+
+        key = f"{parent_type.name}.{name}"
+        weight = FIELD_COSTS.get(key, int(isinstance(field_type, GraphQLObjectType)))
+        cost = multiplier * weight
+        if field.selection_set is None:
+            return QueryCost(cost, 0)
+
+        size = 1
+        if is_list:
+            if any(arg in field_def.args for arg in PAGE_SIZE_ARGUMENTS):
+                size = self._get_page_size(field)
+            else:
+                size = LIST_SIZES.get(key, LIST_SIZE)
+        nested = self._estimate_selections(
+            field.selection_set, field_type, multiplier * size, fragments
+        )
+        return QueryCost(cost + nested.cost, nested.depth + 1)
+
+    def _get_page_size(self, field: ast.Field) -> int:
+        arguments = {el.name.value: el.value for el in field.arguments or []}
+        for name in PAGE_SIZE_ARGUMENTS:
+            value = arguments.get(name)
+            if isinstance(value, ast.Variable):
+                value = self.variables.get(value.name.value)
+            elif isinstance(value, ast.IntValue):
+                value = int(value.value)
+            else:
+                value = None
+            if isinstance(value, int):
+                return min(max(value, 0), MAX_QUERY_LIMIT)
+        return QUERY_LIMIT
+
+
+def get_query_cost(
+    schema,
+    document: ast.Document,
+    variables: Optional[Dict] = None,
+    operation_name: Optional[str] = None,
+) -> QueryCost:
+    return QueryCostEstimator(schema, variables).estimate(document, operation_name)
+
+
+def get_rejection(
+    query_cost: QueryCost,
+    max_cost: int = MAX_QUERY_COST,
+    max_depth: int = MAX_QUERY_DEPTH,
+) -> Optional[Dict]:
+    """
+    Returns response body rejecting query over the limits, reporting its cost
+    in extensions, or None when query is within the limits
+    """
+    cost, depth = query_cost
+    errors = []
+    if depth > max_depth:
+        errors.append(f"Query depth {depth} exceeds maximum depth {max_depth}")
+    if cost > max_cost:
+        errors.append(f"Query cost {cost} exceeds maximum cost {max_cost}")
+    if not errors:
+        return None
+    return {
+        "errors": [{"message": el} for el in errors],
+        "extensions": {
+            "cost": {
+                "requested": cost,
+                "maximum": max_cost,
+                "depth": depth,
+                "maximumDepth": max_depth,
+            }
+        },
+    }
@@ -0,0 +1,163 @@
+import hashlib
+import json
+from functools import partial
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+from graphql.backend.base import GraphQLDocument
+from graphql.backend.core import GraphQLCoreBackend, execute_and_validate
+from graphql.execution import ExecutionResult
+from graphql.validation import validate
+from graphql_server import HttpQueryError
+
+from src.api.cache import ResponseCache
+
+DOCUMENT_CACHE_SIZE = 1000
+PERSISTED_QUERIES_MAX_SIZE = 10_000
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+
+
+def get_query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def get_invalid_result(errors, *_args, **_kwargs) -> ExecutionResult:
+    return ExecutionResult(errors=errors, invalid=True)
+
+
+class CachedDocumentBackend(GraphQLCoreBackend):
+    """
+    GraphQL backend, which parses and validates each distinct query once and
+    keeps documents in LRU cache, so repeated queries are only executed.
+    Documents are never mutated by execution, so they are shared by requests
+    """
+
+    def __init__(self, max_size: int = DOCUMENT_CACHE_SIZE, executor=None):
+        super().__init__(executor)
+        self.documents = ResponseCache(max_size=max_size, ttl=float("inf"))
+
+    def document_from_string(self, schema, document_string) -> GraphQLDocument:
+        if not isinstance(document_string, str):
+            return super().document_from_string(schema, document_string)
+        document = self.documents.get(document_string)
+        if document is not None:
+            return document
+
+        document_ast = (
+            super().document_from_string(schema, document_string).document_ast
+        )
+        errors = validate(schema, document_ast)
+        if errors:
+            execute = partial(get_invalid_result, errors)
+        else:
+            execute = partial(
+                execute_and_validate,
+                schema,
+                document_ast,
+                validate=False,
+                **self.execute_params,
+            )
+        document = GraphQLDocument(schema, document_string, document_ast, execute)
+        self.documents.set(document_string, document)
+        return document
+
+
+class PersistedQueries:
+    """
+    Registry of queries by sha256 hash of query text. Clients send hash in
+    `extensions.persistedQuery.sha256Hash` instead of query (automatic
+    persisted queries protocol): unknown hash gets PersistedQueryNotFound
+    error, then client sends both hash and query, which registers query.
+    Queries of manifest are always known; with `allow_only_persisted` only
+    they are executed and nothing is registered
+    """
+
+    def __init__(
+        self,
+        manifest: Optional[Dict[str, str]] = None,
+        max_size: int = PERSISTED_QUERIES_MAX_SIZE,
+        allow_only_persisted: bool = False,
+    ):
+        """
+        :param manifest: dict of hash -> query, allowed queries of frontend build
+        :param max_size: max number of registered queries, least recently used
+        are dropped
+        :param allow_only_persisted: reject queries missing in manifest
+        """
+        self.manifest = manifest or {}
+        self.registered = ResponseCache(max_size=max_size, ttl=float("inf"))
+        self.allow_only_persisted = allow_only_persisted
+
+    @staticmethod
+    def load_manifest(path: Path) -> Dict[str, str]:
+        """
+        Loads manifest, JSON file with dict of sha256 hash -> query
+        or list of queries
+        :param path: path to manifest
+        :return: dict of hash -> query
+        """
+        with open(path) as fd:
+            content = json.load(fd)
+        if isinstance(content, list):
+            return {get_query_hash(el): el for el in content}
+        for query_hash, query in content.items():
+            if get_query_hash(query) != query_hash:
+                raise ValueError(
+                    f"Hash {query_hash} of manifest {path} doesn't match query"
+                )
+        return dict(content)
+
+    def get(self, query_hash: str) -> Optional[str]:
+        return self.manifest.get(query_hash) or self.registered.get(query_hash)
+
+    def resolve(self, data: Dict, query_data: Mapping) -> Dict:
+        """
+        Returns request data with query of persisted query hash
+        :param data: request body
+        :param query_data: request query string parameters
+        :return: request data with `query`
+        :raises HttpQueryError: for unknown hash or query which isn't allowed
+        """
+        query = data.get("query") or query_data.get("query")
+        extensions = data.get("extensions") or query_data.get("extensions") or {}
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpQueryError(400, "Extensions are invalid JSON.")
+        persisted_query = extensions.get("persistedQuery") or {}
+        query_hash = persisted_query.get("sha256Hash")
+
+        if query_hash is None:
+            if self.allow_only_persisted and query:
+                if get_query_hash(query) not in self.manifest:
+                    raise HttpQueryError(400, "Query isn't persisted.")
+            return data
+
+        if not query:
+            query = self.get(query_hash)
+            if query is None:
+                raise HttpQueryError(200, PERSISTED_QUERY_NOT_FOUND)
+            return {**data, "query": query}
+
+        if get_query_hash(query) != query_hash:
+            raise HttpQueryError(400, "Provided sha256Hash doesn't match query.")
+        if query_hash not in self.manifest:
+            if self.allow_only_persisted:
+                raise HttpQueryError(400, "Query isn't persisted.")
+            self.registered.set(query_hash, query)
+        return data
+
+
+def get_persisted_queries(config: Dict) -> PersistedQueries:
+    """
+    :param config: app config with `persisted_queries` section
+    :return: PersistedQueries with manifest of config
+    """
+    persisted_config = config["persisted_queries"]
+    manifest = persisted_config["manifest"]
+    return PersistedQueries(
+        manifest=PersistedQueries.load_manifest(Path(manifest)) if manifest else None,
+        max_size=persisted_config["max_size"],
+        allow_only_persisted=persisted_config["allow_only_persisted"],
+    )
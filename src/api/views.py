@@ -0,0 +1,148 @@
+import hashlib
+import json
+from typing import Optional, Tuple
+
+from flask import Response, request
+from flask_graphql import GraphQLView
+from graphql import print_ast
+from graphql.backend import get_default_backend
+from graphql.error import GraphQLSyntaxError
+from graphql.language.ast import Document
+from graphql_server import HttpQueryError, RequestParams, get_graphql_params
+
+from src.api.cache import CacheBackend, DatasetVersion
+from src.api.persisted import PersistedQueries
+from src.api.complexity import (
+    MAX_QUERY_COST,
+    MAX_QUERY_DEPTH,
+    get_query_cost,
+    get_rejection,
+)
+
+
+class PersistedGraphQLView(GraphQLView):
+    """
+    GraphQL view, which resolves persisted queries sent by hash, see
+    PersistedQueries. Use with CachedDocumentBackend, so persisted queries
+    are parsed and validated once
+    """
+
+    persisted_queries: PersistedQueries = None
+    _body = None
+
+    def parse_body(self):
+        if self._body is None:
+            data = super().parse_body()
+            if self.persisted_queries is not None and isinstance(data, dict):
+                data = self.persisted_queries.resolve(data, request.args)
+            self._body = data
+        return self._body
+
+
+class LimitedGraphQLView(PersistedGraphQLView):
+    """
+    GraphQL view, which estimates cost and depth of query before execution
+    and rejects queries over the limits, reporting estimated cost in
+    response extensions
+    """
+
+    max_cost: int = MAX_QUERY_COST
+    max_depth: int = MAX_QUERY_DEPTH
+    _parsed = ()
+
+    def dispatch_request(self):
+        parsed = self._parse_request()
+        if parsed is not None:
+            params, document = parsed
+            rejection = get_rejection(
+                get_query_cost(
+                    self.schema, document, params.variables, params.operation_name
+                ),
+                self.max_cost,
+                self.max_depth,
+            )
+            if rejection is not None:
+                return Response(
+                    json.dumps(rejection), status=400, content_type="application/json"
+                )
+        return super().dispatch_request()
+
+    def _parse_request(self) -> Optional[Tuple[RequestParams, Document]]:
+        """
+        Returns parameters and parsed query of request, parsed once per request
+        (view is instantiated for each request). GraphiQL page requested with
+        query runs it as well, so it's parsed too. None for requests without
+        query (e.g. empty GraphiQL page), batches and queries which fail to
+        parse, those are handled by GraphQLView as is
+        """
+        if self._parsed != ():
+            return self._parsed
+        parsed = None
+        if request.method.lower() in ["get", "post"]:
+            try:
+                data = self.parse_body()
+                if isinstance(data, dict):
+                    params = get_graphql_params(data, request.args)
+                    if params.query:
+                        backend = self.get_backend() or get_default_backend()
+                        document = backend.document_from_string(
+                            self.schema, params.query
+                        )
+                        parsed = params, document.document_ast
+            except (HttpQueryError, GraphQLSyntaxError):
+                pass
+        self._parsed = parsed
+        return parsed
+
+
+class CachedGraphQLView(LimitedGraphQLView):
+    """
+    GraphQL view, which caches successful responses by normalized query,
+    variables, operation name and version of loaded data set, so new load
+    makes all cached responses stale at once
+    """
+
+    cache: CacheBackend = None
+    dataset_version: DatasetVersion = None
+
+    def dispatch_request(self):
+        key = self._get_cache_key()
+        if key is None:
+            return super().dispatch_request()
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return Response(cached, status=200, content_type="application/json")
+
+        response = super().dispatch_request()
+        if response.status_code == 200:
+            body = response.get_data(as_text=True)
+            if "errors" not in json.loads(body):
+                self.cache.set(key, body)
+        return response
+
+    def _get_cache_key(self) -> Optional[str]:
+        """
+        Returns cache key of request, or None when request isn't cached
+        """
+        if self.cache is None:
+            return None
+        # GraphiQL page embeds result into HTML, only JSON responses are cached
+        if request.method.lower() == "get" and self.should_display_graphiql():
+            return None
+        parsed = self._parse_request()
+        if parsed is None:
+            return None
+        params, document = parsed
+
+        content = json.dumps(
+            [
+                self.dataset_version.get(),
+                print_ast(document),
+                params.variables,
+                params.operation_name,
+                bool(self.pretty or request.args.get("pretty")),
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
@@ -1,57 +1,370 @@
-import gzip
+import hashlib
+import json
 import os
-import shutil
+import queue
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
 from multiprocessing import Pool, cpu_count
 from os.path import exists
-from typing import List
+from pathlib import Path
+from typing import List, Optional, Tuple
 
 import requests
-from rich.progress import track
-from tqdm.auto import tqdm
 
+from src.metrics import METRICS, StageRecord, measure
+from src.progress import PROGRESS, Task
 from src.utils import DataSet
 
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Downloaded bytes are flushed and recorded in state file once per this size
+DOWNLOAD_SAVE_SIZE = 16 << 20
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_TIMEOUT = 60
+RANGE_MIN_SIZE = 64 << 20
+RANGE_PARTS = 4
+STATE_SUFFIX = ".download"
+MD5_ETAG_PATTERN = re.compile('^"?([0-9a-f]{32})"?$')
+EXTRACT_BLOCK_SIZE = 1 << 20
+EXTRACT_QUEUE_SIZE = 8
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def get_state_path(data_set: DataSet) -> Path:
+    return Path(f"{data_set.gzipped}{STATE_SUFFIX}")
+
+
+def get_extract_progress_name(data_set: DataSet) -> str:
+    return f"Extracting '{data_set.gzipped.name}'"
+
+
+class DownloadState:
+    """
+    Download state of one data set, persisted next to downloaded file.
+    File is fetched as byte ranges, each range remembers how many bytes
+    are already flushed to file, so interrupted download resumes where it
+    stopped. Bytes written since last flush are pending and aren't saved
+    """
+
+    def __init__(self, path: Path, remote: dict, ranges: List[List[int]]):
+        self.path = path
+        self.remote = remote
+        self.ranges = ranges
+        self.pending = [0] * len(ranges)
+        self.complete = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["DownloadState"]:
+        try:
+            with open(path) as fd:
+                content = json.load(fd)
+        except (OSError, ValueError):
+            return None
+        state = cls(path, content["remote"], content["ranges"])
+        state.complete = content["complete"]
+        return state
+
+    def save(self):
+        with self._lock:
+            content = {
+                "remote": self.remote,
+                "ranges": self.ranges,
+                "complete": self.complete,
+            }
+            # Interrupted write leaves previous state file intact
+            tmp_path = Path(f"{self.path}.tmp")
+            with open(tmp_path, "w") as fd:
+                json.dump(content, fd)
+            os.replace(tmp_path, self.path)
+
+    def get_position(self, idx: int) -> int:
+        """
+        :return: downloaded bytes of range, including pending ones
+        """
+        return self.ranges[idx][2] + self.pending[idx]
+
+    def advance(self, idx: int, size: int):
+        with self._lock:
+            self.pending[idx] += size
+
+    def commit(self, idx: int):
+        """
+        Record pending bytes of range as downloaded, once they are flushed
+        """
+        with self._lock:
+            self.ranges[idx][2] += self.pending[idx]
+            self.pending[idx] = 0
+
 
 class DataSetsHandler:
-    def __init__(self, data_sets: List[DataSet]):
+    def __init__(
+        self,
+        data_sets: List[DataSet],
+        range_min_size: int = RANGE_MIN_SIZE,
+        range_parts: int = RANGE_PARTS,
+        retries: int = DOWNLOAD_RETRIES,
+    ):
         self.data_sets = data_sets
+        self.range_min_size = range_min_size
+        self.range_parts = range_parts
+        self.retries = retries
 
     def download(self):
         print("Downloading ...")
-        for item in self.data_sets:
-            self._download_file(data_set=item)
+        with ThreadPoolExecutor(max(len(self.data_sets), 1)) as executor:
+            list(executor.map(self._download_file, self.data_sets))
+
+    def _download_file(self, data_set: DataSet):
+        with METRICS.stage("download", data_set.gzipped.name) as record:
+            record.bytes = 0
+            self._download(data_set, record)
+
+    def _download(self, data_set: DataSet, record: StageRecord):
+        remote = self._get_remote_info(data_set.url)
+        state = DownloadState.load(get_state_path(data_set))
+
+        if not self._is_resumable(data_set, state, remote):
+            state = DownloadState(
+                get_state_path(data_set), remote, self._get_ranges(remote)
+            )
+            with open(data_set.gzipped, "wb") as output:
+                if remote["size"] is not None:
+                    output.truncate(remote["size"])
+            state.save()
+        elif state.complete:
+            print(f"{data_set.gzipped} is up to date")
+            return
+
+        initial = sum(done for _, _, done in state.ranges)
+        print(f"{data_set.url} -> {data_set.gzipped} ...")
+        with PROGRESS.task(
+            f"Downloading '{data_set.gzipped.name}'",
+            remote["size"],
+            parts=len(state.ranges),
+        ) as task:
+            download_range = partial(self._download_range, data_set, state, task)
+            with ThreadPoolExecutor(len(state.ranges)) as executor:
+                list(executor.map(download_range, range(len(state.ranges))))
+        record.bytes = max(sum(done for _, _, done in state.ranges) - initial, 0)
+
+        try:
+            self._verify(data_set, remote)
+        except ValueError:
+            os.remove(state.path)
+            raise
+        state.complete = True
+        state.save()
+
+    @staticmethod
+    def _is_resumable(
+        data_set: DataSet, state: Optional[DownloadState], remote: dict
+    ) -> bool:
+        """
+        Previous download can be resumed or skipped if remote file wasn't changed
+        since then, which is known only when server reports ETag or Last-Modified
+        """
+        return (
+            state is not None
+            and state.remote == remote
+            and bool(remote["etag"] or remote["last_modified"])
+            and remote["size"] is not None
+            and exists(data_set.gzipped)
+            and os.path.getsize(data_set.gzipped) == remote["size"]
+        )
+
+    def _get_remote_info(self, url: str) -> dict:
+        response = requests.head(url, allow_redirects=True, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        size = response.headers.get("Content-Length")
+        return {
+            "url": url,
+            "size": int(size) if size is not None else None,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "ranges": response.headers.get("Accept-Ranges") == "bytes",
+        }
+
+    def _get_ranges(self, remote: dict) -> List[List[int]]:
+        """
+        Split remote file into byte ranges [start, end, downloaded bytes]
+        :param remote: remote file info
+        :return: list of ranges
+        """
+        size = remote["size"]
+        if size is None:
+            return [[0, -1, 0]]
+        if not remote["ranges"] or size < self.range_min_size:
+            return [[0, size, 0]]
+        step = -(-size // self.range_parts)
+        return [[start, min(start + step, size), 0] for start in range(0, size, step)]
+
+    def _download_range(
+        self, data_set: DataSet, state: DownloadState, task: Task, idx: int
+    ):
+        # Progress is sampled from downloaded bytes of range
+        with task.track(lambda: state.get_position(idx), idx):
+            for attempt in range(self.retries + 1):
+                start, end, done = state.ranges[idx]
+                if end != -1 and start + done >= end:
+                    return
+                try:
+                    self._fetch_range(data_set, state, idx)
+                    return
+                except requests.RequestException:
+                    if attempt == self.retries:
+                        raise
+                    time.sleep(2**attempt)
+
+    def _fetch_range(self, data_set: DataSet, state: DownloadState, idx: int):
+        start, end, done = state.ranges[idx]
+        headers = {}
+        if state.remote["ranges"] and end != -1:
+            headers["Range"] = f"bytes={start + done}-{end - 1}"
+        elif done:
+            # Server can't resume, start from scratch
+            state.ranges[idx][2] = done = 0
+
+        with requests.get(
+            data_set.url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            if headers and response.status_code != 206:
+                raise requests.RequestException(f"Range is ignored: {response.url}")
+            with open(data_set.gzipped, "r+b") as output:
+                output.seek(start + done)
+                try:
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        output.write(chunk)
+                        state.advance(idx, len(chunk))
+                        if state.pending[idx] >= DOWNLOAD_SAVE_SIZE:
+                            self._save_range(output, state, idx)
+                    if end == -1:
+                        output.truncate()
+                finally:
+                    self._save_range(output, state, idx)
+
+    @staticmethod
+    def _save_range(output, state: DownloadState, idx: int):
+        """
+        Flush written bytes of range to disk before they are recorded in state
+        file, so resumed download never skips bytes which weren't written
+        """
+        output.flush()
+        os.fsync(output.fileno())
+        state.commit(idx)
+        state.save()
 
     @staticmethod
-    def _download_file(data_set: DataSet):
-        with requests.get(data_set.url, stream=True) as r:
-            total_length = int(r.headers.get("Content-Length"))
-
-            with tqdm.wrapattr(
-                r.raw,
-                "read",
-                total=total_length,
-                desc=f"{data_set.url} -> {data_set.gzipped} ...",
-            ) as raw:
-                with open(data_set.gzipped, "wb") as output:
-                    shutil.copyfileobj(raw, output)
+    def _verify(data_set: DataSet, remote: dict):
+        """
+        Check size of downloaded file and its MD5 checksum when ETag holds it
+        """
+        if remote["size"] is not None:
+            size = os.path.getsize(data_set.gzipped)
+            if size != remote["size"]:
+                raise ValueError(
+                    f"{data_set.gzipped}: expected {remote['size']} bytes, got {size}"
+                )
+        etag = MD5_ETAG_PATTERN.match(remote["etag"] or "")
+        if etag:
+            md5 = hashlib.md5()
+            with open(data_set.gzipped, "rb") as fd:
+                for chunk in iter(lambda: fd.read(DOWNLOAD_CHUNK_SIZE), b""):
+                    md5.update(chunk)
+            if md5.hexdigest() != etag.group(1):
+                raise ValueError(f"{data_set.gzipped}: checksum mismatch")
 
     def extract(self):
         print("Extracting ...")
-        with Pool(cpu_count()) as pool:
-            pool.map(self._extract_file, self.data_sets)
+        with ExitStack() as stack:
+            # Tasks are registered before fork, so workers track them
+            for data_set in self.data_sets:
+                stack.enter_context(
+                    PROGRESS.task(
+                        get_extract_progress_name(data_set),
+                        os.path.getsize(data_set.gzipped),
+                    )
+                )
+            with Pool(cpu_count()) as pool:
+                METRICS.add(pool.map(self._extract_file, self.data_sets))
+
+    @staticmethod
+    def _extract_file(data_set: DataSet) -> StageRecord:
+        """
+        Extract gzipped data set as binary blocks. Blocks are decompressed in
+        reader thread while main thread writes previous ones, both of them
+        release GIL, so decompression and writing overlap
+        """
+        with measure("extract", data_set.extracted.name) as record:
+            record.rows, record.bytes = DataSetsHandler._write_blocks(data_set)
+        return record
 
     @staticmethod
-    def _extract_file(data_set: DataSet):
+    def _write_blocks(data_set: DataSet) -> Tuple[int, int]:
+        """
+        :return: number of written lines and bytes
+        """
+        lines = written = 0
         print(f"{data_set.gzipped} -> {data_set.extracted} ...")
-        with gzip.open(data_set.gzipped) as zf:
-            with open(data_set.extracted, "w") as f:
-                for line in track(zf, description="[green]Extracting dataset ..."):
-                    f.write(line.decode())
+        blocks = queue.Queue(EXTRACT_QUEUE_SIZE)
+        with open(data_set.extracted, "wb") as output, PROGRESS.task(
+            get_extract_progress_name(data_set), os.path.getsize(data_set.gzipped)
+        ) as task:
+            reader = threading.Thread(
+                target=DataSetsHandler._decompress_blocks,
+                args=(data_set.gzipped, blocks, task),
+                daemon=True,
+            )
+            reader.start()
+            for item in iter(blocks.get, None):
+                if isinstance(item, Exception):
+                    raise item
+                output.write(item)
+                lines += item.count(b"\n")
+                written += len(item)
+            reader.join()
+        return lines, written
+
+    @staticmethod
+    def _decompress_blocks(path: Path, blocks: queue.Queue, task: Task):
+        """
+        Put decompressed blocks to the queue, followed by None, or by exception
+        if decompression failed. Progress is sampled from position in
+        compressed file. Multi-member gzip files are supported
+        """
+        try:
+            with open(path, "rb") as fd, task.track(fd.tell):
+                decompressor, pending = zlib.decompressobj(GZIP_WBITS), False
+                for chunk in iter(partial(fd.read, EXTRACT_BLOCK_SIZE), b""):
+                    while chunk:
+                        blocks.put(decompressor.decompress(chunk))
+                        pending = True
+                        chunk = b""
+                        if decompressor.eof:
+                            chunk = decompressor.unused_data
+                            decompressor, pending = (
+                                zlib.decompressobj(GZIP_WBITS),
+                                False,
+                            )
+                if pending:
+                    raise EOFError(
+                        f"{path}: compressed file ended before end of stream"
+                    )
+            blocks.put(None)
+        except Exception as e:
+            blocks.put(e)
 
     def cleanup(self):
         for data_set in self.data_sets:
-            if exists(data_set.gzipped):
-                os.remove(data_set.gzipped)
-
-            if exists(data_set.extracted):
-                os.remove(data_set.extracted)
+            for path in [
+                data_set.gzipped,
+                data_set.extracted,
+                get_state_path(data_set),
+            ]:
+                if exists(path):
+                    os.remove(path)
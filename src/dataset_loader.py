@@ -1,10 +1,54 @@
-from functools import partial
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from glob import glob
 from multiprocessing import Pool, cpu_count
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Iterable
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import AddConstraint, CreateIndex
 
 import src.models as models
+from src.adjacency import ADJACENCY_VIEWS, get_view_definition
+from src import summary
+from src.metrics import METRICS, StageRecord, measure
+from src.progress import PROGRESS
+from src.utils import RowsStream, is_parquet_file
+
+STAGE_PREFIX = "stage_"
+# Ids of these tables are row numbers of data set, so they shift when rows
+# are added or removed upstream. On refresh rows are matched by natural key
+NATURAL_KEYS = {
+    models.PrincipalModel.__tablename__: ["film_id", "person_id", "ordering"],
+    models.RatingModel.__tablename__: ["film_id"],
+}
+SEARCH_COLUMNS = [
+    (models.FilmModel.__tablename__, "title"),
+    (models.PersonModel.__tablename__, "name"),
+]
+# Columns ordered by API, (column DESC, id) index serves both directions
+ORDER_COLUMNS = [
+    (models.RatingModel.__tablename__, "average_rating"),
+    (models.RatingModel.__tablename__, "num_votes"),
+]
+
+_worker_connection = None
+
+
+def init_copy_worker(db_uri: str):
+    """
+    Initializer of copy worker process, opens connection used by all chunks
+    copied by the process
+    :param db_uri: database URI
+    :return:
+    """
+    global _worker_connection
+    _worker_connection = models.db.create_engine(db_uri).raw_connection()
+
+
+def get_copy_progress_name(table_name: str) -> str:
+    return f"Copying '{table_name}'"
 
 
 def get_table_object(table):
@@ -21,6 +65,42 @@ def get_table_object(table):
         return table
 
 
+def get_copy_columns(table) -> List[str]:
+    """
+    Returns names of table columns which values are copied from data set
+    :param table: Table object
+    :return: list of column names
+    """
+    return [column.name for column in table.columns if column.computed is None]
+
+
+def get_load_order(dataset_paths: Iterable[Tuple[str, str]]) -> List[str]:
+    """
+    Returns names of tables in order of load, referenced tables first
+    :param dataset_paths: (table name, data set path) of loaded data sets
+    :return: list of table names
+    """
+    return [
+        models.JobModel.__tablename__,
+        *[table_name for table_name, _ in dataset_paths],
+        models.PersonFilm.name,
+        models.ProfessionModel.__tablename__,
+        models.ProfessionPerson.name,
+        models.GenreModel.__tablename__,
+        models.GenreFilm.name,
+    ]
+
+
+def get_row_hash(alias: str, columns: List[str]) -> str:
+    """
+    Returns SQL expression of row content hash
+    :param alias: table alias
+    :param columns: names of hashed columns
+    :return: SQL expression
+    """
+    return f"md5(ROW({', '.join(f'{alias}.{el}' for el in columns)})::text)"
+
+
 class DatasetLoader:
     def __init__(self, cmd_args, config: Dict):
         self.root = Path(cmd_args.root)
@@ -28,6 +108,7 @@ class DatasetLoader:
         self.resume = cmd_args.resume
         self.debug = cmd_args.debug
         self.quiet = cmd_args.quiet
+        self.bulk = cmd_args.bulk
 
         self.delimiter = config["dataset_delimiter"]
 
@@ -50,14 +131,452 @@ class DatasetLoader:
 
     def load_dataset(self):
         self.clean_up()
-        self._copy_table(models.JobModel.__tablename__)
-        for table_name, _ in self.dataset_paths:
-            self._copy_table(table_name)
-        self._copy_table(models.PersonFilm.name)
-        self._copy_table(models.ProfessionModel.__tablename__)
-        self._copy_table(models.ProfessionPerson.name)
-        self._copy_table(models.GenreModel.__tablename__)
-        self._copy_table(models.GenreFilm.name)
+        if self.bulk:
+            self._drop_constraints()
+        self._copy_tables(
+            [
+                [(table_name, table_name) for table_name in wave]
+                for wave in self._get_load_waves()
+            ]
+        )
+        if self.bulk:
+            self._restore_constraints()
+        self.create_search_indexes()
+        self.create_order_indexes()
+        self.refresh_views()
+        self.bump_dataset_version()
+
+    def refresh_views(self, concurrently: bool = False):
+        """
+        Create and refresh materialized views built from loaded tables
+        :param concurrently: refresh populated views without blocking readers
+        """
+        self.refresh_adjacency_views(concurrently)
+        self.refresh_film_summary(concurrently)
+
+    def refresh_adjacency_views(self, concurrently: bool = False):
+        """
+        Create and refresh materialized views of person-film adjacency:
+        sorted array of film ids per person and of person ids per film
+        :param concurrently: refresh populated views without blocking readers
+        :return:
+        """
+        statements = []
+        with self.connection.cursor() as cursor:
+            for view_name, (key, _, _) in ADJACENCY_VIEWS.items():
+                statements.append(
+                    [
+                        f"CREATE MATERIALIZED VIEW IF NOT EXISTS {view_name} AS "
+                        f"{get_view_definition(view_name)} WITH NO DATA",
+                        f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{view_name}_{key} "
+                        f"ON {view_name} ({key})",
+                        self._get_refresh_statement(cursor, view_name, concurrently),
+                    ]
+                )
+        self.connection.commit()
+        self._execute_in_parallel("Refreshing adjacency views", statements)
+
+    def refresh_film_summary(self, concurrently: bool = False):
+        """
+        Create and refresh film_summary materialized view: film with its
+        rating and genres, which films queries read without joins
+        :param concurrently: refresh populated view without blocking readers
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            trigram = bool(cursor.fetchone()[0])
+            refresh = self._get_refresh_statement(
+                cursor, summary.FILM_SUMMARY, concurrently
+            )
+        self.connection.commit()
+        self._execute_in_parallel(
+            "Refreshing film summary",
+            [
+                [
+                    f"CREATE MATERIALIZED VIEW IF NOT EXISTS {summary.FILM_SUMMARY} "
+                    f"AS {summary.get_view_definition()} WITH NO DATA",
+                    *summary.get_index_statements(trigram),
+                    refresh,
+                ]
+            ],
+        )
+
+    @staticmethod
+    def _get_refresh_statement(cursor, view_name: str, concurrently: bool) -> str:
+        """
+        Returns REFRESH statement of view, concurrent refresh requires
+        populated view
+        """
+        cursor.execute(
+            "SELECT ispopulated FROM pg_matviews WHERE matviewname = %s",
+            (view_name,),
+        )
+        populated = (cursor.fetchone() or [False])[0]
+        if concurrently and populated:
+            return f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name}"
+        return f"REFRESH MATERIALIZED VIEW {view_name}"
+
+    def bump_dataset_version(self):
+        """
+        Increment version stamp of loaded data set, API drops cached responses
+        of previous version
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {models.DatasetVersionModel.__tablename__} "
+                f"(id, version, loaded_at) VALUES (1, 1, now()) "
+                f"ON CONFLICT (id) DO UPDATE "
+                f"SET version = {models.DatasetVersionModel.__tablename__}.version + 1, "
+                f"loaded_at = now() RETURNING version"
+            )
+            version = cursor.fetchone()[0]
+        self.connection.commit()
+        if not self.quiet:
+            print(f"Data set version: {version}")
+
+    def create_search_indexes(self):
+        """
+        Create GIN indexes for text search: full-text index on search vector
+        of each searched column and, when pg_trgm extension is available,
+        trigram index serving ILIKE with infix patterns
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_available_extensions WHERE name = 'pg_trgm'"
+            )
+            trigram = bool(cursor.fetchone()[0])
+            if trigram:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        self.connection.commit()
+        if not trigram and not self.quiet:
+            print("pg_trgm extension is not available, ILIKE search is not indexed")
+
+        statements = []
+        for table_name, column in SEARCH_COLUMNS:
+            table_statements = [
+                f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{column}_tsv "
+                f"ON {table_name} USING gin "
+                f"(to_tsvector('{models.SEARCH_CONFIG}', {column}))"
+            ]
+            if trigram:
+                table_statements.append(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{column}_trgm "
+                    f"ON {table_name} USING gin ({column} gin_trgm_ops)"
+                )
+            statements.append(table_statements)
+        self._execute_in_parallel("Creating search indexes", statements)
+
+    def create_order_indexes(self):
+        """
+        Create (column DESC, id) indexes of ordered columns, so ordered pages
+        are read by index scan without sorting
+        """
+        self._execute_in_parallel(
+            "Creating order indexes",
+            [
+                [
+                    f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{column}_id "
+                    f"ON {table_name} ({column} DESC, id)"
+                ]
+                for table_name, column in ORDER_COLUMNS
+            ],
+        )
+
+    def _drop_constraints(self):
+        """
+        Prepare tables for bulk load: drop foreign keys, indexes and primary keys,
+        so they are not maintained row by row during COPY, and make tables
+        UNLOGGED, so copied rows are not written to WAL
+        """
+        inspector = inspect(self.engine)
+        tables = [self.metadata.tables[el] for el in self._get_load_order()]
+        with self.connection.cursor() as cursor:
+            for table in tables:
+                for foreign_key in inspector.get_foreign_keys(table.name):
+                    cursor.execute(
+                        f"ALTER TABLE {table.name} "
+                        f"DROP CONSTRAINT {foreign_key['name']}"
+                    )
+            for table in tables:
+                # Inspector skips expression indexes, so they are listed from
+                # catalog, except indexes backing table constraints
+                cursor.execute(
+                    "SELECT indexrelid::regclass::text FROM pg_index "
+                    "WHERE indrelid = %(table)s::regclass AND indexrelid NOT IN "
+                    "(SELECT conindid FROM pg_constraint "
+                    "WHERE conrelid = %(table)s::regclass)",
+                    {"table": table.name},
+                )
+                for (index_name,) in cursor.fetchall():
+                    cursor.execute(f"DROP INDEX {index_name}")
+                primary_key = inspector.get_pk_constraint(table.name)
+                if primary_key["constrained_columns"]:
+                    cursor.execute(
+                        f"ALTER TABLE {table.name} "
+                        f"DROP CONSTRAINT {primary_key['name']}"
+                    )
+                cursor.execute(f"ALTER TABLE {table.name} SET UNLOGGED")
+        self.connection.commit()
+
+    def _restore_constraints(self):
+        """
+        Switch tables back to LOGGED and create missing primary keys and indexes,
+        tables are processed in parallel. Foreign keys are added as NOT VALID,
+        which doesn't scan tables, and then validated in parallel, validation
+        doesn't block reads and writes of referencing table
+        """
+        tables = [self.metadata.tables[el] for el in self._get_load_order()]
+        with self.connection.cursor() as cursor:
+            for table in tables:
+                cursor.execute(f"ALTER TABLE {table.name} SET LOGGED")
+        self.connection.commit()
+
+        inspector = inspect(self.engine)
+        dialect = self.engine.dialect
+        statements = []
+        for table in tables:
+            table_statements = []
+            if (
+                table.primary_key.columns
+                and not inspector.get_pk_constraint(table.name)["constrained_columns"]
+            ):
+                table_statements.append(
+                    str(AddConstraint(table.primary_key).compile(dialect=dialect))
+                )
+            existing = {el["name"] for el in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    table_statements.append(
+                        str(CreateIndex(index).compile(dialect=dialect))
+                    )
+            statements.append(table_statements)
+        self._execute_in_parallel("Creating indexes", statements)
+
+        inspector = inspect(self.engine)
+        statements = []
+        with self.connection.cursor() as cursor:
+            for table in tables:
+                existing = {
+                    tuple(el["constrained_columns"])
+                    for el in inspector.get_foreign_keys(table.name)
+                }
+                for foreign_key in table.foreign_key_constraints:
+                    if tuple(foreign_key.column_keys) not in existing:
+                        cursor.execute(
+                            f"{AddConstraint(foreign_key).compile(dialect=dialect)}"
+                            f" NOT VALID"
+                        )
+                cursor.execute(
+                    "SELECT conname FROM pg_constraint "
+                    "WHERE conrelid = %s::regclass AND NOT convalidated",
+                    (table.name,),
+                )
+                statements.append(
+                    [
+                        f"ALTER TABLE {table.name} VALIDATE CONSTRAINT {name}"
+                        for name, in cursor.fetchall()
+                    ]
+                )
+        self.connection.commit()
+        self._execute_in_parallel("Validating foreign keys", statements)
+
+    def _execute_in_parallel(self, title: str, statements: List[List[str]]):
+        """
+        Execute groups of statements in parallel, each group in its own connection.
+        Statements of one group lock the same table, so they are executed serially
+        :param title: title of status message
+        :param statements: list of statement groups
+        :return:
+        """
+        statements = [el for el in statements if el]
+        if not self.quiet:
+            print(f"{title} ...")
+        with METRICS.stage("sql", title), ThreadPoolExecutor(
+            max(min(len(statements), cpu_count()), 1)
+        ) as executor:
+            list(executor.map(self._execute_statements, statements))
+
+    def _execute_statements(self, statements: List[str]):
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    if self.debug:
+                        print(statement)
+                    cursor.execute(statement)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def refresh_dataset(self):
+        """
+        Apply difference between parsed data set and loaded tables instead of
+        reloading them. Parsed data is copied to staging tables, then in a single
+        transaction changed rows are upserted (parents first) and missing rows are
+        deleted (children first). Rows of tables with primary key are matched by
+        it, or by natural key when ids are row numbers, and compared by content
+        hash, rows of mapping tables are matched as a whole. Readers keep seeing
+        previous snapshot until transaction commits
+        """
+        tables = [self.metadata.tables[el] for el in self._get_load_order()]
+        for table in tables:
+            self._create_stage_table(table)
+        self._copy_tables(
+            [[(table.name, f"{STAGE_PREFIX}{table.name}") for table in tables]]
+        )
+
+        try:
+            with self.connection.cursor() as cursor:
+                for table in tables:
+                    with METRICS.stage("upsert", table.name) as record:
+                        inserted, updated = self._upsert_changed_rows(cursor, table)
+                        record.rows = inserted + updated
+                    if not self.quiet:
+                        print(
+                            f"Table '{table.name}': {inserted} rows inserted, "
+                            f"{updated} rows updated"
+                        )
+                for table in reversed(tables):
+                    with METRICS.stage("delete", table.name) as record:
+                        record.rows = deleted = self._delete_missing_rows(cursor, table)
+                    if not self.quiet:
+                        print(f"Table '{table.name}': {deleted} rows deleted")
+                for table in tables:
+                    cursor.execute(f"DROP TABLE {STAGE_PREFIX}{table.name}")
+        except Exception:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+        self.refresh_views(concurrently=True)
+        self.bump_dataset_version()
+
+    def _get_load_order(self) -> List[str]:
+        return get_load_order(self.dataset_paths)
+
+    def _get_load_waves(self) -> List[List[str]]:
+        """
+        Split load order into waves, tables of a wave reference only tables
+        of previous waves, so they can be loaded concurrently. In bulk mode
+        foreign keys don't exist during load, so all tables form single wave
+        :return: list of waves of table names
+        """
+        if self.bulk:
+            return [self._get_load_order()]
+        table_waves = {}
+        for table_name in self._get_load_order():
+            table = self.metadata.tables[table_name]
+            table_waves[table_name] = max(
+                (
+                    table_waves[foreign_key.referred_table.name] + 1
+                    for foreign_key in table.foreign_key_constraints
+                    if foreign_key.referred_table.name in table_waves
+                ),
+                default=0,
+            )
+        waves = [[] for _ in range(max(table_waves.values(), default=-1) + 1)]
+        for table_name, wave in table_waves.items():
+            waves[wave].append(table_name)
+        return waves
+
+    def _create_stage_table(self, table):
+        columns = ", ".join(get_copy_columns(table))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {STAGE_PREFIX}{table.name}")
+            cursor.execute(
+                f"CREATE UNLOGGED TABLE {STAGE_PREFIX}{table.name} AS "
+                f"SELECT {columns} FROM {table.name} WITH NO DATA"
+            )
+        self.connection.commit()
+
+    @classmethod
+    def _upsert_changed_rows(cls, cursor, table) -> Tuple[int, int]:
+        if table.name in NATURAL_KEYS:
+            return cls._upsert_by_natural_key(cursor, table)
+        stage = f"{STAGE_PREFIX}{table.name}"
+        columns = get_copy_columns(table)
+        keys = [column.name for column in table.primary_key.columns]
+        if not keys:
+            cursor.execute(
+                f"INSERT INTO {table.name} ({', '.join(columns)}) "
+                f"SELECT {', '.join(columns)} FROM {stage} "
+                f"EXCEPT SELECT {', '.join(columns)} FROM {table.name}"
+            )
+            return cursor.rowcount, 0
+
+        values = [column for column in columns if column not in keys]
+        join_on = " AND ".join(f"t.{key} = s.{key}" for key in keys)
+        cursor.execute(
+            f"WITH upserted AS ("
+            f"INSERT INTO {table.name} ({', '.join(columns)}) "
+            f"SELECT {', '.join(f's.{el}' for el in columns)} FROM {stage} s "
+            f"LEFT JOIN {table.name} t ON {join_on} "
+            f"WHERE t.{keys[0]} IS NULL OR {get_row_hash('t', values)} "
+            f"<> {get_row_hash('s', values)} "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+            f"{', '.join(f'{el} = EXCLUDED.{el}' for el in values)} "
+            f"RETURNING xmax = 0 AS inserted) "
+            f"SELECT count(*) FILTER (WHERE inserted), "
+            f"count(*) FILTER (WHERE NOT inserted) FROM upserted"
+        )
+        return cursor.fetchone()
+
+    @staticmethod
+    def _upsert_by_natural_key(cursor, table) -> Tuple[int, int]:
+        """
+        Upsert rows matched by natural key: matched rows keep their ids,
+        new rows get ids following the largest loaded one
+        """
+        stage = f"{STAGE_PREFIX}{table.name}"
+        columns = get_copy_columns(table)
+        (primary_key,) = [column.name for column in table.primary_key.columns]
+        keys = NATURAL_KEYS[table.name]
+        values = [el for el in columns if el != primary_key and el not in keys]
+        join_on = " AND ".join(f"t.{key} = s.{key}" for key in keys)
+        inserted_columns = [
+            (
+                f"(SELECT coalesce(max({primary_key}), 0) FROM {table.name}) + "
+                f"row_number() OVER (ORDER BY c.{primary_key})"
+                if el == primary_key
+                else f"c.{el}"
+            )
+            for el in columns
+        ]
+        cursor.execute(
+            f"WITH changed AS ("
+            f"SELECT t.{primary_key} AS target_id, s.* FROM {stage} s "
+            f"LEFT JOIN {table.name} t ON {join_on} "
+            f"WHERE t.{primary_key} IS NULL OR {get_row_hash('t', values)} "
+            f"<> {get_row_hash('s', values)}), "
+            f"updated AS ("
+            f"UPDATE {table.name} t SET "
+            f"{', '.join(f'{el} = c.{el}' for el in values)} FROM changed c "
+            f"WHERE t.{primary_key} = c.target_id RETURNING 1), "
+            f"inserted AS ("
+            f"INSERT INTO {table.name} ({', '.join(columns)}) "
+            f"SELECT {', '.join(inserted_columns)} FROM changed c "
+            f"WHERE c.target_id IS NULL RETURNING 1) "
+            f"SELECT (SELECT count(*) FROM inserted), "
+            f"(SELECT count(*) FROM updated)"
+        )
+        return cursor.fetchone()
+
+    @staticmethod
+    def _delete_missing_rows(cursor, table) -> int:
+        stage = f"{STAGE_PREFIX}{table.name}"
+        keys = (
+            NATURAL_KEYS.get(table.name)
+            or [column.name for column in table.primary_key.columns]
+            or get_copy_columns(table)
+        )
+        cursor.execute(
+            f"DELETE FROM {table.name} t USING ("
+            f"SELECT {', '.join(keys)} FROM {table.name} "
+            f"EXCEPT SELECT {', '.join(keys)} FROM {stage}) d "
+            f"WHERE {' AND '.join(f't.{key} = d.{key}' for key in keys)}"
+        )
+        return cursor.rowcount
 
     def clean_up(self):
         tables = self._get_sorted_tables(self.metadata.sorted_tables)
@@ -71,21 +590,129 @@ class DatasetLoader:
             if table_obj.name == self.resume:
                 break
 
-    def _copy_table(self, table_name):
+    def _copy_tables(self, waves: List[List[Tuple[str, str]]]):
+        """
+        Copy chunks of parsed data sets by long-lived pool of worker processes,
+        each worker holds single connection. Chunks of all tables of a wave are
+        copied concurrently, largest first, waves are copied one after another.
+        Progress task of each table is registered before workers are forked,
+        its parts are chunks
+        :param waves: list of waves of (data set table name, target table name)
+        :return:
+        """
+        processes = cpu_count()
+        wave_chunks = []
+        with ExitStack() as stack:
+            for wave in waves:
+                chunks = []
+                for table_name, target_table in wave:
+                    table_chunks = self._get_chunks(table_name, target_table, processes)
+                    stack.enter_context(
+                        PROGRESS.task(
+                            get_copy_progress_name(target_table),
+                            sum(el[-1] for el in table_chunks),
+                            parts=len(table_chunks),
+                        )
+                    )
+                    chunks.extend(
+                        (*chunk, part) for part, chunk in enumerate(table_chunks)
+                    )
+                chunks.sort(key=lambda el: el[3], reverse=True)
+                wave_chunks.append((wave, chunks))
+
+            with Pool(
+                processes, initializer=init_copy_worker, initargs=(self.db_uri,)
+            ) as pool:
+                for wave, chunks in wave_chunks:
+                    if not self.quiet:
+                        for _, target_table in wave:
+                            print(f"Copying data to '{target_table}' table ...")
+                    METRICS.add(pool.starmap(self._copy_file, chunks, chunksize=1))
+
+    def _get_chunks(
+        self, table_name: str, target_table: str, processes: int
+    ) -> List[Tuple[str, str, Optional[List[int]], int]]:
+        """
+        Returns chunks of parsed data set: CSV chunk files as they are,
+        Parquet files split into slices of row groups
+        :param table_name: data set table name
+        :param target_table: target table name
+        :param processes: number of copy worker processes
+        :return: list of (target table name, file name, row groups, size)
+        """
+        chunks = []
+        for file_name in glob(str(self.root / table_name / "*")):
+            if not is_parquet_file(file_name):
+                chunks.append(
+                    (target_table, file_name, None, os.path.getsize(file_name))
+                )
+                continue
+            from src import parquet
+
+            chunks.extend(
+                (target_table, file_name, row_groups, size)
+                for row_groups, size in parquet.get_chunks(file_name, processes)
+            )
+        return chunks
+
+    def copy_rows(self, table_name: str, rows: Iterable):
+        """
+        Copy rows to table through bounded in-memory buffer
+        :param table_name: name of table
+        :param rows: iterable of rows
+        :return:
+        """
         if not self.quiet:
-            print(f"Copying data to '{table_name}' table ...")
-        handler = partial(self._copy_file, self.db_uri, table_name)
-        with Pool(cpu_count()) as pool:
-            pool.map(handler, glob(str(self.root / table_name / "*")))
+            print(f"Streaming data to '{table_name}' table ...")
+        stream = RowsStream(rows, self.delimiter)
+        with METRICS.stage("copy", table_name) as record:
+            with self.connection.cursor() as cursor:
+                cursor.copy_from(
+                    stream, table_name, sep=self.delimiter, size=stream.buffer_size
+                )
+                record.rows = cursor.rowcount
+            self.connection.commit()
 
     @staticmethod
-    def _copy_file(db_uri: str, table_name: str, file_name: str):
-        engine = models.db.create_engine(db_uri)
-        connection = engine.raw_connection()
-        with connection.cursor() as cursor:
-            with open(file_name, "r") as csv_file:
-                cursor.copy_from(csv_file, table_name, sep="\t")
-        connection.commit()
+    def _copy_file(
+        table_name: str,
+        file_name: str,
+        row_groups: Optional[List[int]] = None,
+        size: Optional[int] = None,
+        progress_part: int = 0,
+    ) -> StageRecord:
+        part = Path(file_name).name
+        if row_groups is not None:
+            part = f"{part}[{row_groups[0]}:{row_groups[-1] + 1}]"
+        with measure("copy", table_name, part) as record, PROGRESS.task(
+            get_copy_progress_name(table_name), size, parts=progress_part + 1
+        ) as task:
+            record.bytes = size
+            try:
+                with _worker_connection.cursor() as cursor:
+                    if row_groups is None:
+                        with open(file_name, "r") as csv_file, task.track(
+                            csv_file.buffer.tell, progress_part
+                        ):
+                            cursor.copy_from(csv_file, table_name, sep="\t")
+                    else:
+                        from src import parquet
+
+                        stream = RowsStream(
+                            parquet.iter_rows(file_name, row_groups), "\t"
+                        )
+                        # Size of Parquet chunk isn't size of copied text
+                        with task.track(part=progress_part):
+                            cursor.copy_from(
+                                stream, table_name, sep="\t", size=stream.buffer_size
+                            )
+                            task.update(size, progress_part)
+                    record.rows = cursor.rowcount
+            except Exception:
+                _worker_connection.rollback()
+                raise
+            _worker_connection.commit()
+        return record
 
     def _get_sorted_tables(self, tables):
         sorted_tables = []
@@ -1,17 +1,33 @@
+import copy
 import csv
+import gzip
 import pprint
 import subprocess
+from array import array
 from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
 from functools import partial
 from glob import glob
+from itertools import islice
 from multiprocessing import Pool, cpu_count
 from os import remove
 from os.path import getsize
 from pathlib import Path
-from typing import Iterator, Dict, Set, Tuple, Iterable, List
+from operator import itemgetter
+from typing import Iterator, Dict, Tuple, Iterable, List, Optional
 
 from src import models
-from src.utils import overwrite_upper_line, get_int, get_null
+from src.indices import IdIndex, PairSet
+from src.metrics import METRICS, StageRecord, measure
+from src.progress import PROGRESS
+from src.utils import (
+    get_int,
+    get_null,
+    open_dataset,
+    get_peak_rss,
+    PARQUET_EXTENSION,
+)
 
 FILM = models.FilmModel.__tablename__
 PERSON = models.PersonModel.__tablename__
@@ -25,208 +41,537 @@ GENRE_FILM = models.GenreFilm.name
 JOB = models.JobModel.__tablename__
 
 
+# Tables which ids are numbers of rows in data set
+ROW_NUMBERED = [PRINCIPAL, RATING]
+
+FILM_COLUMNS = [
+    "tconst",
+    "titleType",
+    "primaryTitle",
+    "isAdult",
+    "startYear",
+    "runtimeMinutes",
+    "genres",
+]
+PERSON_COLUMNS = [
+    "nconst",
+    "primaryName",
+    "birthYear",
+    "deathYear",
+    "primaryProfession",
+    "knownForTitles",
+]
+PRINCIPAL_COLUMNS = ["tconst", "ordering", "nconst", "category"]
+RATING_COLUMNS = ["tconst", "averageRating", "numVotes"]
+
+# Rows are written by batches
+WRITE_BATCH_ROWS = 10_000
+
+
 def get_csv_filename(csv_extension: str, root: Path, table_name: str):
     return root / f"{table_name}.{csv_extension}"
 
 
+def get_progress_name(file_path) -> str:
+    return f"Parsing '{Path(file_path).name}'"
+
+
+@dataclass
+class Shard:
+    """
+    Byte range [start, end) of data set file aligned to lines boundaries
+    """
+
+    index: int
+    start: int
+    end: int
+    headers: List[str]
+    first_row: int = 0
+
+
+def get_shards(file_path: Path, count: int) -> List[Shard]:
+    """
+    Split data set file into byte ranges of roughly the same size,
+    each one starting right after line break
+    :param file_path: data set file path
+    :param count: maximum number of shards
+    :return: list of shards
+    """
+    size = getsize(file_path)
+    with open(file_path, "rb") as fd:
+        headers = fd.readline().decode().rstrip("\r\n").split("\t")
+        boundaries = [fd.tell()]
+        step = (size - boundaries[0]) // count
+        for idx in range(1, count):
+            fd.seek(max(boundaries[0] + idx * step - 1, boundaries[-1]))
+            fd.readline()
+            if fd.tell() >= size:
+                break
+            if fd.tell() > boundaries[-1]:
+                boundaries.append(fd.tell())
+    boundaries.append(size)
+    return [
+        Shard(index=idx, start=start, end=end, headers=headers)
+        for idx, (start, end) in enumerate(zip(boundaries, boundaries[1:]))
+    ]
+
+
 class DatasetParser:
     def __init__(self, cmd_args, config: Dict):
         self.root = Path(cmd_args.root)
-        self.errors = defaultdict(list)
-        self.indices = defaultdict(set)
+        self.indices: Dict[str, IdIndex] = defaultdict(IdIndex)
         self.debug = cmd_args.debug
         self.quiet = cmd_args.quiet
-        self.dataset_paths = config["dataset_paths"].items()
+        self.shards: Optional[int] = cmd_args.shards
+        self.dataset_paths = list(config["dataset_paths"].items())
         self.delimiter = config["dataset_delimiter"]
         self.csv_extension = config["csv_extension"]
+        self.output_format = config["output_format"]
+        self.parquet_config = config["parquet"]
         self.film_filter: List = config["film_filter"]
-
-        self.profession_person = defaultdict(list)
-        self.genre_film = defaultdict(list)
-        self.person_film: Set[Tuple] = set()
         self.jobs: Dict = {}
+        self._reset_collected_data()
+
+    def _reset_collected_data(self):
+        self.errors = defaultdict(list)
+        self.profession_person = defaultdict(partial(array, "I"))
+        self.genre_film = defaultdict(partial(array, "I"))
+        self.person_film = PairSet()
 
     def parse_dataset(self):
         for table_name, dataset_path in self.dataset_paths:
-            parse_handler = self._get_parse_handler(table_name)
-            dataset_iter = parse_handler(Path(self.root / dataset_path))
-            self._write_normalized_dataset(dataset_iter, dataset_path, table_name)
+            with METRICS.stage("parse", table_name) as record:
+                record.bytes = getsize(self.root / dataset_path)
+                if self.shards:
+                    record.rows = self._parse_sharded(table_name, dataset_path)
+                    continue
+                parse_handler = self._get_parse_handler(table_name)
+                dataset_iter = parse_handler(Path(self.root / dataset_path))
+                output_filename = self._get_output_filename(table_name)
+                record.rows = self._write_normalized_dataset(
+                    dataset_iter, dataset_path, output_filename, table_name
+                )
 
         self._write_extra_data(PROFESSION, PERSON_PROFESSION, self.profession_person)
         self._write_extra_data(GENRE, GENRE_FILM, self.genre_film)
         self._write_data(PERSON_FILM, self.person_film)
-        self._write_data(JOB, [(value, key) for key, value in self.jobs.items()])
+        self._write_data(JOB, self.get_job_rows())
 
         self._split_all()
+        self.dump_errors()
+
+        if not self.quiet:
+            print(f"Peak RSS: {get_peak_rss() / 2 ** 20:.1f} MB")
 
+    def dump_errors(self):
         with open("errors.log", "w") as ef:
             pprint.pprint(dict(self.errors), ef)
 
+    def iter_normalized_dataset(self, table_name: str, file_path: Path) -> Iterator:
+        return self._get_parse_handler(table_name)(file_path)
+
     def _get_parse_handler(self, table_name):
         return getattr(self, f"_parse_{table_name}")
 
-    def _write_normalized_dataset(
-        self, dataset_iter: Iterator, dataset_path: str, table_name: str
-    ):
-        output_filename = get_csv_filename(self.csv_extension, self.root, table_name)
-        with open(output_filename, "w") as dataset_out:
-            writer = self._get_csv_writer(dataset_out)
-            status_line = f"Parsing '{dataset_path}' into '{output_filename}' ..."
-            if not self.quiet:
-                print(f"{self._get_progress_line(status_line, 0)} ...")
-            for idx, (data_line, progress) in enumerate(dataset_iter):
-                overwrite_upper_line(
-                    self._get_progress_line(status_line, progress), self.quiet
-                )
-                writer.writerow(data_line)
-            overwrite_upper_line(
-                f"{self._get_progress_line(status_line, 100)} done", self.quiet
+    def _parse_sharded(self, table_name: str, dataset_path: str) -> int:
+        """
+        Parse data set in parallel, one process per shard, writing output of
+        each shard directly as chunk file which is ready to be loaded.
+        Chunks concatenated in order of shards are the same as output of
+        sequential parsing: row numbers and job ids are computed before
+        parsing by scanning shards, collected data is merged in shard order
+        :return: number of written rows
+        """
+        file_path = Path(self.root / dataset_path)
+        shards = get_shards(file_path, self.shards)
+        chunks_dir = self.root / table_name
+        chunks_dir.mkdir(exist_ok=True)
+        for chunk in chunks_dir.glob(f"{table_name}.*"):
+            chunk.unlink()
+        if not self.quiet:
+            print(f"Parsing '{dataset_path}' in {len(shards)} shards ...")
+
+        # Task is registered before fork, so workers track their shards in it
+        with PROGRESS.task(
+            get_progress_name(file_path),
+            shards[-1].end - shards[0].start,
+            parts=len(shards),
+        ), Pool(len(shards)) as pool:
+            if table_name in ROW_NUMBERED:
+                scanner = partial(self._scan_shard, self._get_shard_parser(), file_path)
+                first_row = 0
+                for shard, (rows, jobs) in zip(shards, pool.map(scanner, shards)):
+                    shard.first_row = first_row
+                    first_row += rows
+                    if table_name == PRINCIPAL:
+                        for job in jobs:
+                            self._update_jobs(job)
+
+            worker = partial(
+                self._parse_shard, self._get_shard_parser(), table_name, file_path
+            )
+            results = pool.map(worker, shards)
+
+        for shard_parser, _ in results:
+            self._merge_collected_data(table_name, shard_parser)
+        records = [record for _, record in results]
+        METRICS.add(records)
+        return sum(el.rows for el in records)
+
+    def _get_shard_parser(self) -> "DatasetParser":
+        shard_parser = copy.copy(self)
+        shard_parser.quiet = True
+        shard_parser._reset_collected_data()
+        return shard_parser
+
+    def _merge_collected_data(self, table_name: str, shard_parser: "DatasetParser"):
+        self.errors[table_name].extend(shard_parser.errors[table_name])
+        if table_name in [FILM, PERSON]:
+            self.indices[table_name].update(shard_parser.indices[table_name])
+        for genre, film_ids in shard_parser.genre_film.items():
+            self.genre_film[genre].extend(film_ids)
+        for profession, person_ids in shard_parser.profession_person.items():
+            self.profession_person[profession].extend(person_ids)
+        self.person_film.update(shard_parser.person_film)
+
+    @staticmethod
+    def _parse_shard(
+        shard_parser: "DatasetParser", table_name: str, file_path: Path, shard: Shard
+    ) -> Tuple["DatasetParser", StageRecord]:
+        parse_handler = shard_parser._get_parse_handler(table_name)
+        output_filename = (
+            shard_parser.root
+            / table_name
+            / (f"{table_name}.{shard_parser._get_extension()}.{shard.index:02d}")
+        )
+        with measure("parse", table_name, output_filename.name) as record:
+            record.bytes = shard.end - shard.start
+            record.rows = shard_parser._write_normalized_dataset(
+                parse_handler(file_path, shard),
+                file_path.name,
+                output_filename,
+                table_name,
             )
+        return shard_parser, record
 
     @staticmethod
-    def _get_progress_line(status_line, progress):
-        return f"{status_line}: {progress:.2f}%"
+    def _scan_shard(
+        shard_parser: "DatasetParser", file_path: Path, shard: Shard
+    ) -> Tuple[int, List[str]]:
+        """
+        Count rows of shard and collect jobs of principals which are going to be
+        parsed, in order of their first appearance
+        :param shard_parser: DatasetParser with film and person indices
+        :param file_path: data set file path
+        :param shard: Shard
+        :return: rows count and list of jobs
+        """
+        rows, jobs = 0, {}
+        if "category" not in shard.headers:
+            for _ in _read_shard_lines(file_path, shard):
+                rows += 1
+            return rows, []
 
-    def _parse_film(self, dataset_path):
-        for data, progress in self._parse_raw_dataset(dataset_path):
-            try:
-                if data["titleType"] not in self.film_filter:
-                    continue
+        columns = [shard.headers.index(el) for el in ["tconst", "nconst", "category"]]
+        films, persons = shard_parser.indices[FILM], shard_parser.indices[PERSON]
+        for line in _read_shard_lines(file_path, shard):
+            rows += 1
+            values = line.split(shard_parser.delimiter)
+            tconst, nconst, category = [values[el] for el in columns]
+            if get_int(tconst) in films and get_int(nconst) in persons:
+                jobs.setdefault(category, None)
+        return rows, list(jobs)
 
-                film_id = get_int(data["tconst"])
-                data_line = (
-                    film_id,
-                    data["primaryTitle"],
-                    bool(data["isAdult"]),
-                    get_null(data["startYear"]),
-                    get_null(data["runtimeMinutes"]),
-                )
-                genres_from_dataset = get_null(data["genres"])
-            except KeyError:
-                self.errors[FILM].append(data)
-            else:
-                self.indices[FILM].add(film_id)
-                if genres_from_dataset is not None:
-                    self._update_genres(genres_from_dataset, film_id)
-                yield data_line, progress
+    def _write_normalized_dataset(
+        self,
+        dataset_iter: Iterator,
+        dataset_path: str,
+        output_filename: Path,
+        table_name: str,
+    ) -> int:
+        """
+        Write rows of data set by batches, progress is sampled from position
+        in data set file by progress reporter
+        :return: number of written rows
+        """
+        if not self.quiet:
+            print(f"Parsing '{dataset_path}' into '{output_filename}' ...")
+        rows = 0
+        with self._open_writer(table_name, output_filename) as writer:
+            for batch in _iter_batches(dataset_iter):
+                writer.writerows(batch)
+                rows += len(batch)
+        return rows
+
+    def _parse_film(self, dataset_path, shard: Shard = None):
+        films = self.indices[FILM]
+        for (
+            tconst,
+            title_type,
+            primary_title,
+            is_adult,
+            start_year,
+            runtime_minutes,
+            genres,
+        ) in self._parse_raw_dataset(FILM, dataset_path, FILM_COLUMNS, shard):
+            if title_type not in self.film_filter:
+                continue
+
+            film_id = get_int(tconst)
+            films.add(film_id)
+            genres_from_dataset = get_null(genres)
+            if genres_from_dataset is not None:
+                self._update_genres(genres_from_dataset, film_id)
+            yield (
+                film_id,
+                primary_title,
+                bool(is_adult),
+                get_null(start_year),
+                get_null(runtime_minutes),
+            )
 
     def _update_genres(self, genres_from_dataset: str, film_id: int):
         for genre in genres_from_dataset.split(","):
             self.genre_film[genre].append(film_id)
 
-    def _parse_person(self, dataset_path):
-        for data, progress in self._parse_raw_dataset(dataset_path):
-            try:
-                person_id = get_int(data["nconst"])
-                data_line = (
-                    person_id,
-                    data["primaryName"],
-                    get_null(data["birthYear"]),
-                    get_null(data["deathYear"]),
-                )
-                profession_from_dataset = get_null(data["primaryProfession"])
-            except KeyError:
-                self.errors[PERSON].append(data)
-            else:
-                self.indices[PERSON].add(person_id)
-                if profession_from_dataset is not None:
-                    self._update_professions(profession_from_dataset, person_id)
-                yield data_line, progress
-
-                for film_id in self._get_film_ids(data):
-                    self.person_film.add((person_id, film_id))
+    def _parse_person(self, dataset_path, shard: Shard = None):
+        persons = self.indices[PERSON]
+        for (
+            nconst,
+            primary_name,
+            birth_year,
+            death_year,
+            primary_profession,
+            known_for_titles,
+        ) in self._parse_raw_dataset(PERSON, dataset_path, PERSON_COLUMNS, shard):
+            person_id = get_int(nconst)
+            persons.add(person_id)
+            profession_from_dataset = get_null(primary_profession)
+            if profession_from_dataset is not None:
+                self._update_professions(profession_from_dataset, person_id)
+            yield person_id, primary_name, get_null(birth_year), get_null(death_year)
+
+            for film_id in self._get_film_ids(known_for_titles):
+                self.person_film.add((person_id, film_id))
 
     def _update_professions(self, professions_from_dataset: str, person_id: int):
         for profession in professions_from_dataset.split(","):
             self.profession_person[profession].append(person_id)
 
-    def _get_film_ids(self, data):
-        titles = [
-            get_int(el) for el in data["knownForTitles"].split(",") if get_int(el)
-        ]
-        for film_id in titles:
-            if film_id in self.indices[FILM]:
+    def _get_film_ids(self, known_for_titles: str):
+        films = self.indices[FILM]
+        for title in known_for_titles.split(","):
+            film_id = get_int(title)
+            if film_id and film_id in films:
                 yield film_id
 
-    def _parse_principal(self, dataset_path):
-        for idx, (data, progress) in enumerate(self._parse_raw_dataset(dataset_path)):
-            film_id, person_id = get_int(data["tconst"]), get_int(data["nconst"])
-            if film_id in self.indices[FILM] and person_id in self.indices[PERSON]:
-                job = data["category"]
+    def _parse_principal(self, dataset_path, shard: Shard = None):
+        films, persons = self.indices[FILM], self.indices[PERSON]
+        for idx, (tconst, ordering, nconst, job) in enumerate(
+            self._parse_raw_dataset(PRINCIPAL, dataset_path, PRINCIPAL_COLUMNS, shard),
+            start=shard.first_row if shard else 0,
+        ):
+            film_id, person_id = get_int(tconst), get_int(nconst)
+            if film_id in films and person_id in persons:
                 self._update_jobs(job)
-                data_line = (idx, film_id, person_id, self.jobs[job])
-                yield data_line, progress
+                yield idx, film_id, person_id, self.jobs[job], ordering
                 self.person_film.add((person_id, film_id))
 
     def _update_jobs(self, job):
         if job not in self.jobs:
             self.jobs[job] = len(self.jobs) + 1
 
-    def _parse_rating(self, dataset_path):
-        for idx, (data, progress) in enumerate(self._parse_raw_dataset(dataset_path)):
-            film_id = get_int(data["tconst"])
-            if film_id in self.indices[FILM]:
-                data_line = (idx, data["averageRating"], data["numVotes"], film_id)
-                yield data_line, progress
-
-    def _parse_raw_dataset(self, file_path):
-        size = getsize(file_path)
-        read_size = 0
-        with open(file_path) as fd:
-            tsv_reader = csv.reader(fd, delimiter=self.delimiter)
-            headers = next(tsv_reader)
+    def _parse_rating(self, dataset_path, shard: Shard = None):
+        films = self.indices[FILM]
+        for idx, (tconst, average_rating, num_votes) in enumerate(
+            self._parse_raw_dataset(RATING, dataset_path, RATING_COLUMNS, shard),
+            start=shard.first_row if shard else 0,
+        ):
+            film_id = get_int(tconst)
+            if film_id in films:
+                yield idx, average_rating, num_votes, film_id
+
+    def _parse_raw_dataset(
+        self, table_name: str, file_path, columns: List[str], shard: Shard = None
+    ) -> Iterator[Tuple]:
+        """
+        Read data set rows and pick given columns from them.
+        Rows with missing columns are stored to errors
+        :param table_name: name of table data set is parsed to
+        :param file_path: data set file path
+        :param columns: names of columns to pick
+        :param shard: optional byte range of data set file to read
+        :return: iterator of tuples with columns values
+        """
+        with self._open_raw_dataset(file_path, shard) as lines:
+            tsv_reader = csv.reader(lines, delimiter=self.delimiter)
+            headers = shard.headers if shard else next(tsv_reader)
+            get_columns = itemgetter(*[headers.index(column) for column in columns])
             for line in tsv_reader:
-                read_size += len("".join(line)) + len(line)
-                data = dict(zip(headers, line))
-                yield data, (read_size / size) * 100
+                try:
+                    values = get_columns(line)
+                except IndexError:
+                    self.errors[table_name].append(dict(zip(headers, line)))
+                    continue
+                yield values
+
+    @contextmanager
+    def _open_raw_dataset(self, file_path, shard: Shard = None):
+        """
+        Open data set for reading text lines, progress is tracked by position
+        in underlying binary file. Shard is tracked as part of task registered
+        by `_parse_sharded`
+        """
+        name = get_progress_name(file_path)
+        if shard is None:
+            with open_dataset(file_path) as fd, PROGRESS.task(
+                name, getsize(file_path)
+            ) as task:
+                # Size of gzipped dataset is known only in compressed bytes
+                raw = (
+                    fd.buffer.fileobj
+                    if isinstance(fd.buffer, gzip.GzipFile)
+                    else fd.buffer
+                )
+                with task.track(raw.tell):
+                    yield fd
+        else:
+            with open(file_path, "rb") as fd, PROGRESS.task(
+                name, shard.end - shard.start, parts=shard.index + 1
+            ) as task:
+                # Reader is positioned at shard start lazily and reads one line
+                # past shard end
+                with task.track(
+                    lambda: min(max(fd.tell(), shard.start), shard.end) - shard.start,
+                    shard.index,
+                ):
+                    yield _iter_shard_lines(fd, shard)
 
     def _write_data(self, table_name: str, data: Iterable[Tuple]):
-        file_name = Path(self.root / f"{table_name}.{self.csv_extension}")
-        with open(file_name, "w") as dataset_out:
-            print(f"Dumping to f'{file_name}' file ...")
-            writer = self._get_csv_writer(dataset_out)
-            writer.writerows(data)
+        file_name = self._get_output_filename(table_name)
+        print(f"Dumping to f'{file_name}' file ...")
+        self._write_rows(table_name, file_name, data)
 
     def _write_extra_data(self, table: str, mapper: str, extra_data: Dict):
-        table_filename = get_csv_filename(self.csv_extension, self.root, table)
-        mapper_filename = get_csv_filename(self.csv_extension, self.root, mapper)
-
-        with open(table_filename, "w") as table_file:
-            print(f"Dumping to {table_filename} and {mapper_filename} files ...")
-            table_writer = self._get_csv_writer(table_file)
-            with open(mapper_filename, "w") as mapper_file:
-                mapper_writer = self._get_csv_writer(mapper_file)
-                for idx, (field, table_ids) in enumerate(extra_data.items()):
-                    table_writer.writerow([idx, field])
-                    mapper_writer.writerows((idx, table_id) for table_id in table_ids)
+        table_filename = self._get_output_filename(table)
+        mapper_filename = self._get_output_filename(mapper)
+
+        print(f"Dumping to {table_filename} and {mapper_filename} files ...")
+        self._write_rows(table, table_filename, self.get_extra_table_rows(extra_data))
+        self._write_rows(
+            mapper, mapper_filename, self.get_extra_mapper_rows(extra_data)
+        )
+
+    def _write_rows(self, table_name: str, file_name: Path, rows: Iterable[Tuple]):
+        with METRICS.stage("write", table_name) as record:
+            record.rows = 0
+            with self._open_writer(table_name, file_name) as writer:
+                for batch in _iter_batches(iter(rows)):
+                    writer.writerows(batch)
+                    record.rows += len(batch)
+
+    @staticmethod
+    def get_extra_table_rows(extra_data: Dict) -> Iterator[Tuple]:
+        for idx, field in enumerate(extra_data):
+            yield idx, field
+
+    @staticmethod
+    def get_extra_mapper_rows(extra_data: Dict) -> Iterator[Tuple]:
+        for idx, table_ids in enumerate(extra_data.values()):
+            for table_id in table_ids:
+                yield idx, table_id
+
+    def get_job_rows(self) -> List[Tuple]:
+        return [(value, key) for key, value in self.jobs.items()]
 
     def _get_csv_writer(self, file_obj):
         return csv.writer(file_obj, delimiter=self.delimiter)
 
+    def _get_extension(self) -> str:
+        if self.output_format == PARQUET_EXTENSION:
+            return PARQUET_EXTENSION
+        return self.csv_extension
+
+    def _get_output_filename(self, table_name: str) -> Path:
+        """
+        Returns path of output file of table. CSV files are written to root
+        and split into chunks afterwards, Parquet files are written straight
+        to chunks directory, as loader splits them by row groups
+        :param table_name: name of table
+        :return: output file path
+        """
+        if self.output_format != PARQUET_EXTENSION:
+            return get_csv_filename(self.csv_extension, self.root, table_name)
+        chunks_dir = self.root / table_name
+        chunks_dir.mkdir(exist_ok=True)
+        for chunk in chunks_dir.glob(f"{table_name}.*"):
+            chunk.unlink()
+        return chunks_dir / f"{table_name}.{PARQUET_EXTENSION}"
+
+    @contextmanager
+    def _open_writer(self, table_name: str, file_name: Path):
+        """
+        Open writer of table rows in output format: csv writer or Parquet
+        writer with typed columns, which requires pyarrow
+        """
+        if self.output_format == PARQUET_EXTENSION:
+            from src.parquet import ParquetWriter
+
+            with ParquetWriter(file_name, table_name, **self.parquet_config) as writer:
+                yield writer
+        else:
+            with open(file_name, "w") as file_obj:
+                yield self._get_csv_writer(file_obj)
+
     def _split_all(self):
         processes = cpu_count()
         split_worker = partial(self._split_file, processes)
         with Pool(processes) as pool:
-            pool.map(
-                split_worker, glob(str(Path(self.root, f"*.{self.csv_extension}")))
+            METRICS.add(
+                pool.map(
+                    split_worker, glob(str(Path(self.root, f"*.{self.csv_extension}")))
+                )
             )
 
     @staticmethod
-    def _split_file(processes: int, path: str):
+    def _split_file(processes: int, path: str) -> StageRecord:
         _path = Path(path)
-        chunks_dir = _path.parent / _path.stem
-        subprocess.call(["mkdir", "-p", str(chunks_dir)])
-        lines_count = (
-            int(subprocess.check_output(["wc", "-l", path]).split()[0]) // processes
-        ) + 1
-        subprocess.call(
-            [
-                "split",
-                path,
-                "-d",
-                "-l",
-                str(lines_count),
-                f"{str(chunks_dir / _path.name)}.",
-            ]
-        )
-        remove(path)
+        with measure("split", _path.stem) as record:
+            chunks_dir = _path.parent / _path.stem
+            subprocess.call(["mkdir", "-p", str(chunks_dir)])
+            # Drop chunks left by previous parsing, e.g. in other output format
+            for chunk in chunks_dir.glob(f"{_path.stem}.*"):
+                chunk.unlink()
+            record.bytes = getsize(path)
+            record.rows = int(subprocess.check_output(["wc", "-l", path]).split()[0])
+            subprocess.call(
+                [
+                    "split",
+                    path,
+                    "-d",
+                    "-l",
+                    str(record.rows // processes + 1),
+                    f"{str(chunks_dir / _path.name)}.",
+                ]
+            )
+            remove(path)
+        return record
+
+
+def _iter_batches(rows: Iterator[Tuple]) -> Iterator[List[Tuple]]:
+    return iter(lambda: list(islice(rows, WRITE_BATCH_ROWS)), [])
+
+
+def _read_shard_lines(file_path: Path, shard: Shard) -> Iterator[str]:
+    with open(file_path, "rb") as fd:
+        yield from _iter_shard_lines(fd, shard)
+
+
+def _iter_shard_lines(fd, shard: Shard) -> Iterator[str]:
+    fd.seek(shard.start)
+    position = shard.start
+    for line in fd:
+        if position >= shard.end:
+            break
+        position += len(line)
+        yield line.decode()
@@ -0,0 +1,81 @@
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+from src.dataset_loader import DatasetLoader
+from src.dataset_parser import (
+    DatasetParser,
+    JOB,
+    PRINCIPAL,
+    PERSON_FILM,
+    PROFESSION,
+    PERSON_PROFESSION,
+    GENRE,
+    GENRE_FILM,
+)
+
+
+class DatasetStreamer:
+    """
+    Parses gzipped datasets and copies normalized rows straight to database,
+    so neither extracted datasets nor intermediate csv files touch the disk
+    """
+
+    def __init__(self, cmd_args, config: Dict):
+        self.root = Path(cmd_args.root)
+        self.quiet = cmd_args.quiet
+        self.dataset_file_ext = config["dataset_file_ext"]
+
+        self.parser = DatasetParser(cmd_args, config)
+        self.loader = DatasetLoader(cmd_args, config)
+        self.jobs_connection = None
+
+    def stream_dataset(self):
+        self.loader.db_init()
+        self.loader.clean_up()
+
+        # Jobs are discovered while principals are being copied, so they are
+        # inserted through separate connection before principal rows reference
+        # them. Foreign keys are checked at the end of COPY statement
+        self.jobs_connection = self.loader.engine.raw_connection()
+        try:
+            for table_name, dataset_path in self.parser.dataset_paths:
+                rows = self.parser.iter_normalized_dataset(
+                    table_name, self._get_gzipped_path(dataset_path)
+                )
+                if table_name == PRINCIPAL:
+                    rows = self._insert_new_jobs(rows)
+                self.loader.copy_rows(table_name, rows)
+        finally:
+            self.jobs_connection.close()
+
+        self.loader.copy_rows(PERSON_FILM, self.parser.person_film)
+        self._copy_extra_data(
+            PROFESSION, PERSON_PROFESSION, self.parser.profession_person
+        )
+        self._copy_extra_data(GENRE, GENRE_FILM, self.parser.genre_film)
+        self.loader.create_search_indexes()
+        self.loader.create_order_indexes()
+        self.loader.refresh_views()
+        self.loader.bump_dataset_version()
+
+        self.parser.dump_errors()
+
+    def _get_gzipped_path(self, dataset_path: str) -> Path:
+        return self.root / f"{dataset_path}.{self.dataset_file_ext}"
+
+    def _insert_new_jobs(self, rows: Iterator[Tuple]) -> Iterator[Tuple]:
+        inserted = 0
+        for data_line in rows:
+            if len(self.parser.jobs) > inserted:
+                job_rows = self.parser.get_job_rows()[inserted:]
+                with self.jobs_connection.cursor() as cursor:
+                    cursor.executemany(
+                        f"INSERT INTO {JOB} (id, job) VALUES (%s, %s)", job_rows
+                    )
+                self.jobs_connection.commit()
+                inserted = len(self.parser.jobs)
+            yield data_line
+
+    def _copy_extra_data(self, table: str, mapper: str, extra_data: Dict):
+        self.loader.copy_rows(table, self.parser.get_extra_table_rows(extra_data))
+        self.loader.copy_rows(mapper, self.parser.get_extra_mapper_rows(extra_data))
@@ -0,0 +1,275 @@
+import os
+import sqlite3
+from functools import partial
+from glob import glob
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import Boolean
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+import src.models as models
+from src import adjacency, summary
+from src.dataset_loader import ORDER_COLUMNS, get_copy_columns, get_load_order
+from src.expressions import SQLITE, get_fts_table
+from src.metrics import METRICS
+from src.utils import is_parquet_file
+
+# Columns searched by `match` arguments, each one has FTS5 table
+SEARCH_COLUMNS = [
+    (summary.FILM_SUMMARY, "title"),
+    (models.PersonModel.__tablename__, "name"),
+]
+# Tokenizer close to `simple` text search configuration of Postgres
+FTS_TOKENIZER = "unicode61 remove_diacritics 0"
+
+
+def get_database_path(db_uri: str) -> Path:
+    """
+    :param db_uri: database URI, e.g. sqlite:///imdb.sqlite
+    :return: absolute path of database file
+    """
+    return Path(make_url(db_uri).database).resolve()
+
+
+def connect_read_only(path: Path, mmap_size: int) -> sqlite3.Connection:
+    """
+    Opens database file as read-only and immutable, so no locks are taken,
+    with file memory-mapped, so pages are read from OS page cache without
+    copying. File must not be changed while it's open, new database is
+    swapped in by loader with rename
+    :param path: database file path
+    :param mmap_size: max number of bytes of file to map
+    :return: connection, which may be used by any thread of pool
+    """
+    connection = sqlite3.connect(
+        f"{path.as_uri()}?mode=ro&immutable=1", uri=True, check_same_thread=False
+    )
+    connection.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    return connection
+
+
+def get_engine_options(db_uri: str, config: Dict) -> Dict:
+    """
+    Returns options of engine serving embedded database through read-only,
+    memory-mapped connections
+    :param db_uri: database URI
+    :param config: `embedded` section of config
+    :return: dict of create_engine arguments, URL included
+    """
+    path = get_database_path(db_uri)
+    return {
+        "url": f"{SQLITE}:///{path}",
+        "creator": partial(connect_read_only, path, config["mmap_size"]),
+        # Connections are kept open, each one holds its own mapping of file
+        "poolclass": QueuePool,
+    }
+
+
+def iter_chunk_rows(file_name: str) -> Iterator[Tuple]:
+    """
+    Read rows of chunk of parsed data set, CSV chunk lines are split
+    as COPY splits them
+    """
+    if is_parquet_file(file_name):
+        from src import parquet
+
+        yield from parquet.iter_rows(file_name)
+        return
+    with open(file_name) as chunk:
+        for line in chunk:
+            yield line.rstrip("\r\n").split("\t")
+
+
+class EmbeddedLoader:
+    """
+    Loads parsed data sets into single-file SQLite database, which is served
+    read-only. Database is built in temporary file next to target one and
+    renamed when it's complete. Tables are filled by batched executemany
+    in single transaction without journal, indexes are created after load,
+    followed by film_summary, adjacency and full-text search tables, which
+    replace materialized views and GIN indexes of Postgres
+    """
+
+    def __init__(self, cmd_args, config: Dict):
+        self.root = Path(cmd_args.root)
+        self.path = get_database_path(cmd_args.dburi)
+        self.quiet = cmd_args.quiet
+        self.dataset_paths: List[Tuple] = config["dataset_paths"].items()
+        self.batch_rows = config["embedded"]["batch_rows"]
+        self.cache_size = config["embedded"]["cache_size"]
+        self.temp_path = self.path.with_name(f"{self.path.name}.tmp")
+        self.metadata = models.db.metadata
+        self.dialect = sqlite.dialect()
+        self.connection = None
+
+    def db_init(self):
+        if self.temp_path.exists():
+            self.temp_path.unlink()
+        self.connection = sqlite3.connect(self.temp_path, isolation_level=None)
+        for pragma in [
+            "journal_mode = OFF",
+            "synchronous = OFF",
+            "locking_mode = EXCLUSIVE",
+            "temp_store = MEMORY",
+            f"cache_size = -{int(self.cache_size)}",
+        ]:
+            self.connection.execute(f"PRAGMA {pragma}")
+        for table in self.metadata.sorted_tables:
+            self._execute(CreateTable(table))
+
+    def load_dataset(self):
+        self.connection.execute("BEGIN")
+        for table_name in get_load_order(self.dataset_paths):
+            self._copy_table(table_name)
+        self.connection.execute("COMMIT")
+
+        self.create_indexes()
+        self.create_film_summary()
+        self.create_adjacency_tables()
+        self.create_search_tables()
+        self._execute_statements(
+            "Analyzing tables",
+            [
+                f"INSERT INTO {models.DatasetVersionModel.__tablename__} "
+                f"(id, version, loaded_at) VALUES (1, 1, datetime('now'))",
+                "ANALYZE",
+            ],
+        )
+        self.connection.execute("PRAGMA journal_mode = DELETE")
+        self.connection.close()
+        os.replace(self.temp_path, self.path)
+        if not self.quiet:
+            print(f"Database is written to '{self.path}'")
+
+    def create_indexes(self):
+        """
+        Create indexes of models, of foreign keys, which relations are looked
+        up by, and (column DESC, id) indexes of ordered columns
+        """
+        statements = []
+        for table in self.metadata.sorted_tables:
+            statements.extend(
+                str(CreateIndex(index).compile(dialect=self.dialect))
+                for index in table.indexes
+            )
+            statements.extend(
+                f"CREATE INDEX ix_{table.name}_{column.name} "
+                f"ON {table.name} ({column.name})"
+                for column in table.columns
+                if column.foreign_keys
+            )
+        statements.extend(
+            f"CREATE INDEX ix_{table_name}_{column}_id "
+            f"ON {table_name} ({column} DESC, id)"
+            for table_name, column in ORDER_COLUMNS
+        )
+        self._execute_statements("Creating indexes", statements)
+
+    def create_film_summary(self):
+        """
+        Create film_summary table: film with its rating and genres, which
+        films queries read without joins
+        """
+        table = models.FilmSummaryModel.__table__
+        self._execute_statements(
+            "Creating film summary",
+            [
+                str(CreateTable(table).compile(dialect=self.dialect)),
+                f"INSERT INTO {summary.FILM_SUMMARY} "
+                f"({', '.join(table.columns.keys())}) "
+                f"{summary.get_embedded_definition()}",
+                *(
+                    f"CREATE INDEX ix_{summary.FILM_SUMMARY}_{column}_id "
+                    f"ON {summary.FILM_SUMMARY} ({column} DESC, id)"
+                    for column in summary.ORDER_COLUMNS
+                ),
+            ],
+        )
+
+    def create_adjacency_tables(self):
+        """
+        Create tables of person-film adjacency: sorted JSON array of film ids
+        per person and of person ids per film
+        """
+        statements = []
+        for view_name, (key, _, adjacent_ids) in adjacency.ADJACENCY_VIEWS.items():
+            statements.extend(
+                [
+                    f"CREATE TABLE {view_name} "
+                    f"({key} INTEGER PRIMARY KEY, {adjacent_ids} JSON)",
+                    f"INSERT INTO {view_name} "
+                    f"{adjacency.get_embedded_definition(view_name)}",
+                ]
+            )
+        self._execute_statements("Creating adjacency tables", statements)
+
+    def create_search_tables(self):
+        """
+        Create FTS5 tables of searched columns, which index content of their
+        tables by id
+        """
+        statements = []
+        for table_name, column in SEARCH_COLUMNS:
+            fts_table = get_fts_table(table_name, column)
+            statements.extend(
+                [
+                    f"CREATE VIRTUAL TABLE {fts_table} USING fts5({column}, "
+                    f"content='{table_name}', content_rowid='id', "
+                    f"tokenize='{FTS_TOKENIZER}')",
+                    f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')",
+                ]
+            )
+        self._execute_statements("Creating search tables", statements)
+
+    def _copy_table(self, table_name: str):
+        """
+        Insert rows of all chunks of parsed data set into table by batches.
+        Text of integer and float columns is converted by column affinity,
+        booleans are converted here
+        """
+        if not self.quiet:
+            print(f"Copying data to '{table_name}' table ...")
+        table = self.metadata.tables[table_name]
+        columns = get_copy_columns(table)
+        booleans = [
+            idx
+            for idx, column in enumerate(columns)
+            if isinstance(table.c[column].type, Boolean)
+        ]
+        statement = (
+            f"INSERT INTO {table_name} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        with METRICS.stage("copy", table_name) as record:
+            record.rows = 0
+            for file_name in sorted(glob(str(self.root / table_name / "*"))):
+                rows = iter_chunk_rows(file_name)
+                if booleans:
+                    rows = map(partial(_convert_booleans, booleans), rows)
+                for batch in iter(lambda: list(islice(rows, self.batch_rows)), []):
+                    self.connection.executemany(statement, batch)
+                    record.rows += len(batch)
+
+    def _execute(self, ddl):
+        self.connection.execute(str(ddl.compile(dialect=self.dialect)))
+
+    def _execute_statements(self, title: str, statements: List[str]):
+        if not self.quiet:
+            print(f"{title} ...")
+        with METRICS.stage("sql", title):
+            self.connection.execute("BEGIN")
+            for statement in statements:
+                self.connection.execute(statement)
+            self.connection.execute("COMMIT")
+
+
+def _convert_booleans(indexes: List[int], row) -> List:
+    row = list(row)
+    for idx in indexes:
+        row[idx] = row[idx] in (True, "True")
+    return row
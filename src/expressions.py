@@ -0,0 +1,182 @@
+import re
+
+from sqlalchemy import cast, func
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import Float, Integer
+
+import src.models as models
+
+SQLITE = "sqlite"
+
+# Term of web search string: optionally negated "quoted phrase" or word
+WEBSEARCH_TERM = re.compile(r'(-?)"([^"]*)"?|(\S+)')
+
+
+def get_fts_table(table_name: str, column: str) -> str:
+    """
+    Returns name of FTS5 table indexing column in embedded database
+    """
+    return f"{table_name}_{column}_fts"
+
+
+def get_fts_query(match: str) -> str:
+    """
+    Translates web search string, as parsed by websearch_to_tsquery, to FTS5
+    query: words and "quoted phrases" are ANDed, OR and -negation keep their
+    precedence. FTS5 negation needs preceding term, so negated term at start
+    or after OR is dropped. Query without terms matches nothing
+    :param match: web search string
+    :return: FTS5 query
+    """
+    terms, operator = [], None
+    for negation, phrase, word in WEBSEARCH_TERM.findall(match):
+        if word.lower() == "or":
+            operator = "OR" if terms else None
+            continue
+        if word.startswith("-"):
+            negation, word = "-", word[1:]
+        term = phrase or word
+        if not any(el.isalnum() for el in term):
+            continue
+        term = '"{}"'.format(term.replace('"', '""'))
+        if negation:
+            if terms and operator is None:
+                terms.append(f"NOT {term}")
+            continue
+        if terms:
+            terms.append(f"{operator or 'AND'} {term}")
+        else:
+            terms.append(term)
+        operator = None
+    return " ".join(terms) or '""'
+
+
+def _get_table_name(column) -> str:
+    table = column.table
+    while hasattr(table, "element"):
+        table = table.element
+    return table.name
+
+
+def _get_fts_subquery(compiler, column, fts_query, select: str, **kw) -> str:
+    fts_table = get_fts_table(_get_table_name(column), column.name)
+    return (
+        f"SELECT {select} FROM {fts_table} WHERE {fts_table} MATCH "
+        f"{compiler.process(fts_query, **kw)}"
+    )
+
+
+class search_match(FunctionElement):
+    """
+    Full-text match of text column by web search string: match of tsvector,
+    which has GIN index, in Postgres, and lookup in FTS5 table of column
+    in embedded SQLite database. Predicates have no Boolean type, which
+    SQLite would compare to 1, hiding them from query planner
+    """
+
+    name = "search_match"
+    inherit_cache = True
+
+    def __init__(self, column, match: str):
+        # FTS5 query is bound along with search string, so cached statements
+        # get both of them from parameters
+        super().__init__(column, match, get_fts_query(match))
+
+
+class search_rank(FunctionElement):
+    """
+    Rank of full-text match of text column by web search string, higher
+    rank is better match: ts_rank in Postgres, negated bm25 in SQLite
+    """
+
+    name = "search_rank"
+    type = Float()
+    inherit_cache = True
+
+    def __init__(self, column, match: str):
+        super().__init__(column, match, get_fts_query(match))
+
+
+class array_contains(FunctionElement):
+    """
+    Whether array column contains value: array of Postgres, which has GIN
+    index, or JSON array in SQLite
+    """
+
+    name = "array_contains"
+    inherit_cache = True
+
+
+class array_length(FunctionElement):
+    """
+    Number of elements of array column: array of Postgres or JSON array
+    in SQLite
+    """
+
+    name = "array_length"
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(search_match)
+def compile_search_match(element, compiler, **kw):
+    column, match, _ = element.clauses
+    ts_query = func.websearch_to_tsquery(models.SEARCH_CONFIG, match)
+    return compiler.process(models.get_search_vector(column).op("@@")(ts_query), **kw)
+
+
+@compiles(search_match, SQLITE)
+def compile_search_match_sqlite(element, compiler, **kw):
+    column, _, fts_query = element.clauses
+    return (
+        f"{compiler.process(column.table.c.id, **kw)} IN "
+        f"({_get_fts_subquery(compiler, column, fts_query, 'rowid', **kw)})"
+    )
+
+
+@compiles(search_rank)
+def compile_search_rank(element, compiler, **kw):
+    column, match, _ = element.clauses
+    return compiler.process(
+        func.ts_rank(
+            models.get_search_vector(column),
+            func.websearch_to_tsquery(models.SEARCH_CONFIG, match),
+        ),
+        **kw,
+    )
+
+
+@compiles(search_rank, SQLITE)
+def compile_search_rank_sqlite(element, compiler, **kw):
+    column, _, fts_query = element.clauses
+    subquery = _get_fts_subquery(compiler, column, fts_query, "-rank", **kw)
+    row_id = compiler.process(column.table.c.id, **kw)
+    return f"coalesce(({subquery} AND rowid = {row_id}), 0)"
+
+
+@compiles(array_contains)
+def compile_array_contains(element, compiler, **kw):
+    column, value = element.clauses
+    # Array of value has type of column, so GIN index of column is used
+    return compiler.process(column.op("@>")(cast(array([value]), column.type)), **kw)
+
+
+@compiles(array_contains, SQLITE)
+def compile_array_contains_sqlite(element, compiler, **kw):
+    column, value = element.clauses
+    return (
+        f"EXISTS (SELECT 1 FROM json_each({compiler.process(column, **kw)}) "
+        f"WHERE value = {compiler.process(value, **kw)})"
+    )
+
+
+@compiles(array_length)
+def compile_array_length(element, compiler, **kw):
+    return f"cardinality({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(array_length, SQLITE)
+def compile_array_length_sqlite(element, compiler, **kw):
+    return f"json_array_length({compiler.process(element.clauses, **kw)})"
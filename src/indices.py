@@ -0,0 +1,103 @@
+import heapq
+from array import array
+from typing import Iterator, List, Optional, Tuple
+
+PAIR_RUN_SIZE = 1 << 20
+PAIR_SHIFT = 32
+PAIR_MASK = (1 << PAIR_SHIFT) - 1
+
+
+class IdIndex:
+    """
+    Set of non-negative integer ids stored as bitmap, one bit per id.
+    IMDB ids are dense (tt0000001, nm0000001, ...), so bitmap of ~10M ids
+    takes ~1.2MB, comparing to hundreds of MB for set of Python ints
+    """
+
+    def __init__(self):
+        self._bits = bytearray()
+        self._len = 0
+
+    def add(self, id_: Optional[int]):
+        if id_ is None:
+            return
+        byte = id_ >> 3
+        if byte >= len(self._bits):
+            self._bits.extend(
+                bytes(max(byte + 1, 2 * len(self._bits)) - len(self._bits))
+            )
+        mask = 1 << (id_ & 7)
+        if not self._bits[byte] & mask:
+            self._bits[byte] |= mask
+            self._len += 1
+
+    def update(self, other: "IdIndex"):
+        """
+        Add all ids of other index
+        :param other: IdIndex
+        :return:
+        """
+        if len(other._bits) > len(self._bits):
+            self._bits.extend(bytes(len(other._bits) - len(self._bits)))
+        merged = int.from_bytes(self._bits, "little") | int.from_bytes(
+            other._bits, "little"
+        )
+        self._bits[:] = merged.to_bytes(len(self._bits), "little")
+        self._len = bin(merged).count("1")
+
+    def __contains__(self, id_: Optional[int]) -> bool:
+        if id_ is None:
+            return False
+        byte = id_ >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (id_ & 7)))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for byte_idx, byte in enumerate(self._bits):
+            if byte:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield (byte_idx << 3) | bit
+
+
+class PairSet:
+    """
+    Set of (int, int) pairs, each packed into single unsigned 64-bit integer.
+    Added pairs are collected in array buffer, which is sorted and deduplicated
+    into a run once it reaches `run_size`. Iteration merges all the runs and
+    yields unique pairs in sorted order
+    """
+
+    def __init__(self, run_size: int = PAIR_RUN_SIZE):
+        self.run_size = run_size
+        self._runs: List[array] = []
+        self._buffer = array("Q")
+
+    def add(self, pair: Tuple[int, int]):
+        first, second = pair
+        self._buffer.append(first << PAIR_SHIFT | second)
+        if len(self._buffer) >= self.run_size:
+            self._flush()
+
+    def update(self, other: "PairSet"):
+        other._flush()
+        self._flush()
+        self._runs.extend(other._runs)
+
+    def _flush(self):
+        if self._buffer:
+            self._runs.append(array("Q", sorted(set(self._buffer))))
+            self._buffer = array("Q")
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        self._flush()
+        previous = None
+        for key in heapq.merge(*self._runs):
+            if key != previous:
+                previous = key
+                yield key >> PAIR_SHIFT, key & PAIR_MASK
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
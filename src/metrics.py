@@ -0,0 +1,236 @@
+import cProfile
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.utils import get_peak_rss
+
+UNSAFE_FILENAME_CHARS = re.compile(r"[^\w.-]+")
+
+# Directory of cProfile stats of stages, profiling is off when it's None
+_profile_dir: Optional[Path] = None
+# Profilers of stages entered by current thread, innermost last
+_profilers = threading.local()
+
+
+@dataclass
+class StageRecord:
+    """
+    Measurements of one pipeline stage, e.g. parsing of data set or copying
+    of chunk. CPU time is time of process, all its threads and its finished
+    child processes, so stages running concurrently in threads of the same
+    process share it. Peak RSS is high-water mark of process or of its
+    largest finished child process by the end of stage
+    """
+
+    stage: str
+    name: Optional[str] = None
+    part: Optional[str] = None
+    pid: int = 0
+    started: float = 0.0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+    peak_rss: int = 0
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict:
+        record = asdict(self)
+        record["rows_per_second"] = _get_rate(self.rows, self.wall_time)
+        record["bytes_per_second"] = _get_rate(self.bytes, self.wall_time)
+        return record
+
+
+def _get_rate(count: Optional[int], seconds: float) -> Optional[float]:
+    if count is None or seconds <= 0:
+        return None
+    return count / seconds
+
+
+def get_cpu_time() -> float:
+    """
+    CPU time of current process and its finished child processes
+    :return: seconds
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def get_peak_rss_of_tree() -> int:
+    """
+    Peak RSS of current process or of its largest finished child process
+    :return: size in bytes
+    """
+    return max(get_peak_rss(), get_peak_rss(resource.RUSAGE_CHILDREN))
+
+
+def enable_profiling(profile_dir: Path):
+    """
+    Profile stages started from now on with cProfile, stats of each stage
+    are written to `<stage>-<name>-<part>.<pid>.prof` file of directory
+    :param profile_dir: directory of stats files, created if needed
+    """
+    global _profile_dir
+    _profile_dir = Path(profile_dir)
+    _profile_dir.mkdir(parents=True, exist_ok=True)
+
+
+def _start_profiler() -> Optional[cProfile.Profile]:
+    """
+    Start profiler of stage. Only one profiler of thread can be active, so
+    profiler of enclosing stage is paused: code of nested stage is profiled
+    only by its own profiler
+    """
+    if _profile_dir is None:
+        return None
+    if getattr(_profilers, "pid", None) != os.getpid():
+        # Forked worker inherits profilers of stages being run by parent
+        for profiler in getattr(_profilers, "stack", []):
+            profiler.disable()
+        _profilers.pid, _profilers.stack = os.getpid(), []
+    stack = _profilers.stack
+    if stack:
+        stack[-1].disable()
+    profiler = cProfile.Profile()
+    stack.append(profiler)
+    profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler: Optional[cProfile.Profile], record: StageRecord):
+    if profiler is None:
+        return
+    profiler.disable()
+    stack = _profilers.stack
+    stack.pop()
+    if stack:
+        stack[-1].enable()
+    labels = "-".join(el for el in [record.stage, record.name, record.part] if el)
+    file_name = f"{UNSAFE_FILENAME_CHARS.sub('_', labels)}.{record.pid}.prof"
+    profiler.dump_stats(_profile_dir / file_name)
+
+
+@contextmanager
+def measure(stage: str, name: str = None, part: str = None) -> Iterator[StageRecord]:
+    """
+    Measure wall time, CPU time and peak RSS of block of code. Block sets
+    `rows` and `bytes` of yielded record, which it processed. Stage, which
+    raised exception, is measured as well and keeps the error
+    :param stage: stage name, e.g. parse
+    :param name: name of processed item, e.g. table name
+    :param part: part of item, e.g. chunk file name
+    :return: record filled in when block exits
+    """
+    record = StageRecord(
+        stage=stage, name=name, part=part, pid=os.getpid(), started=time.time()
+    )
+    started, cpu_started = time.perf_counter(), get_cpu_time()
+    profiler = _start_profiler()
+    try:
+        yield record
+    except BaseException as exc:
+        record.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _stop_profiler(profiler, record)
+        record.wall_time = time.perf_counter() - started
+        record.cpu_time = get_cpu_time() - cpu_started
+        record.peak_rss = get_peak_rss_of_tree()
+
+
+class Metrics:
+    """
+    Records of stages of run. Stages of worker processes are measured there
+    and their records are added by caller
+    """
+
+    def __init__(self):
+        self.records: List[StageRecord] = []
+        self.started = time.time()
+        self._cpu_started = get_cpu_time()
+
+    @contextmanager
+    def stage(
+        self, stage: str, name: str = None, part: str = None
+    ) -> Iterator[StageRecord]:
+        """
+        Measure block of code as stage of run, see `measure`
+        """
+        with measure(stage, name, part) as record:
+            self.records.append(record)
+            yield record
+
+    def add(self, records: Iterable[StageRecord]):
+        self.records.extend(records)
+
+    def get_totals(self) -> List[Dict]:
+        """
+        Totals of parts of items, e.g. of chunks of table: sums of rows,
+        bytes and CPU time, wall time from start of first part to end of last
+        one, max peak RSS
+        """
+        parts = sorted(
+            (el for el in self.records if el.part is not None),
+            key=lambda el: (el.stage, el.name),
+        )
+        totals = []
+        for (stage, name), records in groupby(parts, lambda el: (el.stage, el.name)):
+            records = list(records)
+            total = StageRecord(
+                stage=stage,
+                name=name,
+                pid=os.getpid(),
+                started=min(el.started for el in records),
+                cpu_time=sum(el.cpu_time for el in records),
+                peak_rss=max(el.peak_rss for el in records),
+                rows=_get_sum(el.rows for el in records),
+                bytes=_get_sum(el.bytes for el in records),
+                error=next((el.error for el in records if el.error), None),
+            )
+            total.wall_time = (
+                max(el.started + el.wall_time for el in records) - total.started
+            )
+            totals.append({**total.as_dict(), "parts": len(records)})
+        return totals
+
+    def get_report(self) -> Dict:
+        return {
+            "command": sys.argv,
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            "wall_time": time.time() - self.started,
+            "cpu_time": get_cpu_time() - self._cpu_started,
+            "peak_rss": get_peak_rss_of_tree(),
+            "stages": [
+                el.as_dict() for el in sorted(self.records, key=lambda el: el.started)
+            ],
+            "totals": self.get_totals(),
+        }
+
+    def write_report(self, file_name: Path):
+        """
+        Write JSON report of run: its wall time, CPU time and peak RSS,
+        records of stages and totals of items processed by parts
+        :param file_name: report file path
+        """
+        with open(file_name, "w") as fd:
+            json.dump(self.get_report(), fd, indent=2)
+
+
+def _get_sum(values: Iterable[Optional[int]]) -> Optional[int]:
+    values = [el for el in values if el is not None]
+    return sum(values) if values else None
+
+
+# Records of current run
+METRICS = Metrics()
@@ -1,8 +1,30 @@
 from flask_sqlalchemy import SQLAlchemy
-
+from sqlalchemy.dialects.postgresql import ARRAY
 
 db = SQLAlchemy()
 
+SEARCH_CONFIG = "simple"
+
+
+def get_array_type(item_type):
+    """
+    Returns array type of Postgres, which is JSON array in embedded SQLite
+    database
+    :param item_type: type of array items
+    :return: column type
+    """
+    return ARRAY(item_type).with_variant(db.JSON, "sqlite")
+
+
+def get_search_vector(column):
+    """
+    Returns full-text search document of column. Loader builds GIN index
+    on the same expression, so matching against it doesn't scan table
+    :param column: text column
+    :return: tsvector expression
+    """
+    return db.func.to_tsvector(SEARCH_CONFIG, column)
+
 
 PersonFilm = db.Table(
     "person_film",
@@ -91,6 +113,8 @@ class PrincipalModel(db.Model):
     film_id = db.Column(db.Integer, db.ForeignKey("film.id"))
     person_id = db.Column(db.Integer, db.ForeignKey("person.id"))
     job_id = db.Column(db.Integer, db.ForeignKey("job.id"))
+    # Position of principal in film credits, unique within film
+    ordering = db.Column(db.Integer)
 
     job = db.relationship("JobModel", uselist=False, back_populates="principals")
 
@@ -128,3 +152,35 @@ class GenreModel(db.Model):
     films = db.relationship(
         "FilmModel", secondary=GenreFilm, cascade="delete,all", back_populates="genres"
     )
+
+
+class DatasetVersionModel(db.Model):
+    __tablename__ = "dataset_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    loaded_at = db.Column(db.DateTime)
+
+
+class FilmSummaryModel(db.Model):
+    """
+    Read-only model of film_summary materialized view: film with its rating
+    and genres, built by loader after tables are loaded (see src/summary.py),
+    or table of embedded database. View table has its own metadata, so it's
+    neither created nor cleaned up with tables
+    """
+
+    __table__ = db.Table(
+        "film_summary",
+        db.MetaData(),
+        db.Column("id", db.Integer, primary_key=True),
+        db.Column("title", db.String(450)),
+        db.Column("is_adult", db.Boolean),
+        db.Column("start_year", db.Integer),
+        db.Column("runtime_minutes", db.Integer),
+        db.Column("rating_id", db.Integer),
+        db.Column("average_rating", db.Float),
+        db.Column("num_votes", db.Integer),
+        db.Column("genre_ids", get_array_type(db.Integer)),
+        db.Column("genres", get_array_type(db.String(50))),
+    )
@@ -0,0 +1,159 @@
+from itertools import islice
+from os.path import getsize
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import BigInteger
+
+from src import models
+
+ROW_GROUP_SIZE = 100_000
+COMPRESSION = "zstd"
+
+ARROW_TYPES = {
+    int: pa.int32(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+    str: pa.string(),
+}
+
+
+def get_arrow_type(column) -> pa.DataType:
+    if isinstance(column.type, BigInteger):
+        return pa.int64()
+    return ARROW_TYPES[column.type.python_type]
+
+
+def get_schema(table_name: str) -> pa.Schema:
+    """
+    Returns Arrow schema of rows of parsed data set, typed as table columns
+    which values are copied from data set
+    :param table_name: name of table
+    :return: Arrow schema
+    """
+    table = models.db.metadata.tables[table_name]
+    return pa.schema(
+        [
+            pa.field(column.name, get_arrow_type(column), nullable=column.nullable)
+            for column in table.columns
+            if column.computed is None
+        ]
+    )
+
+
+class ParquetWriter:
+    """
+    Writer of rows of parsed data set to Parquet file: rows are buffered and
+    written by row groups of `row_group_size` rows, each row group is
+    converted to typed columns and compressed, so no more than one row group
+    is held in memory. It has `writerows` of csv writer, so it is used
+    in place of one
+    """
+
+    def __init__(
+        self,
+        file_name: Path,
+        table_name: str,
+        row_group_size: int = ROW_GROUP_SIZE,
+        compression: str = COMPRESSION,
+    ):
+        self.schema = get_schema(table_name)
+        self.row_group_size = row_group_size
+        self._writer = pq.ParquetWriter(
+            str(file_name), self.schema, compression=compression
+        )
+        self._pending: List[Tuple] = []
+
+    def writerows(self, rows: Iterable[Tuple]):
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.row_group_size - len(self._pending)))
+            if not batch:
+                break
+            self._pending.extend(batch)
+            if len(self._pending) == self.row_group_size:
+                self._write_row_group()
+
+    def close(self):
+        if self._pending:
+            self._write_row_group()
+        self._writer.close()
+
+    def __enter__(self) -> "ParquetWriter":
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
+
+    def _write_row_group(self):
+        columns = zip(*self._pending)
+        batch = pa.RecordBatch.from_arrays(
+            [
+                pa.array(values).cast(field.type)
+                for values, field in zip(columns, self.schema)
+            ],
+            schema=self.schema,
+        )
+        self._writer.write_batch(batch, row_group_size=self.row_group_size)
+        self._pending = []
+
+
+def get_row_group_slices(file_name: str, count: int) -> List[List[int]]:
+    """
+    Split row groups of Parquet file into up to `count` contiguous slices
+    of roughly the same number of row groups
+    :param file_name: Parquet file path
+    :param count: maximum number of slices
+    :return: list of lists of row group indexes
+    """
+    row_groups = pq.ParquetFile(file_name).num_row_groups
+    step, rest = divmod(row_groups, count)
+    slices, start = [], 0
+    for idx in range(min(count, row_groups)):
+        end = start + step + (idx < rest)
+        slices.append(list(range(start, end)))
+        start = end
+    return slices
+
+
+def get_chunks(file_name: str, count: int) -> List[Tuple[List[int], int]]:
+    """
+    Returns chunks of Parquet file to be copied in parallel
+    :param file_name: Parquet file path
+    :param count: maximum number of chunks
+    :return: list of (row group indexes, estimated size in bytes)
+    """
+    size = getsize(file_name)
+    slices = get_row_group_slices(file_name, count)
+    if not slices:
+        return []
+    row_groups = sum(len(el) for el in slices)
+    return [(el, size * len(el) // row_groups) for el in slices]
+
+
+def iter_rows(
+    file_name: str, row_groups: Optional[List[int]] = None
+) -> Iterator[Tuple]:
+    """
+    Read rows of Parquet file one record batch at a time
+    :param file_name: Parquet file path
+    :param row_groups: indexes of row groups to read, all of them by default
+    :return: iterator of tuples with columns values
+    """
+    parquet_file = pq.ParquetFile(file_name)
+    for batch in parquet_file.iter_batches(row_groups=row_groups):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def read_table(file_names: Iterable[str], columns: List[str] = None) -> pa.Table:
+    """
+    Read chunks of parsed data set as single Arrow table, e.g. for analytics
+    :param file_names: Parquet files of data set table in order of chunks
+    :param columns: names of columns to read, all of them by default
+    :return: Arrow table
+    """
+    return pa.concat_tables(
+        pq.read_table(file_name, columns=columns) for file_name in file_names
+    )
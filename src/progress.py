@@ -0,0 +1,423 @@
+"""
+Progress of long running stages: downloading, extraction, parsing and copying.
+Stage registers task of known size (e.g. bytes of data set file) and attaches
+getters of real positions to it (e.g. `tell()` of file being read). Reporter
+thread samples getters once per interval and emits percent, rate and ETA of
+tasks to sinks: terminal, log or HTTP status endpoint, so nothing is done per
+row or per block of data.
+
+Positions are kept in shared memory: task registered before worker processes
+are forked is sampled by reporter thread of worker and reported by parent
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.sharedctypes import RawArray, RawValue
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.utils import ERASE_LINE
+
+PROGRESS_INTERVAL = 0.5
+# Rate is averaged over samples of last RATE_WINDOW seconds
+RATE_WINDOW = 10.0
+LOG_INTERVAL = 30.0
+
+# States of task parts
+PENDING, RUNNING, DONE = 0, 1, 2
+
+logger = logging.getLogger(__name__)
+
+
+class Task:
+    """
+    Progress of one stage, split into parts which advance independently,
+    e.g. shards of data set, byte ranges of download or chunks of table
+    """
+
+    def __init__(
+        self,
+        reporter: "Progress",
+        name: str,
+        total: Optional[int],
+        unit: str = "B",
+        parts: int = 1,
+    ):
+        self.name = name
+        self.total = total
+        self.unit = unit
+        self.owner = os.getpid()
+        self.error: Optional[str] = None
+        self._reporter = reporter
+        self._positions = RawArray("q", parts)
+        self._states = RawArray("b", parts)
+        # Time when first part is started, task can wait for workers
+        self._started = RawValue("d", 0.0)
+        self._getters: Dict[int, Callable[[], int]] = {}
+        self._samples = deque()
+
+    @property
+    def position(self) -> int:
+        return sum(self._positions)
+
+    @property
+    def is_started(self) -> bool:
+        return bool(self._started.value)
+
+    @property
+    def is_done(self) -> bool:
+        return all(el == DONE for el in self._states)
+
+    def update(self, position: int, part: int = 0):
+        self._positions[part] = position
+
+    @contextmanager
+    def track(self, getter: Callable[[], int] = None, part: int = 0):
+        """
+        Sample position of part by getter while in the context, position of
+        part without getter is set by `update`. Part is done at exit
+        :param getter: callable returning current position, e.g. `fd.tell`
+        :param part: index of part
+        """
+        if not self._started.value:
+            self._started.value = time.monotonic()
+        self._states[part] = RUNNING
+        if getter is not None:
+            self._getters[part] = getter
+            self._reporter.start()
+        try:
+            yield self
+        finally:
+            if self._getters.pop(part, None) is not None:
+                self.update(getter(), part)
+            self._states[part] = DONE
+
+    def sample(self):
+        for part, getter in list(self._getters.items()):
+            try:
+                self._positions[part] = getter()
+            except (ValueError, OSError):
+                # File is being closed
+                pass
+
+    def get_status(self, state: str = "running") -> Dict:
+        now, position = time.monotonic(), self.position
+        elapsed = now - self._started.value if self._started.value else 0.0
+        if state == "running":
+            self._samples.append((now, position))
+            while now - self._samples[0][0] > RATE_WINDOW:
+                self._samples.popleft()
+            first_time, first_position = self._samples[0]
+            rate = (
+                (position - first_position) / (now - first_time)
+                if now > first_time
+                else None
+            )
+        else:
+            rate = position / elapsed if elapsed > 0 else None
+        percent = eta = None
+        if self.total:
+            percent = min(position / self.total * 100, 100.0)
+            if rate:
+                eta = max(self.total - position, 0) / rate
+        return {
+            "name": self.name,
+            "state": state,
+            "unit": self.unit,
+            "position": position,
+            "total": self.total,
+            "percent": percent,
+            "rate": rate,
+            "eta": eta,
+            "elapsed": elapsed,
+            "error": self.error,
+        }
+
+
+class ProgressSink:
+    """
+    Receives status of started tasks once per interval and status of each
+    task when it's finished
+    """
+
+    def emit(self, statuses: List[Dict]):
+        pass
+
+    def finish(self, status: Dict):
+        pass
+
+    def close(self):
+        pass
+
+
+class TerminalSink(ProgressSink):
+    """
+    Overwrites single line of terminal with status of running tasks, finished
+    tasks are printed on separate lines. Only finished tasks are printed when
+    output isn't terminal
+    """
+
+    def __init__(self, stream=None):
+        self._stream = stream
+
+    @property
+    def stream(self):
+        return self._stream or sys.stdout
+
+    def emit(self, statuses: List[Dict]):
+        if not self.stream.isatty():
+            return
+        width = shutil.get_terminal_size().columns - 1
+        line = " | ".join(format_status(el) for el in statuses)
+        self.stream.write(f"\r{ERASE_LINE}{line[:width]}")
+        self.stream.flush()
+
+    def finish(self, status: Dict):
+        prefix = f"\r{ERASE_LINE}" if self.stream.isatty() else ""
+        self.stream.write(f"{prefix}{format_status(status)}\n")
+        self.stream.flush()
+
+
+class LogSink(ProgressSink):
+    """
+    Logs status of running tasks once per `interval` seconds and status of
+    finished tasks
+    """
+
+    def __init__(self, path: Path = None, interval: float = LOG_INTERVAL):
+        """
+        :param path: file to log to, otherwise handlers of logging
+        configuration of application are used
+        :param interval: seconds between statuses of running tasks
+        """
+        self.interval = interval
+        self._logged = None
+        self._handler = None
+        if path is not None:
+            self._handler = logging.FileHandler(path)
+            self._handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(self._handler)
+            logger.setLevel(logging.INFO)
+
+    def emit(self, statuses: List[Dict]):
+        now = time.monotonic()
+        if self._logged is not None and now - self._logged < self.interval:
+            return
+        self._logged = now
+        for status in statuses:
+            logger.info(format_status(status))
+
+    def finish(self, status: Dict):
+        level = logging.ERROR if status["error"] else logging.INFO
+        logger.log(level, format_status(status))
+
+    def close(self):
+        if self._handler is not None:
+            logger.removeHandler(self._handler)
+            self._handler.close()
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ["/", "/progress"]:
+            self.send_error(404)
+            return
+        content = json.dumps(self.server.sink.get_content()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpSink(ProgressSink):
+    """
+    Serves status of running and finished tasks as JSON at
+    http://HOST:PORT/progress
+    """
+
+    def __init__(self, port: int = 0, host: str = "127.0.0.1"):
+        """
+        :param port: port to listen on, any free one when it's 0
+        :param host: interface to listen on
+        """
+        self._lock = threading.Lock()
+        self._running: List[Dict] = []
+        self._finished: List[Dict] = []
+        self.server = ThreadingHTTPServer((host, port), _StatusHandler)
+        self.server.sink = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def get_content(self) -> Dict:
+        with self._lock:
+            return {"running": self._running, "finished": self._finished}
+
+    def emit(self, statuses: List[Dict]):
+        with self._lock:
+            self._running = statuses
+
+    def finish(self, status: Dict):
+        with self._lock:
+            self._running = [el for el in self._running if el["name"] != status["name"]]
+            self._finished = [*self._finished, status]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Progress:
+    """
+    Registry of running tasks and reporter thread which samples them.
+    Thread is started only when there are sinks to report to
+    """
+
+    def __init__(self, interval: float = PROGRESS_INTERVAL):
+        self.interval = interval
+        self.sinks: List[ProgressSink] = []
+        self._tasks: Dict[str, Task] = {}
+        self._after_fork()
+
+    def _after_fork(self):
+        # Lock could be held by reporter thread of parent at the time of fork
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def add_sink(self, sink: ProgressSink):
+        self.sinks.append(sink)
+
+    @contextmanager
+    def task(
+        self, name: str, total: Optional[int], unit: str = "B", parts: int = 1
+    ) -> Iterator[Task]:
+        """
+        Register task for the duration of the context and report it as done
+        or failed at exit. Task of the same name which is already registered,
+        e.g. by parent process before fork, is yielded instead and it's
+        reported by its owner
+        :param name: task name, e.g. "Parsing 'title.basics.tsv'"
+        :param total: size of task, when it's known
+        :param unit: unit of positions
+        :param parts: number of parts
+        """
+        with self._lock:
+            task = self._tasks.get(name)
+        if task is not None:
+            yield task
+            return
+
+        task = Task(self, name, total, unit, parts)
+        with self._lock:
+            self._tasks[name] = task
+        self.start()
+        try:
+            yield task
+        except BaseException as exc:
+            task.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            self._finish(task)
+
+    def start(self):
+        with self._lock:
+            if not self.sinks or self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="progress", daemon=True
+            )
+            self._thread.start()
+
+    def close(self):
+        """
+        Stop reporter thread and close sinks
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._stopped.clear()
+        for sink in self.sinks:
+            sink.close()
+        self.sinks.clear()
+
+    def report(self):
+        """
+        Sample positions of tasks, finish tasks which parts are all done and
+        emit status of started ones. Only tasks of current process are reported
+        """
+        with self._lock:
+            tasks = list(self._tasks.values())
+        statuses = []
+        for task in tasks:
+            task.sample()
+            if task.owner != os.getpid() or not task.is_started:
+                continue
+            if task.is_done:
+                self._finish(task)
+            else:
+                statuses.append(task.get_status())
+        if statuses:
+            for sink in self.sinks:
+                sink.emit(statuses)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.report()
+
+    def _finish(self, task: Task):
+        with self._lock:
+            if self._tasks.get(task.name) is not task:
+                return
+            del self._tasks[task.name]
+        task.sample()
+        status = task.get_status("failed" if task.error else "done")
+        for sink in self.sinks:
+            sink.finish(status)
+
+
+def format_amount(value: float, unit: str) -> str:
+    if unit == "B":
+        return f"{value / 2 ** 20:.1f} MB"
+    return f"{value:.0f} {unit}"
+
+
+def format_status(status: Dict) -> str:
+    """
+    Format status as line, e.g.
+    "Parsing 'title.basics.tsv': 42.10% 120.3 MB/285.7 MB 35.2 MB/s ETA 0:00:04"
+    """
+    unit = status["unit"]
+    line = f"{status['name']}:"
+    if status["percent"] is not None:
+        line += f" {status['percent']:.2f}%"
+    line += f" {format_amount(status['position'], unit)}"
+    if status["total"]:
+        line += f"/{format_amount(status['total'], unit)}"
+    if status["rate"] is not None:
+        line += f" {format_amount(status['rate'], unit)}/s"
+    if status["state"] == "running":
+        if status["eta"] is not None:
+            line += f" ETA {timedelta(seconds=round(status['eta']))}"
+    else:
+        line += f" in {timedelta(seconds=round(status['elapsed']))} {status['state']}"
+        if status["error"]:
+            line += f": {status['error']}"
+    return line
+
+
+PROGRESS = Progress()
+os.register_at_fork(after_in_child=PROGRESS._after_fork)
@@ -1,37 +1,482 @@
+import base64
+from collections import defaultdict
+from typing import Callable, Hashable, Optional, Set
+
 import graphene
+from graphene.utils.str_converters import to_camel_case
 from graphene_sqlalchemy import SQLAlchemyObjectType
-from sqlalchemy.sql.functions import count
-
+from graphql import GraphQLError
+from graphql.language import ast
+from promise import Promise
+from promise.dataloader import DataLoader
+from sqlalchemy import and_, func, inspect, or_, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import aliased, load_only, selectinload
 import src.models as models
+from src import adjacency
+from src.expressions import array_contains, array_length, search_match, search_rank
 
 QUERY_LIMIT = 50
+MAX_QUERY_LIMIT = 1000
+CURSOR_PREFIX = "cursor:"
+
+
+def encode_cursor(id_: int) -> str:
+    return base64.b64encode(f"{CURSOR_PREFIX}{id_}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        value = base64.b64decode(cursor, validate=True).decode()
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError(cursor)
+        return int(value[len(CURSOR_PREFIX) :])
+    except ValueError:
+        raise GraphQLError(f"Invalid cursor: {cursor}") from None
+
+
+def get_page_size(first: Optional[int], default: int = QUERY_LIMIT) -> int:
+    """
+    Returns page size requested by client, capped by MAX_QUERY_LIMIT
+    :param first: requested page size
+    :param default: page size when it's not requested
+    :return: page size
+    """
+    size = default if first is None else first
+    if size < 0:
+        raise GraphQLError(f"Page size can't be negative: {size}")
+    return min(size, MAX_QUERY_LIMIT)
+
+
+def paginate(
+    query,
+    model,
+    first: int,
+    after: Optional[str],
+    sort_key=None,
+    descending: bool = True,
+):
+    """
+    Returns page of query, following row of `after` cursor. Rows are ordered
+    by primary key, or by sort key and primary key in opposite direction,
+    so both directions are served by single (key DESC, id) index. Page starts
+    with keyset predicate instead of OFFSET, so deep pages cost as much
+    as the first one
+    :param query: Query object
+    :param model: model of queried instances
+    :param first: page size
+    :param after: cursor of last row of previous page
+    :param sort_key: function returning sort key of model or its alias,
+    key must not be NULL
+    :param descending: order by sort key descending
+    :return: Query object
+    """
+    after_id = None if after is None else decode_cursor(after)
+    if sort_key is None:
+        if after_id is not None:
+            query = query.filter(model.id > after_id)
+        return query.order_by(model.id).limit(first)
+
+    key = sort_key(model)
+    if after_id is not None:
+        after_row = aliased(model)
+        after_key = (
+            select(sort_key(after_row))
+            .where(after_row.id == after_id)
+            .scalar_subquery()
+        )
+        # Bound of key alone is index condition, scan starts at cursor row
+        if descending:
+            query = query.filter(
+                key <= after_key,
+                or_(key < after_key, and_(key == after_key, model.id > after_id)),
+            )
+        else:
+            query = query.filter(
+                key >= after_key,
+                or_(key > after_key, and_(key == after_key, model.id < after_id)),
+            )
+    if descending:
+        return query.order_by(key.desc(), model.id).limit(first)
+    return query.order_by(key, model.id.desc()).limit(first)
+
+
+class ModelLoader(DataLoader):
+    """
+    Loads model instances by primary keys, single `IN (...)` query per batch
+    """
+
+    def __init__(self, query):
+        super().__init__()
+        self.query = query
+
+    def batch_load_fn(self, keys):
+        model = self.query.column_descriptions[0]["entity"]
+        instances = {el.id: el for el in self.query.filter(model.id.in_(keys))}
+        return Promise.resolve([instances.get(key) for key in keys])
+
+
+class RelatedLoader(DataLoader):
+    """
+    Loads pages of instances related to parents, single `IN (...)` query
+    per batch. Instances are numbered by primary key within each parent,
+    so every parent gets its own page
+    """
+
+    def __init__(self, query, key_column, first: int, after: Optional[str] = None):
+        """
+        :param query: query of related instances, joined with key column table
+        :param key_column: column holding primary key of parent
+        :param first: page size
+        :param after: cursor of last instance of previous page
+        """
+        super().__init__()
+        self.query = query
+        self.key_column = key_column
+        self.first = first
+        self.after = after
+
+    def batch_load_fn(self, keys):
+        model = self.query.column_descriptions[0]["entity"]
+        query = self.query.add_columns(self.key_column.label("parent_id")).filter(
+            self.key_column.in_(keys)
+        )
+        if self.after is not None:
+            query = query.filter(model.id > decode_cursor(self.after))
+        position = func.row_number().over(
+            partition_by=self.key_column, order_by=model.id
+        )
+        page = query.add_columns(position.label("position")).subquery()
+        parent_key = page.c.parent_id
+
+        related = defaultdict(list)
+        for instance, key in (
+            self.query.session.query(aliased(model, page), parent_key)
+            .filter(page.c.position <= self.first)
+            .order_by(parent_key, page.c.position)
+        ):
+            related[key].append(instance)
+        return Promise.resolve([related[key] for key in keys])
+
+
+def get_loader(info, key: Hashable, factory: Callable[[], DataLoader]) -> DataLoader:
+    """
+    Returns data loader stored in request context, so instances loaded
+    for one request are neither shared with nor cached for other requests
+    :param info: resolve info
+    :param key: loader key, unique for relation and its arguments
+    :param factory: creates loader when request has no loader with the key
+    :return: DataLoader
+    """
+    if isinstance(info.context, dict):
+        loaders = info.context.setdefault("loaders", {})
+    else:
+        if getattr(info.context, "loaders", None) is None:
+            info.context.loaders = {}
+        loaders = info.context.loaders
+    if key not in loaders:
+        loaders[key] = factory()
+    return loaders[key]
+
+
+def filter_matching(query, column, match: Optional[str]):
+    """
+    Filter query by full-text match of column.
+    Match is parsed as web search: words, "quoted phrases", OR and -negation
+    :param query: Query object
+    :param column: searched column
+    :param match: search string
+    :return: Query object
+    """
+    if not match:
+        return query
+    return query.filter(search_match(column, match))
+
+
+def get_match_rank(column, match: str):
+    return search_rank(column, match)
+
+
+def filter_films(query, search: str = None, genre: str = None, period=None):
+    return (
+        query.filter(models.FilmModel.title.ilike(search) if search else True)
+        .filter(
+            models.FilmModel.genres.any(models.GenreModel.genre == genre)
+            if genre
+            else models.FilmModel.genres.any()
+        )
+        .filter(
+            models.FilmModel.start_year.between(period[0], period[1])
+            if period
+            else True
+        )
+    )
+
+
+def filter_film_summary(
+    query,
+    search: str = None,
+    genre: str = None,
+    period=None,
+    min_rating: float = None,
+    min_votes: int = None,
+):
+    """
+    Filter query of film summary view, films without genres are skipped
+    as by `filter_films`. Every filter is served by index of the view
+    """
+    summary = models.FilmSummaryModel
+    return (
+        query.filter(summary.title.ilike(search) if search else True)
+        .filter(
+            array_contains(summary.genres, genre)
+            if genre
+            else array_length(summary.genres) > 0
+        )
+        .filter(summary.start_year.between(period[0], period[1]) if period else True)
+        .filter(
+            summary.average_rating >= min_rating if min_rating is not None else True
+        )
+        .filter(summary.num_votes >= min_votes if min_votes is not None else True)
+    )
+
+
+def filter_persons(query, search: str = None, profession: str = None):
+    return query.filter(
+        models.PersonModel.name.ilike(search) if search else True
+    ).filter(
+        models.PersonModel.professions.any(
+            models.ProfessionModel.profession == profession
+        )
+        if profession
+        else models.PersonModel.professions.any()
+    )
+
+
+def get_selected_fields(info) -> Set[str]:
+    """
+    Returns names of fields selected on resolved field, fragments included
+    :param info: resolve info
+    :return: set of field names, as in query
+    """
+    names = set()
+
+    def collect(selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                names.add(selection.name.value)
+            elif isinstance(selection, ast.InlineFragment):
+                collect(selection.selection_set)
+            elif selection.name.value in info.fragments:
+                collect(info.fragments[selection.name.value].selection_set)
+
+    for field_ast in info.field_asts:
+        if field_ast.selection_set is not None:
+            collect(field_ast.selection_set)
+    return names
+
+
+def load_instance(info, object_type, id_):
+    if id_ is None:
+        return None
+    loader = get_loader(
+        info, object_type, lambda: ModelLoader(object_type.get_query(info))
+    )
+    return loader.load(id_)
+
+
+def load_related(
+    info, key: tuple, get_query: Callable, key_column, parent_id, first, after
+):
+    """
+    Returns page of instances related to parent, batched with pages of other
+    parents of the same relation. Page size defaults to QUERY_LIMIT, so nested
+    lists are bounded even when client doesn't ask for it
+    :param info: resolve info
+    :param key: relation name and filter arguments
+    :param get_query: returns query of related instances, joined with key column table
+    :param key_column: column holding primary key of parent
+    :param parent_id: primary key of parent
+    :param first: page size
+    :param after: cursor of last instance of previous page
+    :return: Promise of list of instances
+    """
+    first = get_page_size(first)
+    loader = get_loader(
+        info,
+        (*key, first, after),
+        lambda: RelatedLoader(get_query(), key_column, first, after),
+    )
+    return loader.load(parent_id)
 
 
 class ActiveSQLAlchemyObjectType(SQLAlchemyObjectType):
     class Meta:
         abstract = True
 
+    cursor = graphene.String(description="Cursor for `after` argument")
+
+    @classmethod
+    def get_query(cls, info):
+        """
+        Returns query of model in session of request context (e.g. session
+        given by ASGI app), otherwise in Flask-SQLAlchemy scoped session
+        """
+        session = (
+            info.context.get("session") if isinstance(info.context, dict) else None
+        )
+        if session is None:
+            return super().get_query(info)
+        return session.query(cls._meta.model)
+
+    @classmethod
+    def get_projected_query(cls, info):
+        """
+        Returns query of only columns selected on resolved field, primary and
+        foreign keys, which are used by resolvers of relations. Query returns
+        rows instead of model instances, unless selection has relationships
+        without custom resolvers, then instances are loaded with only these
+        columns and relationships are loaded by `selectinload`
+        """
+        model = cls._meta.model
+        mapper = inspect(model)
+        field_names = {to_camel_case(name): name for name in cls._meta.fields}
+        columns = [
+            key
+            for key, column in mapper.columns.items()
+            if column.primary_key or column.foreign_keys
+        ]
+        relationships = []
+        for name in get_selected_fields(info):
+            name = field_names.get(name)
+            if name in mapper.column_attrs and name not in columns:
+                columns.append(name)
+            elif name in mapper.relationships and not hasattr(cls, f"resolve_{name}"):
+                relationships.append(name)
+
+        query = cls.get_query(info)
+        attributes = [getattr(model, el) for el in columns]
+        if not relationships:
+            return query.with_entities(*attributes)
+        return query.options(
+            load_only(*attributes),
+            *(selectinload(getattr(model, el)) for el in relationships),
+        )
+
+    @classmethod
+    def is_type_of(cls, root, info):
+        return isinstance(root, Row) or super().is_type_of(root, info)
+
+    def resolve_id(self, info):
+        # Projected rows have no mapper, models have single `id` primary key
+        return self.id
+
+    def resolve_cursor(self, _):
+        return encode_cursor(self.id)
+
 
 class FilmType(ActiveSQLAlchemyObjectType):
     class Meta:
         model = models.FilmModel
 
+    # Columns of film summary view holding fields, other than film columns
+    summary_columns = {
+        "rating": ("rating_id", "average_rating", "num_votes"),
+        "genres": ("genre_ids", "genres"),
+    }
+
     persons = graphene.List(
-        lambda: PersonType, search=graphene.String(), profession=graphene.String()
+        lambda: PersonType,
+        search=graphene.String(),
+        profession=graphene.String(),
+        first=graphene.Int(),
+        after=graphene.String(),
     )
 
-    def resolve_persons(self, info, search: str = None, profession=None):
-        query = PersonType.get_query(info)
-        return (
-            query.join(models.ProfessionPerson)
-            .join(models.ProfessionModel)
-            .join(models.PersonFilm)
-            .join(models.FilmModel)
-            .filter(models.PersonModel.name.ilike(search) if search else True)
-            .filter(
-                models.ProfessionModel.profession == profession if profession else True
+    principals = graphene.List(
+        lambda: PrincipalType, first=graphene.Int(), after=graphene.String()
+    )
+
+    @classmethod
+    def get_projected_query(cls, info):
+        """
+        Returns query of film summary view with only columns selected on
+        resolved field, rating and genres included, so films are listed
+        without joins. Query returns rows
+        """
+        summary = models.FilmSummaryModel
+        field_names = {to_camel_case(name): name for name in cls._meta.fields}
+        columns = ["id"]
+        for name in get_selected_fields(info):
+            name = field_names.get(name)
+            for column in cls.summary_columns.get(name, (name,)):
+                if column in summary.__table__.c and column not in columns:
+                    columns.append(column)
+        return cls.get_query(info).with_entities(
+            *(getattr(summary, el) for el in columns)
+        )
+
+    def resolve_rating(self, info):
+        if not isinstance(self, Row):
+            # Film reached through other instance, e.g. principal or person
+            return load_related(
+                info,
+                ("film_rating",),
+                lambda: RatingType.get_query(info),
+                models.RatingModel.film_id,
+                self.id,
+                1,
+                None,
+            ).then(lambda ratings: ratings[0] if ratings else None)
+        if self.rating_id is None:
+            return None
+        return models.RatingModel(
+            id=self.rating_id,
+            film_id=self.id,
+            average_rating=self.average_rating,
+            num_votes=self.num_votes,
+        )
+
+    def resolve_genres(self, info):
+        if not isinstance(self, Row):
+            return load_related(
+                info,
+                ("film_genres",),
+                lambda: GenreType.get_query(info).join(models.GenreFilm),
+                models.GenreFilm.c.film_id,
+                self.id,
+                MAX_QUERY_LIMIT,
+                None,
             )
-            .filter(models.FilmModel.id == self.id)
+        return [
+            models.GenreModel(id=id_, genre=genre)
+            for id_, genre in zip(self.genre_ids, self.genres)
+        ]
+
+    def resolve_persons(
+        self, info, search: str = None, profession=None, first=None, after=None
+    ):
+        return load_related(
+            info,
+            ("film_persons", search, profession),
+            lambda: filter_persons(
+                PersonType.get_query(info).join(models.PersonFilm), search, profession
+            ),
+            models.PersonFilm.c.film_id,
+            self.id,
+            first,
+            after,
+        )
+
+    def resolve_principals(self, info, first=None, after=None):
+        return load_related(
+            info,
+            ("film_principals",),
+            lambda: PrincipalType.get_query(info),
+            models.PrincipalModel.film_id,
+            self.id,
+            first,
+            after,
         )
 
 
@@ -44,23 +489,44 @@ class PersonType(ActiveSQLAlchemyObjectType):
         search=graphene.String(),
         genre=graphene.String(),
         period=graphene.List(graphene.Int),
+        first=graphene.Int(),
+        after=graphene.String(),
     )
 
-    def resolve_films(self, info, search: str = None, genre: str = None, period=None):
-        query = FilmType.get_query(info)
-        return (
-            query.join(models.GenreFilm)
-            .join(models.GenreModel)
-            .join(models.PersonFilm)
-            .join(models.PersonModel)
-            .filter(models.FilmModel.title.ilike(search) if search else True)
-            .filter(models.GenreModel.genre == genre if genre else True)
-            .filter(
-                models.FilmModel.start_year.between(period[0], period[1])
-                if period
-                else True
-            )
-            .filter(models.PersonModel.id == self.id)
+    principals = graphene.List(
+        lambda: PrincipalType, first=graphene.Int(), after=graphene.String()
+    )
+
+    def resolve_films(
+        self,
+        info,
+        search: str = None,
+        genre: str = None,
+        period=None,
+        first=None,
+        after=None,
+    ):
+        return load_related(
+            info,
+            ("person_films", search, genre, tuple(period) if period else None),
+            lambda: filter_films(
+                FilmType.get_query(info).join(models.PersonFilm), search, genre, period
+            ),
+            models.PersonFilm.c.person_id,
+            self.id,
+            first,
+            after,
+        )
+
+    def resolve_principals(self, info, first=None, after=None):
+        return load_related(
+            info,
+            ("person_principals",),
+            lambda: PrincipalType.get_query(info),
+            models.PrincipalModel.person_id,
+            self.id,
+            first,
+            after,
         )
 
 
@@ -75,173 +541,403 @@ class PrincipalType(ActiveSQLAlchemyObjectType):
     person: models.PersonModel = PersonType()
     film: models.FilmModel = FilmType()
 
-    def resolve_name(self, _):
-        return self.person.name
+    def resolve_person(self, info):
+        return load_instance(info, PersonType, self.person_id)
+
+    def resolve_film(self, info):
+        return load_instance(info, FilmType, self.film_id)
 
-    def resolve_title(self, _):
-        return self.film.title
+    def resolve_name(self, info):
+        person = load_instance(info, PersonType, self.person_id)
+        return person and person.then(lambda el: el and el.name)
 
-    def resolve_job(self, _):
-        return self.job.job
+    def resolve_title(self, info):
+        film = load_instance(info, FilmType, self.film_id)
+        return film and film.then(lambda el: el and el.title)
+
+    def resolve_job(self, info):
+        job = load_instance(info, JobType, self.job_id)
+        return job and job.then(lambda el: el and el.job)
 
 
 class JobType(ActiveSQLAlchemyObjectType):
     class Meta:
         model = models.JobModel
 
+    principals = graphene.List(
+        lambda: PrincipalType, first=graphene.Int(), after=graphene.String()
+    )
+
+    def resolve_principals(self, info, first=None, after=None):
+        return load_related(
+            info,
+            ("job_principals",),
+            lambda: PrincipalType.get_query(info),
+            models.PrincipalModel.job_id,
+            self.id,
+            first,
+            after,
+        )
+
 
 class RatingType(ActiveSQLAlchemyObjectType):
     class Meta:
         model = models.RatingModel
 
+    film: models.FilmModel = FilmType()
+
+    def resolve_film(self, info):
+        return load_instance(info, FilmType, self.film_id)
+
 
 class GenreType(ActiveSQLAlchemyObjectType):
     class Meta:
         model = models.GenreModel
 
+    films = graphene.List(
+        lambda: FilmType, first=graphene.Int(), after=graphene.String()
+    )
+
+    def resolve_films(self, info, first=None, after=None):
+        return load_related(
+            info,
+            ("genre_films",),
+            lambda: FilmType.get_query(info).join(models.GenreFilm),
+            models.GenreFilm.c.genre_id,
+            self.id,
+            first,
+            after,
+        )
+
 
 class ProfessionType(ActiveSQLAlchemyObjectType):
     class Meta:
         model = models.ProfessionModel
 
+    persons = graphene.List(
+        lambda: PersonType, first=graphene.Int(), after=graphene.String()
+    )
+
+    def resolve_persons(self, info, first=None, after=None):
+        return load_related(
+            info,
+            ("profession_persons",),
+            lambda: PersonType.get_query(info).join(models.ProfessionPerson),
+            models.ProfessionPerson.c.profession_id,
+            self.id,
+            first,
+            after,
+        )
+
+
+class SeparationType(graphene.ObjectType):
+    degrees = graphene.Int()
+    persons = graphene.List(lambda: PersonType)
+    films = graphene.List(lambda: FilmType)
+
+
+class OrderDirection(graphene.Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+class FilmOrder(graphene.Enum):
+    RATING = "average_rating"
+    VOTES = "num_votes"
+    YEAR = "start_year"
+    TITLE = "title"
+
+
+class RatingOrder(graphene.Enum):
+    RATING = "average_rating"
+    VOTES = "num_votes"
+
+
+def order_by_column(query, model, column: str, direction: str, first, after):
+    """
+    Returns page of query ordered by column, served by (column DESC, id)
+    index created by loader. Rows without value are skipped
+    :param query: Query object
+    :param model: model of queried rows
+    :param column: name of ordering column
+    :param direction: "asc" or "desc"
+    :param first: page size
+    :param after: cursor of last row of previous page
+    :return: Query object
+    """
+    return paginate(
+        query.filter(getattr(model, column).isnot(None)),
+        model,
+        first,
+        after,
+        sort_key=lambda el: getattr(el, column),
+        descending=direction == OrderDirection.DESC.value,
+    )
+
+
+def get_ordered_instances(query, model, ids) -> Optional[list]:
+    """
+    Returns instances in order of ids or None if some of them don't exist
+    """
+    instances = {el.id: el for el in query.filter(model.id.in_(ids))}
+    if len(instances) < len(set(ids)):
+        return None
+    return [instances[el] for el in ids]
+
 
 class Query(graphene.ObjectType):
     film = graphene.List(lambda: FilmType, id=graphene.ID())
     films = graphene.List(
         lambda: FilmType,
         search=graphene.String(),
+        match=graphene.String(),
         genre=graphene.String(),
         period=graphene.List(graphene.Int),
-        limit=graphene.Int(),
+        min_rating=graphene.Float(),
+        min_votes=graphene.Int(),
+        order_by=FilmOrder(description="Order instead of rank of `match`"),
+        direction=OrderDirection(default_value=OrderDirection.DESC.value),
+        first=graphene.Int(),
+        after=graphene.String(),
+        limit=graphene.Int(description="Same as `first`"),
+    )
+    common_films = graphene.List(
+        lambda: FilmType,
+        names=graphene.List(graphene.String),
+        first=graphene.Int(),
+        after=graphene.String(),
     )
-    common_films = graphene.List(lambda: FilmType, names=graphene.List(graphene.String))
     person = graphene.List(lambda: PersonType, id=graphene.ID())
     persons = graphene.List(
         lambda: PersonType,
         search=graphene.String(),
+        match=graphene.String(),
         profession=graphene.String(),
-        limit=graphene.Int(),
+        first=graphene.Int(),
+        after=graphene.String(),
+        limit=graphene.Int(description="Same as `first`"),
     )
     common_persons = graphene.List(
-        lambda: PersonType, titles=graphene.List(graphene.String)
+        lambda: PersonType,
+        titles=graphene.List(graphene.String),
+        first=graphene.Int(),
+        after=graphene.String(),
+    )
+    degrees_of_separation = graphene.Field(
+        SeparationType,
+        source_id=graphene.ID(required=True),
+        target_id=graphene.ID(required=True),
+        max_degrees=graphene.Int(),
     )
     principals = graphene.List(
         lambda: PrincipalType,
         person_id=graphene.ID(),
         film_id=graphene.ID(),
         job=graphene.String(),
-        limit=graphene.Int(),
+        first=graphene.Int(),
+        after=graphene.String(),
+        limit=graphene.Int(description="Same as `first`"),
+    )
+    ratings = graphene.List(
+        lambda: RatingType,
+        order_by=RatingOrder(),
+        direction=OrderDirection(default_value=OrderDirection.DESC.value),
+        first=graphene.Int(),
+        after=graphene.String(),
+        limit=graphene.Int(description="Same as `first`"),
     )
-    ratings = graphene.List(lambda: RatingType, limit=graphene.Int())
     genres = graphene.List(GenreType, search=graphene.String())
     professions = graphene.List(ProfessionType, search=graphene.String())
 
     jobs = graphene.List(lambda: JobType)
 
     def resolve_film(self, info, id):
-        query = FilmType.get_query(info)
-        return query.filter(models.FilmModel.id == id)
+        query = FilmType.get_projected_query(info)
+        return query.filter(models.FilmSummaryModel.id == id)
 
     def resolve_films(
         self,
         info,
         search: str = None,
+        match: str = None,
         genre: str = None,
         period=None,
-        limit=QUERY_LIMIT,
+        min_rating: float = None,
+        min_votes: int = None,
+        order_by: str = None,
+        direction: str = OrderDirection.DESC.value,
+        first=None,
+        after=None,
+        limit=None,
     ):
-        query = FilmType.get_query(info)
-        return (
-            query.join(models.GenreFilm)
-            .join(models.GenreModel)
-            .filter(models.FilmModel.title.ilike(search) if search else True)
-            .filter(models.GenreModel.genre == genre if genre else True)
-            .filter(
-                models.FilmModel.start_year.between(period[0], period[1])
-                if period
-                else True
+        query = filter_film_summary(
+            filter_matching(
+                FilmType.get_projected_query(info),
+                models.FilmSummaryModel.title,
+                match,
+            ),
+            search,
+            genre,
+            period,
+            min_rating,
+            min_votes,
+        )
+        first = get_page_size(limit if first is None else first)
+        if order_by:
+            return order_by_column(
+                query, models.FilmSummaryModel, order_by, direction, first, after
             )
-            .limit(limit)
+        return paginate(
+            query,
+            models.FilmSummaryModel,
+            first,
+            after,
+            sort_key=(lambda el: get_match_rank(el.title, match)) if match else None,
         )
 
-    def resolve_common_films(self, info, names):
-        person_ids = [
-            n.id
-            for n in PersonType.get_query(info)
-            .filter(models.PersonModel.name.in_(names))
-            .all()
-        ]
-        return (
-            FilmType.get_query(info)
-            .join(models.PersonFilm)
-            .filter(models.PersonFilm.c.person_id.in_(person_ids))
-            .group_by(models.FilmModel.id)
-            .having(count(models.FilmModel.id) == len(names))
+    def resolve_common_films(self, info, names, first=None, after=None):
+        query = PersonType.get_query(info)
+        person_ids = defaultdict(set)
+        for person in query.filter(models.PersonModel.name.in_(names)):
+            person_ids[person.name].add(person.id)
+        film_ids = adjacency.get_common_ids(
+            query.session,
+            adjacency.PERSON_FILMS,
+            [person_ids[name] for name in set(names)],
+        )
+        return paginate(
+            FilmType.get_projected_query(info).filter(
+                models.FilmSummaryModel.id.in_(film_ids)
+            ),
+            models.FilmSummaryModel,
+            get_page_size(first),
+            after,
         )
 
     def resolve_person(self, info, id):
-        query = PersonType.get_query(info)
+        query = PersonType.get_projected_query(info)
         return query.filter(models.PersonModel.id == id)
 
     def resolve_persons(
-        self, info, search: str = None, profession=None, limit=QUERY_LIMIT
+        self,
+        info,
+        search: str = None,
+        match: str = None,
+        profession=None,
+        first=None,
+        after=None,
+        limit=None,
     ):
-        query = PersonType.get_query(info)
-        return (
-            query.join(models.ProfessionPerson)
-            .join(models.ProfessionModel)
-            .filter(models.PersonModel.name.ilike(search) if search else True)
-            .filter(
-                models.ProfessionModel.profession == profession if profession else True
-            )
-            .limit(limit)
+        query = filter_matching(
+            PersonType.get_projected_query(info), models.PersonModel.name, match
+        )
+        return paginate(
+            filter_persons(query, search, profession),
+            models.PersonModel,
+            get_page_size(limit if first is None else first),
+            after,
+            sort_key=(lambda el: get_match_rank(el.name, match)) if match else None,
         )
 
-    def resolve_common_persons(self, info, titles):
-        film_ids = [
-            t.id
-            for t in FilmType.get_query(info)
-            .filter(models.FilmModel.title.in_(titles))
-            .all()
-        ]
-        return (
-            PersonType.get_query(info)
-            .join(models.PersonFilm)
-            .filter(models.PersonFilm.c.film_id.in_(film_ids))
-            .group_by(models.PersonModel.id)
-            .having(count(models.PersonModel.id) == len(titles))
+    def resolve_common_persons(self, info, titles, first=None, after=None):
+        query = FilmType.get_query(info)
+        film_ids = defaultdict(set)
+        for film in query.filter(models.FilmModel.title.in_(titles)):
+            film_ids[film.title].add(film.id)
+        person_ids = adjacency.get_common_ids(
+            query.session,
+            adjacency.FILM_PERSONS,
+            [film_ids[title] for title in set(titles)],
+        )
+        return paginate(
+            PersonType.get_projected_query(info).filter(
+                models.PersonModel.id.in_(person_ids)
+            ),
+            models.PersonModel,
+            get_page_size(first),
+            after,
+        )
+
+    def resolve_degrees_of_separation(
+        self, info, source_id, target_id, max_degrees=None
+    ):
+        # Explicit null is the same as omitted argument
+        if max_degrees is None:
+            max_degrees = adjacency.MAX_DEGREES
+        query = PersonType.get_query(info)
+        path = adjacency.find_path(
+            query.session,
+            int(source_id),
+            int(target_id),
+            min(max_degrees, adjacency.MAX_DEGREES),
+        )
+        if path is None:
+            return None
+        person_ids, film_ids = path
+        # Path of the same person is found without looking it up
+        persons = get_ordered_instances(query, models.PersonModel, person_ids)
+        if persons is None:
+            return None
+        return SeparationType(
+            degrees=len(film_ids),
+            persons=persons,
+            films=get_ordered_instances(
+                FilmType.get_query(info), models.FilmModel, film_ids
+            ),
         )
 
     def resolve_principals(
-        self, info, person_id=None, film_id=None, job=None, limit=QUERY_LIMIT
+        self,
+        info,
+        person_id=None,
+        film_id=None,
+        job=None,
+        first=None,
+        after=None,
+        limit=None,
     ):
-        query = PrincipalType.get_query(info)
-        return (
+        query = PrincipalType.get_projected_query(info)
+        return paginate(
             query.filter(
                 models.PrincipalModel.person_id == person_id if person_id else True
             )
             .filter(models.PrincipalModel.film_id == film_id if film_id else True)
             .join(models.JobModel)
-            .filter(models.JobModel.job == job if job else True)
-            .limit(limit)
+            .filter(models.JobModel.job == job if job else True),
+            models.PrincipalModel,
+            get_page_size(limit if first is None else first),
+            after,
         )
 
-    def resolve_ratings(self, info, limit=QUERY_LIMIT):
-        query = RatingType.get_query(info)
-        return query.limit(limit)
+    def resolve_ratings(
+        self,
+        info,
+        order_by: str = None,
+        direction: str = OrderDirection.DESC.value,
+        first=None,
+        after=None,
+        limit=None,
+    ):
+        query = RatingType.get_projected_query(info)
+        first = get_page_size(limit if first is None else first)
+        if order_by:
+            return order_by_column(
+                query, models.RatingModel, order_by, direction, first, after
+            )
+        return paginate(query, models.RatingModel, first, after)
 
     def resolve_genres(self, info, search: str = None):
-        query = GenreType.get_query(info)
+        query = GenreType.get_projected_query(info)
         return query.filter(models.GenreModel.genre.ilike(search) if search else True)
 
     def resolve_professions(self, info, search: str = None):
-        query = ProfessionType.get_query(info)
+        query = ProfessionType.get_projected_query(info)
         return query.filter(
             models.ProfessionModel.profession.ilike(search) if search else True
         )
 
     def resolve_jobs(self, info):
-        return JobType.get_query(info)
+        return JobType.get_projected_query(info)
 
 
 schema = graphene.Schema(query=Query)
@@ -0,0 +1,92 @@
+from typing import List
+
+import src.models as models
+
+FILM_SUMMARY = models.FilmSummaryModel.__table__.name
+
+# Columns films are ordered by
+ORDER_COLUMNS = ["average_rating", "num_votes", "start_year", "title"]
+# Indexes of previous loads replaced by (column DESC, id) ones
+REPLACED_INDEXES = [
+    f"ix_{FILM_SUMMARY}_average_rating",
+    f"ix_{FILM_SUMMARY}_start_year",
+]
+
+
+def get_view_definition() -> str:
+    """
+    Returns query of film_summary view: row per film with its rating and
+    arrays of genre ids and names ordered by genre id, empty for films
+    without genres
+    """
+    film = models.FilmModel.__tablename__
+    rating = models.RatingModel.__tablename__
+    genre = models.GenreModel.__tablename__
+    return (
+        f"SELECT f.id, f.title, f.is_adult, f.start_year, f.runtime_minutes, "
+        f"r.id AS rating_id, r.average_rating, r.num_votes, "
+        f"coalesce(g.genre_ids, '{{}}') AS genre_ids, "
+        f"coalesce(g.genres, '{{}}') AS genres "
+        f"FROM {film} f "
+        f"LEFT JOIN {rating} r ON r.film_id = f.id "
+        f"LEFT JOIN (SELECT gf.film_id, array_agg(g.id ORDER BY g.id) AS genre_ids, "
+        f"array_agg(g.genre ORDER BY g.id) AS genres "
+        f"FROM {models.GenreFilm.name} gf JOIN {genre} g ON g.id = gf.genre_id "
+        f"GROUP BY gf.film_id) g ON g.film_id = f.id"
+    )
+
+
+def get_embedded_definition() -> str:
+    """
+    Returns query of film_summary table of embedded database, the same as
+    of view, with genre ids and names as JSON arrays
+    """
+    film = models.FilmModel.__tablename__
+    rating = models.RatingModel.__tablename__
+    genre = models.GenreModel.__tablename__
+    return (
+        f"SELECT f.id, f.title, f.is_adult, f.start_year, f.runtime_minutes, "
+        f"r.id AS rating_id, r.average_rating, r.num_votes, "
+        f"coalesce(g.genre_ids, '[]') AS genre_ids, "
+        f"coalesce(g.genres, '[]') AS genres "
+        f"FROM {film} f "
+        f"LEFT JOIN {rating} r ON r.film_id = f.id "
+        f"LEFT JOIN (SELECT film_id, json_group_array(genre_id) AS genre_ids, "
+        f"json_group_array(genre) AS genres "
+        f"FROM (SELECT gf.film_id, g.id AS genre_id, g.genre "
+        f"FROM {models.GenreFilm.name} gf JOIN {genre} g ON g.id = gf.genre_id "
+        f"ORDER BY gf.film_id, g.id) GROUP BY film_id) g ON g.film_id = f.id"
+    )
+
+
+def get_index_statements(trigram: bool) -> List[str]:
+    """
+    Returns statements creating indexes of film_summary view for filters and
+    orders of films query: unique id (required to refresh view concurrently),
+    genres containment, (column DESC, id) of each column of FilmOrder,
+    which serve range filters and keyset pages in both directions, and title
+    search. Indexes replaced by them are dropped
+    :param trigram: create trigram index for ILIKE search of title
+    :return: list of statements
+    """
+    statements = [
+        *(f"DROP INDEX IF EXISTS {index}" for index in REPLACED_INDEXES),
+        f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{FILM_SUMMARY}_id "
+        f"ON {FILM_SUMMARY} (id)",
+        f"CREATE INDEX IF NOT EXISTS ix_{FILM_SUMMARY}_genres "
+        f"ON {FILM_SUMMARY} USING gin (genres)",
+        *(
+            f"CREATE INDEX IF NOT EXISTS ix_{FILM_SUMMARY}_{column}_id "
+            f"ON {FILM_SUMMARY} ({column} DESC, id)"
+            for column in ORDER_COLUMNS
+        ),
+        f"CREATE INDEX IF NOT EXISTS ix_{FILM_SUMMARY}_title_tsv "
+        f"ON {FILM_SUMMARY} USING gin "
+        f"(to_tsvector('{models.SEARCH_CONFIG}', title))",
+    ]
+    if trigram:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS ix_{FILM_SUMMARY}_title_trgm "
+            f"ON {FILM_SUMMARY} USING gin (title gin_trgm_ops)"
+        )
+    return statements
@@ -1,16 +1,24 @@
 from dataclasses import dataclass
+import csv
+import gzip
+import io
 import re
+import resource
 import sys
 import tempfile
 import urllib.parse
 from pathlib import Path
-from typing import List, Dict, Union
+from itertools import islice
+from typing import List, Dict, Union, Iterable
 
 import yaml
+from sqlalchemy.engine import make_url
 
 DATA_SET_FILENAME_PATTERN = re.compile("^/(.*).gz")
-CURSOR_UP_ONE = "\x1b[1A"
 ERASE_LINE = "\x1b[2K"
+STREAM_BUFFER_SIZE = 1 << 20
+STREAM_BATCH_ROWS = 1000
+PARQUET_EXTENSION = "parquet"
 
 
 def get_config(config_path):
@@ -57,19 +65,6 @@ def get_data_sets(
     return _ret_val
 
 
-def overwrite_upper_line(content: str, quiet=False):
-    """
-    Output string content in the current line by overwriting
-    :param content: string content
-    :param quiet: bool
-    :return:
-    """
-    if not quiet:
-        sys.stdout.write(CURSOR_UP_ONE)
-        sys.stdout.write(ERASE_LINE)
-        print(content)
-
-
 def get_int(id_: str) -> Union[int, None]:
     """
     Convert string id like tt0000002 to integer 2
@@ -86,3 +81,92 @@ def get_null(value: str):
     if value.strip() not in ["\\N", ""]:
         return value
     return "0"
+
+
+def is_embedded(db_uri: str) -> bool:
+    """
+    Returns whether database URI is of embedded SQLite database
+    """
+    return make_url(db_uri).get_backend_name() == "sqlite"
+
+
+def is_parquet_file(file_name) -> bool:
+    """
+    Returns whether file is Parquet file or chunk of sharded one
+    (e.g. film.parquet, film.parquet.00)
+    """
+    return f".{PARQUET_EXTENSION}" in Path(file_name).suffixes
+
+
+def get_peak_rss(who: int = resource.RUSAGE_SELF) -> int:
+    """
+    Peak resident set size of current process
+    :param who: RUSAGE_SELF or RUSAGE_CHILDREN for largest finished child
+    :return: size in bytes
+    """
+    max_rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def open_dataset(file_path: Path):
+    """
+    Open plain or gzip-compressed dataset file for reading text
+    :param file_path: path to '*.tsv' or '*.tsv.gz' file
+    :return: text file object
+    """
+    if Path(file_path).suffix == ".gz":
+        return gzip.open(file_path, "rt")
+    return open(file_path)
+
+
+class RowsStream(io.TextIOBase):
+    """
+    Read-only file-like object which serializes rows into delimited text
+    on demand. It is meant to be passed to `cursor.copy_from` so rows can be
+    copied to database without intermediate file, holding in memory no more
+    than `buffer_size` characters plus one batch of rows
+    """
+
+    def __init__(
+        self,
+        rows: Iterable,
+        delimiter: str,
+        buffer_size: int = STREAM_BUFFER_SIZE,
+        batch_rows: int = STREAM_BATCH_ROWS,
+    ):
+        self.rows = iter(rows)
+        self.buffer_size = buffer_size
+        self.batch_rows = batch_rows
+        self._batch = io.StringIO()
+        self._writer = csv.writer(self._batch, delimiter=delimiter)
+        self._pending = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1) -> str:
+        while size is None or size < 0 or len(self._pending) < size:
+            if not self._fill():
+                break
+        if size is None or size < 0:
+            size = len(self._pending)
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+    def readline(self, size=-1) -> str:
+        while "\n" not in self._pending and self._fill():
+            pass
+        end = self._pending.find("\n") + 1 or len(self._pending)
+        if size is not None and 0 <= size < end:
+            end = size
+        line, self._pending = self._pending[:end], self._pending[end:]
+        return line
+
+    def _fill(self) -> bool:
+        self._writer.writerows(islice(self.rows, self.batch_rows))
+        data = self._batch.getvalue()
+        self._batch.seek(0)
+        self._batch.truncate()
+        self._pending += data
+        return bool(data)
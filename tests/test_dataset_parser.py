@@ -1,8 +1,14 @@
+import shutil
+import tempfile
 import unittest
 from pathlib import Path
 from unittest import mock
 
-from src.dataset_parser import DatasetParser
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src import parquet
+from src.dataset_parser import DatasetParser, get_shards
 from src.utils import get_config
 from tests.utils import get_root_dir, CONFIG_REL_PATH, DATASETS_REL_PATH
 
@@ -44,6 +50,7 @@ class TestDataSetParser(unittest.TestCase):
         cmd_args.debug = False
         cmd_args.root = DATASET_DIR
         cmd_args.quiet = True
+        cmd_args.shards = None
 
         cls.dataset_parser = DatasetParser(cmd_args, CONFIG)
 
@@ -54,6 +61,106 @@ class TestDataSetParser(unittest.TestCase):
         for path in Path(DATASET_DIR).glob("*.csv"):
             path.unlink()
 
+    def test_errors(self):
+        self.assertDictEqual(dict(self.dataset_parser.errors), EXPECTED_ERRORS)
+
+
+class TestShardedDataSetParser(unittest.TestCase):
+    def setUp(self):
+        self.roots = {}
+        for shards in [None, 3]:
+            root = Path(tempfile.mkdtemp())
+            for path in DATASET_DIR.glob("*.tsv"):
+                shutil.copy(path, root)
+            cmd_args = mock.Mock(root=root, debug=False, quiet=True, shards=shards)
+            DatasetParser(cmd_args, CONFIG).parse_dataset()
+            self.roots[shards] = root
+
+    def tearDown(self):
+        for root in self.roots.values():
+            shutil.rmtree(root)
+
+    def test_shards(self):
+        path = DATASET_DIR / "title.principals.tsv"
+        shards = get_shards(path, 3)
+        self.assertEqual(len(shards), 3)
+        with open(path, "rb") as fd:
+            content = fd.read()
+        self.assertEqual(shards[0].start, content.index(b"\n") + 1)
+        self.assertEqual(shards[-1].end, len(content))
+        for shard, next_shard in zip(shards, shards[1:]):
+            self.assertEqual(shard.end, next_shard.start)
+            self.assertEqual(content[shard.end - 1 : shard.end], b"\n")
+
+    def test_same_output_as_sequential(self):
+        for table_dir in self.roots[None].iterdir():
+            if not table_dir.is_dir():
+                continue
+            with self.subTest(table=table_dir.name):
+                self.assertEqual(
+                    self._read_chunks(table_dir),
+                    self._read_chunks(self.roots[3] / table_dir.name),
+                )
+
+    @staticmethod
+    def _read_chunks(table_dir: Path) -> str:
+        return "".join(path.read_text() for path in sorted(table_dir.iterdir()))
+
+
+class TestParquetDataSetParser(unittest.TestCase):
+    def setUp(self):
+        self.roots = {}
+        for output_format in ["csv", "parquet"]:
+            root = Path(tempfile.mkdtemp())
+            for path in DATASET_DIR.glob("*.tsv"):
+                shutil.copy(path, root)
+            cmd_args = mock.Mock(root=root, debug=False, quiet=True, shards=None)
+            config = {
+                **CONFIG,
+                "output_format": output_format,
+                "parquet": {"row_group_size": 4, "compression": "zstd"},
+            }
+            DatasetParser(cmd_args, config).parse_dataset()
+            self.roots[output_format] = root
+
+    def tearDown(self):
+        for root in self.roots.values():
+            shutil.rmtree(root)
+
+    def test_typed_columns(self):
+        schema = pq.read_schema(self.roots["parquet"] / "film" / "film.parquet")
+        self.assertEqual(schema.field("id").type, pa.int32())
+        self.assertEqual(schema.field("is_adult").type, pa.bool_())
+        self.assertEqual(schema.field("start_year").type, pa.int32())
+        schema = pq.read_schema(self.roots["parquet"] / "rating" / "rating.parquet")
+        self.assertEqual(schema.field("average_rating").type, pa.float64())
+
+    def test_row_groups(self):
+        file_name = str(self.roots["parquet"] / "principal" / "principal.parquet")
+        self.assertEqual(pq.ParquetFile(file_name).num_row_groups, 3)
+        slices = parquet.get_row_group_slices(file_name, 2)
+        self.assertListEqual(slices, [[0, 1], [2]])
+        self.assertListEqual(
+            [row for el in slices for row in parquet.iter_rows(file_name, el)],
+            list(parquet.iter_rows(file_name)),
+        )
+
+    def test_same_rows_as_csv(self):
+        for table_dir in self.roots["csv"].iterdir():
+            if not table_dir.is_dir():
+                continue
+            with self.subTest(table=table_dir.name):
+                expected = [
+                    line.split("\t")
+                    for path in sorted(table_dir.iterdir())
+                    for line in path.read_text().splitlines()
+                ]
+                file_name = self.roots["parquet"] / table_dir.name
+                rows = parquet.iter_rows(str(file_name / f"{table_dir.name}.parquet"))
+                self.assertListEqual(
+                    [[str(el) for el in row] for row in rows], expected
+                )
+
 
 # TODO: Cover all the rest of cases with different args
 # TODO: Increase dataset size in several times
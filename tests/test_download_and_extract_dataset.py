@@ -1,10 +1,17 @@
+import gzip
+import json
+import tempfile
 import threading
 import unittest
+from pathlib import Path
+from unittest import mock
 
-from src.utils import get_data_sets
-from src.dataset_handler import DataSetsHandler
+from src.utils import get_data_sets, DataSet
+from src.dataset_handler import DataSetsHandler, DownloadState, get_state_path
 from tests.utils import (
     FakeHTTPServer,
+    Handler,
+    TEST_GZIPPED_DATA,
     TEST_HTTP_PORT,
     TEST_TVS_DATA,
     TEST_FILENAME,
@@ -32,6 +39,10 @@ class TestDownloadAndExtractDataset(unittest.TestCase):
         cls.server.shutdown()
         cls.downloader.cleanup()
 
+    def setUp(self):
+        self.downloader.cleanup()
+        Handler.requests.clear()
+
     def test_download_and_extract_dataset(self):
         self.downloader.download()
         self.downloader.extract()
@@ -39,6 +50,87 @@ class TestDownloadAndExtractDataset(unittest.TestCase):
             with open(data_set) as f:
                 self.assertEqual(TEST_TVS_DATA, f.read().strip("\n"))
 
+    def test_skip_unchanged(self):
+        self.downloader.download()
+        Handler.requests.clear()
+        self.downloader.download()
+        self.assertListEqual(Handler.requests, [("HEAD", None)])
+
+    def test_resume(self):
+        self.downloader.download()
+        data_set = self.downloader.data_sets[0]
+        state_path = get_state_path(data_set)
+        with open(state_path) as fd:
+            state = json.load(fd)
+        state["ranges"][0][2] = 10
+        state["complete"] = False
+        with open(state_path, "w") as fd:
+            json.dump(state, fd)
+        with open(data_set.gzipped, "r+b") as fd:
+            fd.seek(10)
+            fd.write(bytes(len(TEST_GZIPPED_DATA) - 10))
+
+        Handler.requests.clear()
+        self.downloader.download()
+        self.assertListEqual(
+            Handler.requests,
+            [("HEAD", None), ("GET", f"bytes=10-{len(TEST_GZIPPED_DATA) - 1}")],
+        )
+        with open(data_set.gzipped, "rb") as fd:
+            self.assertEqual(fd.read(), TEST_GZIPPED_DATA)
+
+    def test_saved_bytes_written(self):
+        data_set = self.downloader.data_sets[0]
+        save = DownloadState.save
+        saved = []
+
+        def check_save(state):
+            # Bytes recorded in state file are already in downloaded file
+            with open(data_set.gzipped, "rb") as fd:
+                for start, _, done in state.ranges:
+                    fd.seek(start)
+                    expected = TEST_GZIPPED_DATA[start : start + done]
+                    self.assertEqual(fd.read(done), expected)
+            saved.append(sum(done for _, _, done in state.ranges))
+            save(state)
+
+        with mock.patch("src.dataset_handler.DOWNLOAD_CHUNK_SIZE", 8), mock.patch(
+            "src.dataset_handler.DOWNLOAD_SAVE_SIZE", 32
+        ), mock.patch.object(DownloadState, "save", check_save):
+            self.downloader.download()
+        self.assertGreater(len(saved), 3)
+        self.assertEqual(saved[-1], len(TEST_GZIPPED_DATA))
+        self.assertFalse(Path(f"{get_state_path(data_set)}.tmp").exists())
+
+    def test_ranges(self):
+        downloader = DataSetsHandler(
+            self.downloader.data_sets, range_min_size=0, range_parts=3
+        )
+        downloader.download()
+        self.assertEqual(
+            len([el for el in Handler.requests if el[0] == "GET" and el[1]]), 3
+        )
+        with open(downloader.data_sets[0].gzipped, "rb") as fd:
+            self.assertEqual(fd.read(), TEST_GZIPPED_DATA)
+
+    def test_extract_multi_member(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            data_set = DataSet(
+                url="",
+                gzipped=Path(tmp) / "multi.tsv.gz",
+                extracted=Path(tmp) / "multi.tsv",
+            )
+            content = TEST_TVS_DATA.encode() * 100
+            data_set.gzipped.write_bytes(
+                gzip.compress(content[:1000]) + gzip.compress(content[1000:])
+            )
+            DataSetsHandler._extract_file(data_set)
+            self.assertEqual(data_set.extracted.read_bytes(), content)
+
+            data_set.gzipped.write_bytes(gzip.compress(content)[:-100])
+            with self.assertRaises(EOFError):
+                DataSetsHandler._extract_file(data_set)
+
     def test_invalid_data_set_filename(self):
         with self.assertRaises(ValueError):
             data_sets = get_data_sets(
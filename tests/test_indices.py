@@ -0,0 +1,25 @@
+import unittest
+
+from src.indices import IdIndex, PairSet
+
+
+class TestIdIndex(unittest.TestCase):
+    def test_membership(self):
+        index = IdIndex()
+        for id_ in [1, 7, 8, 1000, 7, None]:
+            index.add(id_)
+        self.assertEqual(len(index), 4)
+        self.assertListEqual(list(index), [1, 7, 8, 1000])
+        for id_ in [1, 7, 8, 1000]:
+            self.assertIn(id_, index)
+        for id_ in [0, 2, 9, 999, 1001, 10**9, None]:
+            self.assertNotIn(id_, index)
+
+
+class TestPairSet(unittest.TestCase):
+    def test_dedup_across_runs(self):
+        pairs = PairSet(run_size=3)
+        for pair in [(9, 4), (1, 2), (9, 4), (1, 2), (2**31, 2**32 - 1), (1, 3)]:
+            pairs.add(pair)
+        self.assertListEqual(list(pairs), [(1, 2), (1, 3), (9, 4), (2**31, 2**32 - 1)])
+        self.assertEqual(len(pairs), 4)
@@ -0,0 +1,120 @@
+import json
+import pstats
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src import metrics
+from src.dataset_parser import DatasetParser
+from src.metrics import Metrics, StageRecord, enable_profiling, measure
+from src.utils import get_config
+from tests.utils import get_root_dir, CONFIG_REL_PATH, DATASETS_REL_PATH
+
+CONFIG = get_config(get_root_dir() / CONFIG_REL_PATH)
+DATASET_DIR = get_root_dir() / DATASETS_REL_PATH
+
+
+def inner_work():
+    return sum(range(10_000))
+
+
+def outer_work():
+    return sum(range(10_000))
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_measure(self):
+        with measure("parse", "film") as record:
+            record.rows, record.bytes = 10, 100
+            outer_work()
+        self.assertGreater(record.wall_time, 0)
+        self.assertGreaterEqual(record.cpu_time, 0)
+        self.assertGreater(record.peak_rss, 0)
+        self.assertIsNone(record.error)
+        report = record.as_dict()
+        self.assertAlmostEqual(report["rows_per_second"], 10 / record.wall_time)
+        self.assertAlmostEqual(report["bytes_per_second"], 100 / record.wall_time)
+
+    def test_failed_stage(self):
+        recorder = Metrics()
+        with self.assertRaises(ValueError):
+            with recorder.stage("load", "film"):
+                raise ValueError("broken chunk")
+        self.assertEqual(recorder.records[0].error, "ValueError: broken chunk")
+        self.assertGreater(recorder.records[0].wall_time, 0)
+
+    def test_totals(self):
+        recorder = Metrics()
+        recorder.add(
+            [
+                StageRecord("copy", "film", "film.csv.00", 1, 10.0, 2.0, 1.0, 5, 3, 30),
+                StageRecord("copy", "film", "film.csv.01", 2, 11.0, 2.0, 1.5, 7, 4, 40),
+                StageRecord("copy", "rating", "rating.csv.00", 1, 12.0, 1.0, 0.5, 6),
+                StageRecord("load", started=9.0, wall_time=5.0),
+            ]
+        )
+        totals = {el["name"]: el for el in recorder.get_totals()}
+        self.assertEqual(totals.keys(), {"film", "rating"})
+        self.assertEqual(totals["film"]["parts"], 2)
+        self.assertEqual(totals["film"]["wall_time"], 3.0)
+        self.assertEqual(totals["film"]["cpu_time"], 2.5)
+        self.assertEqual(totals["film"]["peak_rss"], 7)
+        self.assertEqual(totals["film"]["rows"], 7)
+        self.assertEqual(totals["film"]["bytes"], 70)
+        self.assertIsNone(totals["rating"]["rows"])
+
+    def test_profiling(self):
+        profile_dir = self.root / "profile"
+        with mock.patch.object(metrics, "_profile_dir", None):
+            enable_profiling(profile_dir)
+            with measure("load") as outer:
+                outer_work()
+                with measure("copy", "film", "film.csv.00"):
+                    inner_work()
+        functions = {}
+        for name in ["load", "copy-film-film.csv.00"]:
+            stats = pstats.Stats(str(profile_dir / f"{name}.{outer.pid}.prof"))
+            functions[name] = {el[2] for el in stats.stats}
+        self.assertIn("outer_work", functions["load"])
+        self.assertNotIn("inner_work", functions["load"])
+        self.assertIn("inner_work", functions["copy-film-film.csv.00"])
+        self.assertIsNone(metrics._profile_dir)
+
+    def test_parse_report(self):
+        for path in DATASET_DIR.glob("*.tsv"):
+            shutil.copy(path, self.root)
+        cmd_args = mock.Mock(root=self.root, debug=False, quiet=True, shards=2)
+        recorder = Metrics()
+        with mock.patch("src.dataset_parser.METRICS", recorder):
+            DatasetParser(cmd_args, CONFIG).parse_dataset()
+        recorder.write_report(self.root / "report.json")
+        with open(self.root / "report.json") as fd:
+            report = json.load(fd)
+
+        stages = {(el["stage"], el["name"], el["part"]): el for el in report["stages"]}
+        for table_name in ["film", "person", "principal", "rating"]:
+            with self.subTest(table=table_name):
+                chunks = sorted((self.root / table_name).iterdir())
+                lines = sum(len(el.read_text().splitlines()) for el in chunks)
+                self.assertEqual(stages[("parse", table_name, None)]["rows"], lines)
+                for chunk in chunks:
+                    self.assertIn(("parse", table_name, chunk.name), stages)
+        for table_name in ["job", "genre", "person_film"]:
+            with self.subTest(table=table_name):
+                self.assertEqual(
+                    stages[("write", table_name, None)]["rows"],
+                    stages[("split", table_name, None)]["rows"],
+                )
+        totals = {el["name"]: el for el in report["totals"]}
+        self.assertEqual(
+            totals["film"]["rows"], stages[("parse", "film", None)]["rows"]
+        )
+        self.assertGreater(report["peak_rss"], 0)
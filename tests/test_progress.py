@@ -0,0 +1,144 @@
+import json
+import shutil
+import tempfile
+import unittest
+import urllib.request
+from os.path import getsize
+from pathlib import Path
+from unittest import mock
+
+from src.dataset_parser import DatasetParser, get_progress_name
+from src.progress import (
+    PROGRESS,
+    HttpSink,
+    Progress,
+    ProgressSink,
+    format_status,
+)
+from src.utils import get_config
+from tests.utils import get_root_dir, CONFIG_REL_PATH, DATASETS_REL_PATH
+
+CONFIG = get_config(get_root_dir() / CONFIG_REL_PATH)
+DATASET_DIR = get_root_dir() / DATASETS_REL_PATH
+
+
+class RecordingSink(ProgressSink):
+    def __init__(self):
+        self.emitted = []
+        self.finished = []
+
+    def emit(self, statuses):
+        self.emitted.append(statuses)
+
+    def finish(self, status):
+        self.finished.append(status)
+
+
+class TestProgress(unittest.TestCase):
+    def setUp(self):
+        self.progress = Progress(interval=3600)
+        self.sink = RecordingSink()
+        self.progress.add_sink(self.sink)
+        self.addCleanup(self.progress.close)
+
+    def test_sampled_position(self):
+        positions = [0]
+        with self.progress.task("Copying 'film'", 100, parts=2) as task:
+            self.progress.report()
+            self.assertListEqual(self.sink.emitted, [])
+
+            with task.track(lambda: positions[0], 0):
+                positions[0] = 30
+                self.progress.report()
+                with task.track(part=1):
+                    task.update(20, 1)
+                    self.progress.report()
+                status = self.sink.emitted[-1][0]
+                self.assertEqual(status["position"], 50)
+                self.assertEqual(status["percent"], 50.0)
+                positions[0] = 60
+                with task.track(part=1):
+                    task.update(40, 1)
+            # All parts are done, task is finished by reporter
+            self.progress.report()
+            self.assertEqual(len(self.sink.finished), 1)
+        self.assertEqual(len(self.sink.finished), 1)
+        status = self.sink.finished[0]
+        self.assertEqual(status["state"], "done")
+        self.assertEqual(status["position"], 100)
+        self.assertIn("Copying 'film': 100.00%", format_status(status))
+
+    def test_rate_and_eta(self):
+        positions = [0]
+        with mock.patch("src.progress.time.monotonic") as monotonic:
+            monotonic.return_value = 10.0
+            with self.progress.task("Parsing 'title.basics.tsv'", 100) as task:
+                with task.track(lambda: positions[0]):
+                    for now, position in [(11.0, 10), (13.0, 50)]:
+                        monotonic.return_value, positions[0] = now, position
+                        task.sample()
+                        status = task.get_status()
+        self.assertEqual(status["rate"], 20.0)
+        self.assertEqual(status["eta"], 2.5)
+        self.assertEqual(status["elapsed"], 3.0)
+        self.assertIn(
+            "50.00% 0.0 MB/0.0 MB 0.0 MB/s ETA 0:00:02", format_status(status)
+        )
+
+    def test_failed_task(self):
+        with self.assertRaises(ValueError):
+            with self.progress.task("Downloading 'title.basics.tsv.gz'", None):
+                raise ValueError("checksum mismatch")
+        status = self.sink.finished[0]
+        self.assertEqual(status["state"], "failed")
+        self.assertEqual(status["error"], "ValueError: checksum mismatch")
+        self.assertIsNone(status["percent"])
+
+    def test_http_sink(self):
+        sink = HttpSink()
+        self.progress.add_sink(sink)
+        with self.progress.task("Parsing 'title.ratings.tsv'", 10) as task:
+            with task.track(lambda: 5):
+                self.progress.report()
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{sink.port}/progress"
+                ) as response:
+                    content = json.load(response)
+        self.assertEqual(content["running"][0]["percent"], 50.0)
+        self.assertEqual(content["finished"], [])
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{sink.port}/") as response:
+            content = json.load(response)
+        self.assertEqual(content["running"], [])
+        self.assertEqual(content["finished"][0]["state"], "done")
+
+
+class TestParseProgress(unittest.TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        for path in DATASET_DIR.glob("*.tsv"):
+            shutil.copy(path, self.root)
+        self.sink = RecordingSink()
+        PROGRESS.add_sink(self.sink)
+        self.addCleanup(PROGRESS.close)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_parse(self):
+        for shards in [None, 2]:
+            with self.subTest(shards=shards):
+                self.sink.finished.clear()
+                cmd_args = mock.Mock(
+                    root=self.root, debug=False, quiet=True, shards=shards
+                )
+                DatasetParser(cmd_args, CONFIG).parse_dataset()
+                finished = {el["name"]: el for el in self.sink.finished}
+                for _, dataset_path in CONFIG["dataset_paths"].items():
+                    status = finished[get_progress_name(dataset_path)]
+                    self.assertEqual(status["state"], "done")
+                    self.assertEqual(status["percent"], 100.0)
+                    # Shards don't include header line
+                    size = getsize(self.root / dataset_path)
+                    self.assertEqual(status["position"], status["total"])
+                    self.assertLessEqual(status["total"], size)
@@ -0,0 +1,67 @@
+import shutil
+import statistics
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+from benchmarks.synthetic import HEADERS, NULL, SyntheticDatasets
+from src.dataset_parser import DatasetParser
+from src.utils import get_config
+from tests.utils import get_root_dir, CONFIG_REL_PATH
+
+CONFIG = get_config(get_root_dir() / CONFIG_REL_PATH)
+FILMS = 2000
+
+
+class TestSyntheticDatasets(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.root = Path(tempfile.mkdtemp())
+        SyntheticDatasets(FILMS).write(cls.root)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.root)
+
+    def read(self, name: str):
+        with open(self.root / name) as fd:
+            return [line.rstrip("\n").split("\t") for line in fd]
+
+    def test_same_seed_same_datasets(self):
+        root = Path(tempfile.mkdtemp())
+        try:
+            SyntheticDatasets(FILMS).write(root)
+            for name in HEADERS:
+                with self.subTest(name=name):
+                    self.assertEqual(
+                        (root / name).read_text(), (self.root / name).read_text()
+                    )
+        finally:
+            shutil.rmtree(root)
+
+    def test_shape(self):
+        for name, headers in HEADERS.items():
+            with self.subTest(name=name):
+                rows = self.read(name)
+                self.assertEqual(rows[0], headers)
+                self.assertEqual({len(el) for el in rows}, {len(headers)})
+
+        films = self.read("title.basics.tsv")[1:]
+        self.assertEqual(len(films), FILMS)
+        persons = self.read("name.basics.tsv")[1:]
+        birth_nulls = sum(el[2] == NULL for el in persons) / len(persons)
+        self.assertGreater(birth_nulls, 0.7)
+
+        principals = Counter(el[0] for el in self.read("title.principals.tsv")[1:])
+        counts = list(principals.values())
+        self.assertGreater(max(counts), 10 * statistics.median(counts))
+
+    def test_parsed_without_errors(self):
+        cmd_args = mock.Mock(root=self.root, debug=False, quiet=True, shards=None)
+        parser = DatasetParser(cmd_args, CONFIG)
+        parser.parse_dataset()
+        self.assertFalse(any(parser.errors.values()))
+        self.assertLess(len(parser.indices["film"]), FILMS)
+        self.assertGreater(len(parser.jobs), 5)
@@ -1,15 +1,19 @@
 import csv
 import gzip
+import hashlib
 import http.server
 import io
+import re
 from os import getcwd
 from os.path import isfile
 
 __all__ = [
     "FakeHTTPServer",
+    "Handler",
     "TEST_HTTP_PORT",
     "TEST_FILENAME",
     "TEST_TVS_DATA",
+    "TEST_GZIPPED_DATA",
     "TEST_FILENAME_INVALID",
     "CONFIG_REL_PATH",
     "DATASETS_REL_PATH",
@@ -17,8 +21,10 @@ __all__ = [
 ]
 
 from pathlib import Path
+from typing import List, Optional, Tuple
 
 TEST_HTTP_PORT = 8333
+RANGE_PATTERN = re.compile(r"^bytes=(\d+)-(\d+)$")
 DELIMITER = "\t"
 TEST_FILENAME = "valid.test.dataset.tsv.gz"
 TEST_FILENAME_INVALID = "invalid.test.dataset.tsv.zip"
@@ -41,19 +47,44 @@ DATASETS_REL_PATH = Path("tests") / "datasets"
 
 
 class Handler(http.server.SimpleHTTPRequestHandler):
+    # (method, Range header) of served requests
+    requests: List[Tuple[str, Optional[str]]] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.requests.append(("HEAD", self.headers.get("Range")))
+        if self.path in [f"/{TEST_FILENAME}", f"/{TEST_FILENAME_INVALID}"]:
+            self._send_headers(200, len(TEST_GZIPPED_DATA))
+        else:
+            self.send_error(404)
+
     def do_GET(self):
+        self.requests.append(("GET", self.headers.get("Range")))
         if self.path in [f"/{TEST_FILENAME}", f"/{TEST_FILENAME_INVALID}"]:
             self._handle_success()
         else:
             self.send_error(404)
 
     def _handle_success(self):
-        self.send_response(200)
+        content = TEST_GZIPPED_DATA
+        if range_match := RANGE_PATTERN.match(self.headers.get("Range", "")):
+            start, end = int(range_match.group(1)), int(range_match.group(2))
+            content = content[start : end + 1]
+            self._send_headers(206, len(content))
+        else:
+            self._send_headers(200, len(content))
+        self.wfile.write(content)
+
+    def _send_headers(self, status: int, length: int):
+        self.send_response(status)
         self.send_header("Content-Disposition", f"attachment; filename={self.path[1:]}")
         self.send_header("Content-type", "application/x-gzip")
-        self.send_header("Content-Length", "1000")
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{hashlib.md5(TEST_GZIPPED_DATA).hexdigest()}"')
         self.end_headers()
-        self.wfile.write(_generate_gzipped_tvs_file_stream())
 
 
 def _generate_gzipped_tvs_file_stream():
@@ -63,7 +94,10 @@ def _generate_gzipped_tvs_file_stream():
         if line.strip():
             writer.writerow(line.split(DELIMITER))
     output.seek(0)
-    return gzip.compress(output.read().encode())
+    return gzip.compress(output.read().encode(), mtime=0)
+
+
+TEST_GZIPPED_DATA = _generate_gzipped_tvs_file_stream()
 
 
 class FakeHTTPServer(http.server.HTTPServer):